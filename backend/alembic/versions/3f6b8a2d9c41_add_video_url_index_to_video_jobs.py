@@ -0,0 +1,26 @@
+"""add video_url index to video_jobs
+
+Revision ID: 3f6b8a2d9c41
+Revises: e1a9c2f7b3d5
+Create Date: 2026-10-19 13:05:44.201736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b8a2d9c41'
+down_revision: Union[str, None] = 'e1a9c2f7b3d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_video_jobs_video_url'), 'video_jobs', ['video_url'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_video_jobs_video_url'), table_name='video_jobs')
@@ -0,0 +1,26 @@
+"""add owner_id, updated_at index to video_jobs
+
+Revision ID: 5c2e71d0a9b4
+Revises: 866bd85f6f91
+Create Date: 2026-10-19 11:02:41.305117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e71d0a9b4'
+down_revision: Union[str, None] = '866bd85f6f91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_video_jobs_owner_id_updated_at', 'video_jobs', ['owner_id', 'updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_video_jobs_owner_id_updated_at', table_name='video_jobs')
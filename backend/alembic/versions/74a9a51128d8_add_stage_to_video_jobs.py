@@ -0,0 +1,26 @@
+"""add stage to video_jobs
+
+Revision ID: 74a9a51128d8
+Revises: fa354bd7ab47
+Create Date: 2026-10-19 10:03:37.301840
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74a9a51128d8'
+down_revision: Union[str, None] = 'fa354bd7ab47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('video_jobs', sa.Column('stage', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('video_jobs', 'stage')
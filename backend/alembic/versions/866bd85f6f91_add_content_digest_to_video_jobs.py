@@ -0,0 +1,28 @@
+"""add content_digest to video_jobs
+
+Revision ID: 866bd85f6f91
+Revises: 9edfacc5c11f
+Create Date: 2026-10-19 10:17:58.738823
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '866bd85f6f91'
+down_revision: Union[str, None] = '9edfacc5c11f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('video_jobs', sa.Column('content_digest', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_video_jobs_content_digest'), 'video_jobs', ['content_digest'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_video_jobs_content_digest'), table_name='video_jobs')
+    op.drop_column('video_jobs', 'content_digest')
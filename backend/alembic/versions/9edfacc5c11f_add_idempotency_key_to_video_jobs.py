@@ -0,0 +1,32 @@
+"""add idempotency_key to video_jobs
+
+Revision ID: 9edfacc5c11f
+Revises: 74a9a51128d8
+Create Date: 2026-10-19 10:10:18.536389
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9edfacc5c11f'
+down_revision: Union[str, None] = '74a9a51128d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('video_jobs', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.create_unique_constraint(
+        'uq_video_jobs_owner_idempotency_key',
+        'video_jobs',
+        ['owner_id', 'idempotency_key'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_video_jobs_owner_idempotency_key', 'video_jobs', type_='unique')
+    op.drop_column('video_jobs', 'idempotency_key')
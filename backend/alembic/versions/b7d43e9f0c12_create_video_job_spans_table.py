@@ -0,0 +1,44 @@
+"""create video_job_spans table
+
+Revision ID: b7d43e9f0c12
+Revises: 5c2e71d0a9b4
+Create Date: 2026-10-19 11:40:12.552904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d43e9f0c12'
+down_revision: Union[str, None] = '5c2e71d0a9b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('video_job_spans',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('job_id', sa.UUID(), nullable=False),
+    sa.Column('trace_id', sa.String(length=32), nullable=False),
+    sa.Column('span_id', sa.String(length=16), nullable=False),
+    sa.Column('parent_span_id', sa.String(length=16), nullable=True),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('duration_ms', sa.Float(), nullable=False),
+    sa.Column('attributes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['job_id'], ['video_jobs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_video_job_spans_job_id'), 'video_job_spans', ['job_id'], unique=False)
+    op.create_index(op.f('ix_video_job_spans_trace_id'), 'video_job_spans', ['trace_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_video_job_spans_trace_id'), table_name='video_job_spans')
+    op.drop_index(op.f('ix_video_job_spans_job_id'), table_name='video_job_spans')
+    op.drop_table('video_job_spans')
@@ -0,0 +1,26 @@
+"""add peak_rss_bytes to video_jobs
+
+Revision ID: e1a9c2f7b3d5
+Revises: b7d43e9f0c12
+Create Date: 2026-10-19 12:31:07.914230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a9c2f7b3d5'
+down_revision: Union[str, None] = 'b7d43e9f0c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('video_jobs', sa.Column('peak_rss_bytes', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('video_jobs', 'peak_rss_bytes')
@@ -0,0 +1,26 @@
+"""add duration_seconds to video_jobs
+
+Revision ID: fa354bd7ab47
+Revises: 3b8c08c015f8
+Create Date: 2026-10-19 09:56:16.548191
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fa354bd7ab47'
+down_revision: Union[str, None] = '3b8c08c015f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('video_jobs', sa.Column('duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('video_jobs', 'duration_seconds')
@@ -0,0 +1,63 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import get_db
+from app.services.upload_jobs import handle_finalized_upload
+
+# GCS object-finalize notifications, delivered by a Pub/Sub push
+# subscription, start signed uploads the moment their bytes land:
+#
+#   gcloud storage buckets notifications create gs://$BUCKET \
+#       --topic=video-uploads --event-types=OBJECT_FINALIZE --object-prefix=videos/
+#   gcloud pubsub subscriptions create video-uploads-push --topic=video-uploads \
+#       --push-endpoint="https://$API/gcs-notifications?token=$GCS_NOTIFICATION_TOKEN"
+#
+# Any 2xx acks the message; a 5xx makes Pub/Sub redeliver it. Locally,
+# scripts/notify_object_finalize.py stands in for Pub/Sub.
+
+router = APIRouter(prefix="/gcs-notifications", tags=["gcs-notifications"])
+
+
+class PubSubMessage(BaseModel):
+    attributes: dict[str, str] = {}
+    data: str | None = None
+    messageId: str | None = None
+
+class PushIn(BaseModel):
+    message: PubSubMessage
+    subscription: str | None = None
+
+
+@router.post("")
+def handle_object_finalize(
+    payload: PushIn,
+    token: str | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Starts the pending_upload job registered for the finalized object.
+    Other events, buckets and objects are acknowledged and ignored.
+    """
+    if not settings.GCS_NOTIFICATION_TOKEN or not hmac.compare_digest(
+        token or "", settings.GCS_NOTIFICATION_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Invalid notification token")
+
+    attributes = payload.message.attributes
+    if attributes.get("eventType") != "OBJECT_FINALIZE" or attributes.get("bucketId") != settings.GCS_BUCKET_NAME:
+        return Response(status_code=204)
+
+    # A no-op if it's not a signed upload or the client's POST /video-jobs
+    # got there first
+    blob_name = attributes.get("objectId", "")
+    try:
+        handle_finalized_upload(db, blob_name)
+    except Exception as e:
+        print(f"Could not start the job for {blob_name}: {e}")
+        raise HTTPException(status_code=500, detail=f"Storage Error: {str(e)}")
+
+    return Response(status_code=204)
@@ -0,0 +1,177 @@
+import os
+import re
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.services.storage import LocalStorage, get_storage
+from app.services.upload_jobs import handle_finalized_upload
+
+# Serves the "signed" URLs of the local storage backend (STORAGE_BACKEND=local),
+# standing in for GCS: GET with Range support (ffprobe, video playback), PUT
+# of whole objects or Content-Range chunks (resumable sessions, "bytes */N"
+# asks how much arrived). A finished video upload starts its pending job,
+# like the GCS object-finalize notification. 404 with any other backend.
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+CHUNK_SIZE = 1024 * 1024
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+_CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)$")
+
+
+def local_storage() -> LocalStorage:
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Not found")
+    return storage
+
+
+def check_signature(storage: LocalStorage, name: str, method: str, expires: int, content_type: str | None, signature: str):
+    if not storage.verify(name, method, expires, content_type, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+
+def _file_size(path: str) -> int | None:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _open_partial(partial: str, start: int):
+    # Continues a resumable upload at `start`, else starts the file over
+    os.makedirs(os.path.dirname(partial), exist_ok=True)
+    f = open(partial, "r+b" if start and os.path.exists(partial) else "wb")
+    f.seek(start)
+    f.truncate()
+    return f
+
+
+def _read_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(remaining, CHUNK_SIZE))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.get("/{name:path}")
+def download_object(
+    name: str,
+    expires: int,
+    signature: str,
+    method: str = Query("GET"),
+    range_header: str | None = Header(None, alias="Range"),
+):
+    storage = local_storage()
+    check_signature(storage, name, method, expires, None, signature)
+    if method != "GET":
+        raise HTTPException(status_code=403, detail="URL not signed for GET")
+
+    path = storage.path(name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Object not found")
+    size = os.path.getsize(path)
+
+    start, end, status = 0, size - 1, 200
+    match = _RANGE.match(range_header or "")
+    if match and size:
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        elif last:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(last))
+        if start > end:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        status = 206
+
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if status == 206:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        _read_range(path, start, end),
+        status_code=status,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+@router.put("/{name:path}")
+async def upload_object(
+    name: str,
+    request: Request,
+    expires: int,
+    signature: str,
+    method: str = Query("PUT"),
+    content_type: str | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    storage = local_storage()
+    check_signature(storage, name, method, expires, content_type, signature)
+    if method != "PUT":
+        raise HTTPException(status_code=403, detail="URL not signed for PUT")
+    if content_type and request.headers.get("content-type") != content_type:
+        raise HTTPException(status_code=403, detail="Content-Type doesn't match the signed URL")
+
+    path = storage.path(name)
+    partial = f"{path}.upload"
+
+    start, total = 0, None
+    content_range = request.headers.get("content-range")
+    if content_range:
+        match = _CONTENT_RANGE.match(content_range)
+        if not match:
+            raise HTTPException(status_code=400, detail="Invalid Content-Range")
+        first, _, size = match.groups()
+        total = int(size) if size != "*" else None
+        received = await run_in_threadpool(_file_size, partial)
+        if first is None:
+            # Status query: how much of the resumable upload arrived
+            if total is not None and received is None and await run_in_threadpool(os.path.exists, path):
+                return Response(status_code=200)
+            headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+            return Response(status_code=308, headers=headers)
+        start = int(first)
+        if start > (received or 0):
+            raise HTTPException(status_code=400, detail=f"Expected a chunk from byte {received or 0}")
+
+    # Disk writes run in the threadpool, a few chunks at a time, so
+    # multi-GB bodies never block the event loop
+    f = await run_in_threadpool(_open_partial, partial, start)
+    try:
+        buffered, size = [], 0
+        async for chunk in request.stream():
+            buffered.append(chunk)
+            size += len(chunk)
+            if size >= CHUNK_SIZE:
+                await run_in_threadpool(f.write, b"".join(buffered))
+                buffered, size = [], 0
+        if buffered:
+            await run_in_threadpool(f.write, b"".join(buffered))
+        written = f.tell()
+    finally:
+        await run_in_threadpool(f.close)
+
+    if content_range and (total is None or written < total):
+        # More chunks to come; an unknown total ("*") is only settled by a
+        # later chunk that states it
+        return Response(status_code=308, headers={"Range": f"bytes=0-{written - 1}"} if written else {})
+
+    await run_in_threadpool(os.replace, partial, path)
+    if name.startswith("videos/"):
+        # What the GCS object-finalize notification does in production
+        try:
+            await run_in_threadpool(handle_finalized_upload, db, name)
+        except Exception as e:
+            print(f"Could not start the job for {name}: {e}")
+    return Response(status_code=200)
@@ -1,26 +1,52 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+import hashlib
+import json
+import uuid
+
+from fastapi import APIRouter, Depends, UploadFile, File, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_clerk_user_id
-from app.db.session import get_db
+from app.core.auth import (
+    get_current_clerk_user_id,
+    get_stream_clerk_user_id,
+    issue_stream_ticket,
+    renew_stream_ticket,
+)
+from app.core.config import settings
+from app.db.session import SessionLocal, get_db
 from app.models.user import User
 from app.models.video_job import VideoJob
 from app.models.note import Note
-from app.services.gcs import upload_video_to_gcs, generate_signed_url, generate_upload_signed_url, delete_file_from_gcs
-
-from rq import Queue
-import redis
-from app.jobs.video_summary import generate_video_summary
-
+from app.services.gcs import upload_video_to_gcs, generate_signed_url, get_blob_digest
+from app.services.upload_sessions import (
+    PART_URL_PAGE,
+    UploadSessionError,
+    close_upload_session,
+    complete_upload_session,
+    create_upload_session,
+    describe_upload_session,
+    get_upload_session,
+)
+from app.services.upload_jobs import (
+    PENDING_UPLOAD,
+    create_jobs_from_uploads,
+    launch_jobs,
+    register_upload,
+    restart_stranded_job,
+    start_uploaded_job,
+)
+from app.services.summary_stream import clear_summary_stream, iter_summary_events
+from app.services.job_events import iter_job_events, job_event_listener, publish_job_event
+from app.services.gemini_qa import answer_question
+from app.services.job_traces import get_trace_breakdown
+
+from app.jobs.fair_queue import get_user_queue_stats
+from app.jobs.pipeline import cancel_pipeline, pipeline_in_flight, start_pipeline
+from app.jobs.storage_cleanup import enqueue_blob_cleanup
 
-# --------------------
-# Queue setup
-# --------------------
-from app.core.config import settings
-REDIS_URL = settings.REDIS_URL
-redis_conn = redis.from_url(REDIS_URL)
-queue = Queue("video-jobs", connection=redis_conn)
 
 router = APIRouter(prefix="/video-jobs", tags=["video-jobs"])
 
@@ -40,15 +66,82 @@ def get_db_user(db: Session, clerk_user_id: str) -> User:
     return user
 
 
+def find_idempotent_job(db: Session, user: User, idempotency_key: str | None) -> VideoJob | None:
+    if not idempotency_key:
+        return None
+    return (
+        db.query(VideoJob)
+        .filter(VideoJob.owner_id == user.id, VideoJob.idempotency_key == idempotency_key)
+        .first()
+    )
+
+
+def add_job_idempotently(db: Session, user: User, job: VideoJob) -> tuple[VideoJob, bool]:
+    """
+    Inserts job; if a concurrent request with the same Idempotency-Key won
+    the race, returns that job instead. Returns (job, created).
+    """
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = find_idempotent_job(db, user, job.idempotency_key)
+        if not existing:
+            raise
+        return existing, False
+
+    db.refresh(job)
+    return job, True
+
+
+def find_registered_job(db: Session, user: User, payload: "CreateJobIn") -> VideoJob | None:
+    """
+    The job /signed-url registered for this upload, by id or by blob name.
+    """
+    query = db.query(VideoJob).filter(VideoJob.owner_id == user.id)
+    if payload.job_id:
+        try:
+            return query.filter(VideoJob.id == uuid.UUID(payload.job_id)).first()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid job id")
+    return query.filter(VideoJob.video_url == payload.blob_name).first()
+
+
 class TranscriptIn(BaseModel):
     transcript: str
 
 class UploadUrlIn(BaseModel):
     content_type: str
+    filename: str | None = None
 
 class CreateJobIn(BaseModel):
     filename: str
     blob_name: str
+    job_id: str | None = None  # from /signed-url
+
+class UploadUrlsIn(BaseModel):
+    uploads: list[UploadUrlIn]
+
+class CreateJobsIn(BaseModel):
+    jobs: list[CreateJobIn]
+
+class UploadSessionIn(BaseModel):
+    filename: str
+    content_type: str
+    size: int | None = None
+    parts: int = 1  # 1 = resumable upload; more = parallel parts composed at the end
+
+class AskIn(BaseModel):
+    question: str
+
+class StatusQueryIn(BaseModel):
+    ids: list[str]
+
+
+MAX_STATUS_IDS = 200
+# Uploads per bulk request (/signed-urls, /batch)
+MAX_BATCH_UPLOADS = 100
 
 
 # --------------------
@@ -62,49 +155,232 @@ def get_upload_url(
 ):
     """
     Step 1: Get a signed URL to upload the video directly to GCS.
+    Registers a pending_upload job for the blob: processing starts as soon
+    as GCS reports the finished upload (see gcs_notifications.py), without
+    waiting for step 2.
     """
+    user = get_db_user(db, clerk_user_id)
+
     try:
-        return generate_upload_signed_url(payload.content_type)
+        upload = register_upload(db, user.id, payload.content_type, payload.filename)
     except Exception as e:
         print(f"Error generating signed URL: {e}")
         # Return specific error so client can show it (instead of generic "Internal Server Error")
         raise HTTPException(status_code=500, detail=f"Signed URL Error: {str(e)}")
+    db.commit()
+
+    return upload
+
+
+@router.post("/signed-urls")
+def get_upload_urls(
+    payload: UploadUrlsIn,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Bulk step 1: signed upload URLs (and pending_upload jobs) for many
+    videos, registered in one transaction.
+    """
+    if len(payload.uploads) > MAX_BATCH_UPLOADS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_UPLOADS} uploads per request")
+
+    user = get_db_user(db, clerk_user_id)
+
+    try:
+        uploads = [register_upload(db, user.id, u.content_type, u.filename) for u in payload.uploads]
+    except Exception as e:
+        db.rollback()
+        print(f"Error generating signed URLs: {e}")
+        raise HTTPException(status_code=500, detail=f"Signed URL Error: {str(e)}")
+    db.commit()
+
+    return {"uploads": uploads}
 
 
 @router.post("")
 def create_video_job_from_blob(
     payload: CreateJobIn,
+    idempotency_key: str | None = Header(None),
     db: Session = Depends(get_db),
     clerk_user_id: str = Depends(get_current_clerk_user_id),
 ):
     """
     Step 2: After client uploads to GCS, create the job record.
+    Retries carrying the same Idempotency-Key header return the original job.
+    A job registered by /signed-url is started here unless the upload
+    notification already did.
     """
     user = get_db_user(db, clerk_user_id)
-    
-    # We trust the client has uploaded the file to payload.blob_name
-    # (In a real app, we might verify existence via GCS client)
-    
+
+    existing = find_idempotent_job(db, user, idempotency_key)
+    if existing:
+        return existing
+
+    registered = find_registered_job(db, user, payload)
+    if registered:
+        if registered.status != PENDING_UPLOAD:
+            # A retry after a start that failed midway starts it again
+            restart_stranded_job(db, registered)
+            return registered
+        registered.filename = payload.filename
+        db.commit()
+        try:
+            start_uploaded_job(db, registered)
+        except Exception as e:
+            print(f"Error reading {registered.video_url}: {e}")
+            raise HTTPException(status_code=500, detail=f"Storage Error: {str(e)}")
+        if registered.status == PENDING_UPLOAD:
+            raise HTTPException(status_code=400, detail="Uploaded file not found")
+        return registered
+
+    # Verifies the upload landed and fingerprints it in one metadata call
+    try:
+        content_digest = get_blob_digest(payload.blob_name)
+    except Exception as e:
+        print(f"Error reading {payload.blob_name}: {e}")
+        raise HTTPException(status_code=500, detail=f"Storage Error: {str(e)}")
+    if not content_digest:
+        raise HTTPException(status_code=400, detail="Uploaded file not found")
+
     job = VideoJob(
         owner_id=user.id,
         filename=payload.filename,
         video_url=payload.blob_name,
         status="queued",
         error=None,
+        idempotency_key=idempotency_key,
+        content_digest=content_digest,
     )
 
-    db.add(job)
-    db.commit()
-    db.refresh(job)
+    job, created = add_job_idempotently(db, user, job)
+    if not created:
+        return job
 
-    # Queue the job
-    queue.enqueue(generate_video_summary, job.id, job_timeout='3600s')
+    # Reuse a processed duplicate, or probe and queue the first stage
+    launch_jobs(db, [job])
 
     return job
 
+@router.post("/upload-sessions")
+def open_upload_session(
+    payload: UploadSessionIn,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Upload session for a large video (see services/upload_sessions.py):
+    a resumable-upload URI, or signed URLs for parts uploaded in parallel.
+    """
+    user = get_db_user(db, clerk_user_id)
+
+    try:
+        return create_upload_session(
+            db, user.id, payload.filename, payload.content_type, payload.size, payload.parts
+        )
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error opening upload session: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload Session Error: {str(e)}")
+
+
+@router.get("/upload-sessions/{session_id}")
+def get_upload_session_status(
+    session_id: str,
+    start: int = Query(0, ge=0, alias="from"),
+    limit: int = Query(PART_URL_PAGE, ge=1, le=PART_URL_PAGE),
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Resume an interrupted upload: which parts are still missing, with fresh
+    URLs for a page of them (?from=<part index>&limit=; follow "next").
+    """
+    user = get_db_user(db, clerk_user_id)
+
+    session = get_upload_session(session_id, user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+    try:
+        return describe_upload_session(session_id, session, start, limit)
+    except Exception as e:
+        print(f"Error reading upload session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Storage Error: {str(e)}")
+
+
+@router.post("/upload-sessions/{session_id}/complete")
+def complete_upload(
+    session_id: str,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Finishes the session (composes parallel parts into the video) and
+    starts its job, unless the upload notification already did.
+    """
+    user = get_db_user(db, clerk_user_id)
+
+    session = get_upload_session(session_id, user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+    job = (
+        db.query(VideoJob)
+        .filter(VideoJob.id == session["job_id"], VideoJob.owner_id == user.id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        complete_upload_session(session_id, session)
+        if job.status == PENDING_UPLOAD:
+            start_uploaded_job(db, job)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        print(f"Error completing upload session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Storage Error: {str(e)}")
+
+    if job.status == PENDING_UPLOAD:
+        raise HTTPException(status_code=409, detail="Upload not finished")
+
+    close_upload_session(session_id)
+    return job
+
+
+@router.post("/batch")
+def create_video_jobs_from_blobs(
+    payload: CreateJobsIn,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Bulk step 2: starts the jobs for many finished uploads, in one
+    transaction and one Redis round trip. Uploads that can't be started
+    (not found in storage) are listed under "errors"; retrying the same
+    request returns the jobs already started.
+    """
+    if len(payload.jobs) > MAX_BATCH_UPLOADS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_UPLOADS} uploads per request")
+    try:
+        for item in payload.jobs:
+            if item.job_id:
+                uuid.UUID(item.job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+
+    user = get_db_user(db, clerk_user_id)
+    jobs, errors = create_jobs_from_uploads(db, user.id, payload.jobs)
+    return {"jobs": jobs, "errors": errors}
+
+
 @router.post("/upload")
 def upload_video_job(
     file: UploadFile = File(...),
+    idempotency_key: str | None = Header(None),
     db: Session = Depends(get_db),
     clerk_user_id: str = Depends(get_current_clerk_user_id),
 ):
@@ -113,27 +389,39 @@ def upload_video_job(
 
     user = get_db_user(db, clerk_user_id)
 
+    # A retried upload with the same Idempotency-Key doesn't store the file again
+    existing = find_idempotent_job(db, user, idempotency_key)
+    if existing:
+        return existing
+
     try:
         video_url = upload_video_to_gcs(file)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+    try:
+        content_digest = get_blob_digest(video_url)
+    except Exception as e:
+        print(f"Could not read digest for {video_url}: {e}")
+        content_digest = None
+
     job = VideoJob(
         owner_id=user.id,
         filename=file.filename,
         video_url=video_url,
         status="queued",
         error=None,
+        idempotency_key=idempotency_key,
+        content_digest=content_digest,
     )
 
-    db.add(job)
-    db.commit()
-    db.refresh(job)
-
-    # Automatically queue the video processing job
-    # Use string path for RQ to import in worker context
-    queue.enqueue(generate_video_summary, job.id, job_timeout='3600s')
+    job, created = add_job_idempotently(db, user, job)
+    if not created:
+        enqueue_blob_cleanup([video_url])
+        return job
 
+    # Reuse a processed duplicate, or probe and queue the pipeline
+    launch_jobs(db, [job])
 
     return job
 
@@ -145,9 +433,10 @@ def list_video_jobs(
 ):
     user = get_db_user(db, clerk_user_id)
 
+    # Registered uploads that haven't arrived (yet) have nothing to show
     jobs = (
         db.query(VideoJob)
-        .filter(VideoJob.owner_id == user.id)
+        .filter(VideoJob.owner_id == user.id, VideoJob.status != PENDING_UPLOAD)
         .order_by(VideoJob.created_at.desc())
         .all()
     )
@@ -176,6 +465,165 @@ def list_video_jobs(
     return results
 
 
+@router.get("/queue")
+def get_queue_status(
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    The caller's pipelines waiting for / holding a processing slot,
+    and how long admission has been taking.
+    """
+    user = get_db_user(db, clerk_user_id)
+    return get_user_queue_stats(user.id)
+
+
+def job_statuses(
+    db: Session,
+    user: User,
+    ids: list[str] | None,
+    if_none_match: str | None,
+    response: Response,
+):
+    """
+    (id, status, updated_at, error) of the user's jobs, all of them or the
+    given ids, in one query on the (owner_id, updated_at) index; no text
+    columns, no URL signing. Answers 304 when the ETag matches If-None-Match.
+    """
+    query = db.query(VideoJob.id, VideoJob.status, VideoJob.updated_at, VideoJob.error).filter(
+        VideoJob.owner_id == user.id
+    )
+
+    if ids is not None:
+        if len(ids) > MAX_STATUS_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_STATUS_IDS} ids per request")
+        try:
+            wanted = {uuid.UUID(i) for i in ids}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid job id")
+        query = query.filter(VideoJob.id.in_(wanted))
+    else:
+        query = query.filter(VideoJob.status != PENDING_UPLOAD)
+
+    rows = query.all()
+
+    etag = status_etag(rows)
+    response.headers["ETag"] = etag
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return [
+        {"id": row.id, "status": row.status, "updated_at": row.updated_at, "error": row.error}
+        for row in rows
+    ]
+
+
+def status_etag(rows) -> str:
+    # Full-precision latest change plus the set of jobs: any write, and any
+    # job created or deleted, changes the tag
+    latest = max((row.updated_at for row in rows), default=None)
+    digest = hashlib.sha256(latest.isoformat().encode() if latest else b"")
+    for job_id in sorted(str(row.id) for row in rows):
+        digest.update(job_id.encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+@router.get("/status")
+def get_job_statuses(
+    response: Response,
+    ids: str | None = Query(None, description="Comma-separated job ids; all jobs if omitted"),
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Lightweight polling for clients that can't hold an SSE connection.
+    """
+    user = get_db_user(db, clerk_user_id)
+    id_list = [i.strip() for i in ids.split(",") if i.strip()] if ids is not None else None
+    return job_statuses(db, user, id_list, if_none_match, response)
+
+
+@router.post("/status")
+def post_job_statuses(
+    payload: StatusQueryIn,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Same as GET /video-jobs/status, for id lists too long for a URL.
+    """
+    user = get_db_user(db, clerk_user_id)
+    return job_statuses(db, user, payload.ids, if_none_match, response)
+
+
+@router.post("/stream-ticket")
+def create_stream_ticket(
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    A ticket for the SSE endpoints (?ticket=...), valid for
+    STREAM_TICKET_TTL_SECONDS after its last use or its connection's last
+    keep-alive. Automatic reconnects reuse it; fetch a new one once it expires.
+    """
+    return {"ticket": issue_stream_ticket(clerk_user_id), "expires_in": settings.STREAM_TICKET_TTL_SECONDS}
+
+
+def active_job_statuses(owner_id) -> list:
+    # Own session: the request's is closed once streaming starts
+    db = SessionLocal()
+    try:
+        return (
+            db.query(VideoJob.id, VideoJob.status, VideoJob.stage, VideoJob.error)
+            .filter(VideoJob.owner_id == owner_id, VideoJob.status.notin_(["done", "failed", PENDING_UPLOAD]))
+            .all()
+        )
+    finally:
+        db.close()
+
+
+@router.get("/events")
+def stream_job_events(
+    ticket: str | None = None,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_stream_clerk_user_id),
+):
+    """
+    Server-sent events with status changes of the caller's jobs
+    (event "status", see services/job_events.py). Starts with a "status"
+    event per job that is still in progress, so clients don't need to poll.
+    """
+    user = get_db_user(db, clerk_user_id)
+    owner_id = user.id
+
+    def sse(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    # Async, so waiting for events doesn't hold one of the threads that
+    # serve the (sync) routes
+    async def events():
+        # Listen first so nothing between the snapshot and the stream is lost
+        async with job_event_listener(owner_id) as queue:
+            active = await run_in_threadpool(active_job_statuses, owner_id)
+            for job_id, status, stage, error in active:
+                yield sse({"type": "status", "job_id": str(job_id), "status": status, "stage": stage, "error": error})
+
+            async for event in iter_job_events(queue):
+                if event is None:
+                    await renew_stream_ticket(ticket)
+                    yield ": keep-alive\n\n"
+                else:
+                    yield sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/{job_id}/transcript")
 def set_transcript(
     job_id: str,
@@ -200,6 +648,7 @@ def set_transcript(
     job.status = "ready"
     db.commit()
     db.refresh(job)
+    publish_job_event(user.id, job.id, job.status)
 
     return job
 
@@ -207,6 +656,7 @@ def set_transcript(
 @router.post("/{job_id}/generate")
 def generate_summary(
     job_id: str,
+    force: bool = False,
     db: Session = Depends(get_db),
     clerk_user_id: str = Depends(get_current_clerk_user_id),
 ):
@@ -220,14 +670,133 @@ def generate_summary(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
+    # Double-clicks and client retries join the run already in flight
+    if pipeline_in_flight(job.id):
+        return {"status": job.status, "job_id": job.id, "coalesced": True}
+
     # Allow re-processing even if transcript exists
     job.status = "queued"
     job.error = None
     db.commit()
+    clear_summary_stream(job.id)
+    publish_job_event(user.id, job.id, job.status)
+
+    # Resumes after the last completed stage (summarize only if a transcript exists).
+    # force=true bypasses the summary cache and always calls Gemini
+    started = start_pipeline(job, use_cache=not force)
+
+    return {"status": "queued", "job_id": job.id, "coalesced": not started}
+
+
+@router.get("/{job_id}/summary/stream")
+def stream_summary(
+    job_id: str,
+    ticket: str | None = None,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_stream_clerk_user_id),
+):
+    """
+    Server-sent events with the summary as it is generated.
+    Events: delta {text}, reset (discard text so far), done, error {error}.
+    Finished jobs get their stored summary as a single delta.
+    """
+    user = get_db_user(db, clerk_user_id)
+
+    job = (
+        db.query(VideoJob)
+        .filter(VideoJob.id == job_id, VideoJob.owner_id == user.id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # Read everything needed now: the DB session is closed once streaming starts
+    status, summary, error = job.status, job.summary, job.error
+
+    def sse(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    # Async, so waiting for events doesn't hold one of the threads that
+    # serve the (sync) routes
+    async def events():
+        if status == "done":
+            yield sse({"type": "delta", "text": summary or ""})
+            yield sse({"type": "done"})
+            return
+        if status == "failed":
+            yield sse({"type": "error", "error": error})
+            return
+
+        async for event in iter_summary_events(job_id):
+            if event is None:
+                await renew_stream_ticket(ticket)
+                yield ": keep-alive\n\n"
+            else:
+                yield sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}/trace")
+def get_job_trace(
+    job_id: str,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Timing breakdown of the job's latest pipeline run (spans and per-step totals).
+    """
+    user = get_db_user(db, clerk_user_id)
+
+    job = (
+        db.query(VideoJob)
+        .filter(VideoJob.id == job_id, VideoJob.owner_id == user.id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    queue.enqueue(generate_video_summary, job.id)
+    return get_trace_breakdown(db, job.id)
 
-    return {"status": "queued", "job_id": job.id}
+
+@router.post("/{job_id}/ask")
+def ask_about_video(
+    job_id: str,
+    payload: AskIn,
+    db: Session = Depends(get_db),
+    clerk_user_id: str = Depends(get_current_clerk_user_id),
+):
+    """
+    Answers a follow-up question about a processed video.
+    The transcript/video context is built on the first question and reused after.
+    """
+    user = get_db_user(db, clerk_user_id)
+
+    job = (
+        db.query(VideoJob)
+        .filter(VideoJob.id == job_id, VideoJob.owner_id == user.id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if not payload.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    if not job.transcript:
+        raise HTTPException(status_code=400, detail="This job has no transcript yet")
+
+    try:
+        result = answer_question(job.id, job.transcript, job.summary, payload.question.strip())
+    except Exception as e:
+        print(f"Error answering question for job {job_id}: {e}")
+        raise HTTPException(status_code=502, detail=f"Q&A Error: {str(e)}")
+
+    return {"job_id": job.id, **result}
 
 
 @router.post("/{job_id}/save-as-note")
@@ -280,13 +849,18 @@ def delete_video_job(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    if job.video_url:
-        delete_file_from_gcs(job.video_url)
-    
-    if job.audio_url:
-        delete_file_from_gcs(job.audio_url)
+    cancel_pipeline(job)
 
+    blobs = [job.video_url, job.audio_url]
     db.delete(job)
     db.commit()
 
+    # Blobs and Gemini resources go in the background; blobs still shared
+    # with jobs for identical media are kept (see storage_cleanup.py)
+    try:
+        enqueue_blob_cleanup(blobs, job_id=job_id)
+    except Exception as e:
+        # The storage sweep reclaims the blobs later
+        print(f"Could not enqueue cleanup for job {job_id}: {e}")
+
     return {"deleted": True, "job_id": job_id}
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import secrets
 from functools import lru_cache
 from typing import Any, Dict
 
+import redis
 import requests
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
 
 from app.core.config import settings
+from app.core.redis_conn import async_redis_conn, redis_conn
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -56,7 +59,60 @@ def get_current_clerk_user_id(
     if creds is None or creds.scheme.lower() != "bearer":
         raise HTTPException(status_code=401, detail="Missing Authorization token.")
 
-    token = creds.credentials
+    return _verify_token(creds.credentials)
+
+
+def _stream_ticket_key(ticket: str) -> str:
+    return f"stream-ticket:{ticket}"
+
+
+def issue_stream_ticket(clerk_user_id: str) -> str:
+    """
+    A short-lived ticket for one SSE connection. Browser EventSource
+    connections cannot set an Authorization header, and a JWT in the query
+    string would end up in access logs.
+
+    EventSource reconnects on its own with the same URL, so the ticket can
+    be presented again: it stays valid while its connection is open (see
+    renew_stream_ticket) and for STREAM_TICKET_TTL_SECONDS after its last use.
+    """
+    ticket = secrets.token_urlsafe(32)
+    redis_conn.set(_stream_ticket_key(ticket), clerk_user_id, ex=settings.STREAM_TICKET_TTL_SECONDS)
+    return ticket
+
+
+async def renew_stream_ticket(ticket: str | None):
+    """
+    Keeps an open connection's ticket valid so its reconnect is accepted.
+    Called on each keep-alive; best-effort.
+    """
+    if not ticket:
+        return
+    try:
+        await async_redis_conn.expire(_stream_ticket_key(ticket), settings.STREAM_TICKET_TTL_SECONDS)
+    except redis.RedisError:
+        pass
+
+
+def get_stream_clerk_user_id(
+    creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    ticket: str | None = Query(None),
+) -> str:
+    """
+    Same as get_current_clerk_user_id, but also accepts ?ticket=<ticket>
+    from issue_stream_ticket.
+    """
+    if creds is not None and creds.scheme.lower() == "bearer":
+        return _verify_token(creds.credentials)
+    if ticket:
+        clerk_user_id = redis_conn.getex(_stream_ticket_key(ticket), ex=settings.STREAM_TICKET_TTL_SECONDS)
+        if not clerk_user_id:
+            raise HTTPException(status_code=401, detail="Invalid or expired stream ticket.")
+        return clerk_user_id.decode()
+    raise HTTPException(status_code=401, detail="Missing Authorization token.")
+
+
+def _verify_token(token: str) -> str:
     key = _get_public_key_for_token(token)
 
     try:
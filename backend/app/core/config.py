@@ -20,10 +20,106 @@ class Settings(BaseSettings):
 
     GEMINI_API_KEY: str | None = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    # Summaries are routed by estimated input size (see services/model_router.py)
+    GEMINI_FAST_MODEL: str = os.getenv("GEMINI_FAST_MODEL", "gemini-2.0-flash-lite")
+    GEMINI_LARGE_MODEL: str = os.getenv("GEMINI_LARGE_MODEL", "gemini-2.5-pro")
+    SUMMARY_FAST_MAX_TOKENS: int = 20_000
+    SUMMARY_LARGE_MIN_TOKENS: int = 300_000
+    # Below this many spoken words per minute, the video carries the content
+    SUMMARY_VISUAL_WPM_THRESHOLD: int = 60
+    GEMINI_VIDEO_TOKENS_PER_SECOND: int = 300
+    # Max Gemini requests in flight per process (uploads, polls, deletes, generations)
+    GEMINI_MAX_CONCURRENCY: int = 8
+    # Project-wide Gemini budget shared by all workers through Redis (0 = unlimited)
+    GEMINI_RPM_LIMIT: int = 1000
+    GEMINI_TPM_LIMIT: int = 1_000_000
+    # Token estimate for an attached video whose duration is unknown
+    GEMINI_MEDIA_TOKEN_ESTIMATE: int = 50_000
+    # Object storage (see services/storage.py): "gcs", or "local" to keep
+    # media under STORAGE_LOCAL_DIR (shared by API and workers) with
+    # "signed" URLs served by the API at STORAGE_LOCAL_PUBLIC_URL/storage
+    STORAGE_BACKEND: str = "gcs"
+    STORAGE_LOCAL_DIR: str = ".storage"
+    STORAGE_LOCAL_PUBLIC_URL: str = "http://localhost:8000"
+    STORAGE_LOCAL_SIGNING_KEY: str = "local-storage-dev-key"
     GCS_KEY_PATH: str = os.getenv("GCS_KEY_PATH", "/code/gcs-key.json")
     GCS_BUCKET_NAME: str | None = os.getenv("GCS_BUCKET_NAME")
+    # Shared secret in the Pub/Sub push URL of the bucket's object-finalize
+    # notifications (see api/routes/gcs_notifications.py); unset = disabled
+    GCS_NOTIFICATION_TOKEN: str | None = os.getenv("GCS_NOTIFICATION_TOKEN")
+    # Resumable / parallel upload sessions (GCS resumable URIs last a week)
+    UPLOAD_SESSION_TTL_SECONDS: int = 60 * 60 * 24 * 7
+    # Orphaned blobs (no video_jobs row) older than the min age are deleted
+    # every STORAGE_SWEEP_INTERVAL_SECONDS (0 = never; see jobs/storage_cleanup.py)
+    STORAGE_SWEEP_INTERVAL_SECONDS: int = 60 * 60 * 6
+    STORAGE_SWEEP_MIN_AGE_SECONDS: int = 60 * 60 * 24
     REDIS_URL: str = "redis://redis:6379"
 
+    # Per-job working files handed between pipeline stages
+    SCRATCH_DIR: str = "/tmp/cloud-notes"
+    # Bytes all stages in the container may hold there at once (0 = half the
+    # filesystem; on Cloud Run /tmp is RAM) and how long a stage waits for room
+    SCRATCH_BUDGET_BYTES: int = 0
+    SCRATCH_ADMISSION_TIMEOUT_SECONDS: int = 600
+    # Comma-separated RQ queues this worker serves, highest priority first
+    # (the "-short" lanes first, so short media never waits behind long media)
+    WORKER_QUEUES: str = "video-cpu-short,video-io-short,video-cpu,video-io,video-jobs"
+
+    # Worker processes per container: 1 = a single worker on WORKER_QUEUES;
+    # otherwise a supervisor runs CPU workers (transcription) and I/O workers
+    # (see app/supervisor.py). 0 = size from the CPU count. CPU workers: 0 =
+    # half of them; torch/OpenMP threads per CPU worker: 0 = cores / CPU workers.
+    WORKER_PROCESSES: int = 1
+    WORKER_CPU_PROCESSES: int = 0
+    WORKER_TORCH_THREADS: int = 0
+
+    # Media up to this long (seconds) runs on the short lane
+    SHORT_LANE_MAX_SECONDS: int = 300
+    # Memory (see services/memory.py). Container limit: 0 = read the cgroup.
+    # A horse whose RSS passes HORSE_RSS_LIMIT_BYTES (0 = 90% of the limit) is
+    # killed; a worker process past WORKER_RSS_RECYCLE_BYTES (0 = off) restarts
+    # after its current job. Stages wait up to MEMORY_ADMISSION_TIMEOUT_SECONDS
+    # for their predicted memory to be free; predictions above
+    # LARGE_LANE_MIN_MEMORY_BYTES (0 = off) go to the CPU "-large" queue, served
+    # by big-memory workers with e.g. WORKER_QUEUES=video-cpu-large.
+    WORKER_MEMORY_LIMIT_BYTES: int = 0
+    HORSE_RSS_LIMIT_BYTES: int = 0
+    WORKER_RSS_RECYCLE_BYTES: int = 0
+    MEMORY_ADMISSION_TIMEOUT_SECONDS: int = 600
+    LARGE_LANE_MIN_MEMORY_BYTES: int = 0
+
+    # ffprobe budget when reading an upload's duration at job creation
+    PROBE_TIMEOUT_SECONDS: int = 15
+
+    # Fair-share admission (see jobs/fair_queue.py): pipelines running at once
+    # per user and overall (0 = unlimited). A slot whose pipeline hasn't
+    # started a stage for FAIR_SLOT_TTL_SECONDS is reclaimed.
+    FAIR_USER_CONCURRENCY: int = 2
+    FAIR_MAX_IN_FLIGHT: int = 0
+    FAIR_SLOT_TTL_SECONDS: int = 60 * 60 * 3
+
+    # Summaries are cached by content hash; repeats skip Gemini entirely.
+    SUMMARY_CACHE_TTL_SECONDS: int = 60 * 60 * 24 * 30
+
+    # Transcripts longer than this are summarized map-reduce style
+    SUMMARY_CHUNK_THRESHOLD_CHARS: int = 60_000
+    SUMMARY_CHUNK_CHARS: int = 12_000
+    SUMMARY_MAP_CONCURRENCY: int = 4
+
+    # Partial summary text is kept in Redis this long after a run
+    SUMMARY_STREAM_TTL_SECONDS: int = 60 * 60
+    # SSE tickets stay valid this long after their last use or keep-alive
+    STREAM_TICKET_TTL_SECONDS: int = 60
+
+    # Follow-up Q&A: keep the processed video this long (0 = delete after summarizing;
+    # Gemini drops uploads after 48h) and cache the question context this long.
+    GEMINI_FILE_RETENTION_SECONDS: int = 60 * 60 * 46
+    QA_CONTEXT_TTL_SECONDS: int = 60 * 60
+
+    # OTLP/HTTP collector for pipeline traces, e.g. http://otel-collector:4318
+    # (spans are always stored in video_job_spans and logged)
+    OTEL_EXPORTER_OTLP_ENDPOINT: str | None = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+
     class Config:
         env_file = ".env"
         extra = "ignore"
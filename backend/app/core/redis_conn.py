@@ -0,0 +1,11 @@
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+
+# Shared connection for services that keep state in Redis (caches, streams).
+# redis-py connects lazily, so importing this never blocks startup.
+redis_conn = redis.from_url(settings.REDIS_URL)
+
+# Same, for coroutines on the API's event loop (SSE streams)
+async_redis_conn = redis.asyncio.from_url(settings.REDIS_URL)
@@ -0,0 +1,180 @@
+import contextvars
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Minimal span tracing with OpenTelemetry-compatible ids and export format.
+#
+# A pipeline run is one trace: its id (and a root "pipeline" span id) lives
+# in Redis so every stage, on whatever worker, attaches to it. Inside a
+# stage, `with span("name", attr=...)` records timed, nested spans through
+# contextvars (propagated onto the Gemini loop by run_gemini). Finished
+# spans are collected by the enclosing `record_spans()` block; the caller
+# persists them (video_job_spans) and hands them to export_spans(), which
+# logs OTLP/JSON and POSTs it to OTEL_EXPORTER_OTLP_ENDPOINT when set.
+
+SERVICE_NAME = "cloud-notes-worker"
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    start_time: float  # unix seconds
+    end_time: float | None = None
+    attributes: dict = field(default_factory=dict)
+    error: str | None = None
+
+    def set_attribute(self, key: str, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float | None:
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) * 1000
+
+    def to_otlp(self) -> dict:
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(self.start_time * 1e9)),
+            "endTimeUnixNano": str(int((self.end_time or self.start_time) * 1e9)),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_span_id:
+            otlp["parentSpanId"] = self.parent_span_id
+        return otlp
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+# (trace_id, parent span id) of the code currently running, and where
+# finished spans go
+_context: contextvars.ContextVar[tuple[str, str | None] | None] = contextvars.ContextVar("trace_context", default=None)
+_recorder: contextvars.ContextVar[list | None] = contextvars.ContextVar("trace_recorder", default=None)
+
+
+@contextmanager
+def record_spans(trace_id: str, parent_span_id: str | None = None):
+    """
+    Collects every span finished inside the block into the yielded list.
+    """
+    spans = []
+    context_token = _context.set((trace_id, parent_span_id))
+    recorder_token = _recorder.set(spans)
+    try:
+        yield spans
+    finally:
+        _recorder.reset(recorder_token)
+        _context.reset(context_token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Times the block as a child of the current span. Outside record_spans()
+    the span is still usable but goes nowhere.
+    """
+    context = _context.get()
+    trace_id, parent_span_id = context or (new_trace_id(), None)
+
+    s = Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=new_span_id(),
+        parent_span_id=parent_span_id,
+        start_time=time.time(),
+    )
+    for key, value in attributes.items():
+        s.set_attribute(key, value)
+
+    started = time.perf_counter()
+    token = _context.set((trace_id, s.span_id))
+    try:
+        yield s
+    except BaseException as e:
+        s.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _context.reset(token)
+        s.end_time = s.start_time + (time.perf_counter() - started)
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.append(s)
+
+
+def add_span(s: Span):
+    """
+    Records a span built by hand (e.g. one that started in another process).
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.append(s)
+
+
+def export_spans(spans: list[Span], **resource_attributes):
+    """
+    Emits spans as an OTLP/JSON ExportTraceServiceRequest: one log line, plus
+    a POST to {OTEL_EXPORTER_OTLP_ENDPOINT}/v1/traces if configured.
+    Best-effort.
+    """
+    if not spans:
+        return
+
+    resource = {"service.name": SERVICE_NAME, **resource_attributes}
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute(k, v) for k, v in resource.items()]},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }]
+    }
+    body = json.dumps(payload)
+    logger.info(f"otlp-trace {body}")
+
+    endpoint = settings.OTEL_EXPORTER_OTLP_ENDPOINT
+    if not endpoint:
+        return
+    try:
+        import requests
+
+        requests.post(
+            endpoint.rstrip("/") + "/v1/traces",
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=5,
+        ).raise_for_status()
+    except Exception as e:
+        logger.warning(f"OTLP export failed: {e}")
@@ -0,0 +1,245 @@
+import json
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+
+# Fair-share admission in front of the RQ stage queues.
+#
+# A pipeline run is held in a per-user pending list until it gets a slot.
+# Users are served in virtual-time order (start-time fair queuing, one unit
+# per pipeline): a user who just became backlogged starts at the global
+# clock, so a 50-video bulk upload can't push a single upload from someone
+# else behind it. At most FAIR_USER_CONCURRENCY runs per user (and
+# FAIR_MAX_IN_FLIGHT overall, 0 = unlimited) hold a slot at once; only
+# those reach RQ.
+#
+# Keys (single Redis; the scripts build per-user keys from the prefix):
+#   fair:backlog           ZSET user -> virtual start tag, users with pending runs
+#   fair:vtime             HASH user -> next tag for that user
+#   fair:clock             STRING global virtual time
+#   fair:entries           HASH video job id -> pending run (json)
+#   fair:pending:{user}    LIST video job ids, FIFO
+#   fair:inflight          ZSET "{user}|{job}" -> last heartbeat
+#   fair:inflight:{user}   ZSET job -> last heartbeat
+#   fair:wait:{user}       HASH last / avg (EMA) / count of admission waits
+
+PREFIX = "fair:"
+_BACKLOG = PREFIX + "backlog"
+_VTIME = PREFIX + "vtime"
+_CLOCK = PREFIX + "clock"
+_ENTRIES = PREFIX + "entries"
+_INFLIGHT = PREFIX + "inflight"
+
+# Returns 1 if queued, 0 if the job was already pending.
+_SUBMIT_SCRIPT = """
+local prefix, user, job, entry = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+
+if redis.call('HSETNX', KEYS[3], job, entry) == 0 then
+    return 0
+end
+redis.call('RPUSH', prefix .. 'pending:' .. user, job)
+
+if not redis.call('ZSCORE', KEYS[1], user) then
+    local tag = tonumber(redis.call('HGET', KEYS[2], user)) or 0
+    local clock = tonumber(redis.call('GET', KEYS[4])) or 0
+    redis.call('ZADD', KEYS[1], math.max(tag, clock), user)
+end
+return 1
+"""
+
+# Drops slots whose pipeline stopped heartbeating, then admits runs while
+# capacity lasts. Returns a flat list of job id, entry pairs.
+_DISPATCH_SCRIPT = """
+local backlog, vtime, clock_key, entries, inflight = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local prefix = ARGV[1]
+local user_cap = tonumber(ARGV[2])
+local global_cap = tonumber(ARGV[3])
+local slot_ttl = tonumber(ARGV[4])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+for _, member in ipairs(redis.call('ZRANGEBYSCORE', inflight, '-inf', now - slot_ttl)) do
+    local user, job = string.match(member, '^(.-)|(.*)$')
+    redis.call('ZREM', prefix .. 'inflight:' .. user, job)
+    redis.call('ZREM', inflight, member)
+end
+
+local admitted = {}
+while global_cap <= 0 or redis.call('ZCARD', inflight) < global_cap do
+    local picked = nil
+    local users = redis.call('ZRANGE', backlog, 0, -1, 'WITHSCORES')
+    for i = 1, #users, 2 do
+        if user_cap <= 0 or redis.call('ZCARD', prefix .. 'inflight:' .. users[i]) < user_cap then
+            picked = i
+            break
+        end
+    end
+    if not picked then break end
+
+    local user, tag = users[picked], tonumber(users[picked + 1])
+    local pending = prefix .. 'pending:' .. user
+    local job = redis.call('LPOP', pending)
+    local entry = job and redis.call('HGET', entries, job)
+
+    if entry then
+        redis.call('HDEL', entries, job)
+        redis.call('ZADD', prefix .. 'inflight:' .. user, now, job)
+        redis.call('ZADD', inflight, now, user .. '|' .. job)
+
+        local waited = now - cjson.decode(entry)['enqueued_at']
+        local wait_key = prefix .. 'wait:' .. user
+        local avg = tonumber(redis.call('HGET', wait_key, 'avg')) or waited
+        redis.call('HSET', wait_key, 'last', waited, 'avg', avg * 0.8 + waited * 0.2)
+        redis.call('HINCRBY', wait_key, 'count', 1)
+
+        redis.call('SET', clock_key, tag)
+        redis.call('HSET', vtime, user, tag + 1)
+        table.insert(admitted, job)
+        table.insert(admitted, entry)
+    end
+
+    if redis.call('LLEN', pending) > 0 then
+        if entry then redis.call('ZADD', backlog, tag + 1, user) end
+    else
+        redis.call('ZREM', backlog, user)
+    end
+end
+return admitted
+"""
+
+_submit = redis_conn.register_script(_SUBMIT_SCRIPT)
+_dispatch = redis_conn.register_script(_DISPATCH_SCRIPT)
+
+
+def _now() -> float:
+    seconds, micros = redis_conn.time()
+    return seconds + micros / 1_000_000
+
+
+def _entry(stage: str, media_duration: float | None, kwargs: dict, enqueued_at: float) -> str:
+    return json.dumps({
+        "stage": stage,
+        "media_duration": media_duration,
+        "kwargs": kwargs,
+        "enqueued_at": enqueued_at,
+    })
+
+
+def submit(owner_id, job_id, stage: str, media_duration: float | None = None, **kwargs) -> bool:
+    """
+    Queues a pipeline run for the owner. Returns False if that video job
+    is already waiting for a slot.
+    """
+    return bool(_submit(
+        keys=[_BACKLOG, _VTIME, _ENTRIES, _CLOCK],
+        args=[PREFIX, str(owner_id), str(job_id), _entry(stage, media_duration, kwargs, _now())],
+    ))
+
+
+def submit_many(pipe, runs: list[tuple], **kwargs):
+    """
+    Adds submits of several (owner_id, job_id, stage, media_duration) runs
+    to a Redis pipeline, so bulk imports queue them in one round trip.
+    pipe.execute() returns 1 (queued) or 0 per run, in order.
+    """
+    enqueued_at = _now()
+    for owner_id, job_id, stage, media_duration in runs:
+        _submit(
+            keys=[_BACKLOG, _VTIME, _ENTRIES, _CLOCK],
+            args=[PREFIX, str(owner_id), str(job_id), _entry(stage, media_duration, kwargs, enqueued_at)],
+            client=pipe,
+        )
+
+
+def admit() -> list[tuple[str, dict]]:
+    """
+    Hands out free slots in fair order. Returns the admitted (job id, run)
+    pairs; the caller must enqueue them.
+    """
+    result = _dispatch(
+        keys=[_BACKLOG, _VTIME, _CLOCK, _ENTRIES, _INFLIGHT],
+        args=[PREFIX, settings.FAIR_USER_CONCURRENCY, settings.FAIR_MAX_IN_FLIGHT, settings.FAIR_SLOT_TTL_SECONDS],
+    )
+    return [
+        (result[i].decode(), json.loads(result[i + 1]))
+        for i in range(0, len(result), 2)
+    ]
+
+
+def is_pending(job_id) -> bool:
+    return bool(redis_conn.hexists(_ENTRIES, str(job_id)))
+
+
+def heartbeat(owner_id, job_id):
+    """
+    Keeps a running pipeline's slot from being reclaimed as stale.
+    A no-op for runs that never went through the fair queue.
+    """
+    now = _now()
+    pipe = redis_conn.pipeline()
+    pipe.zadd(f"{PREFIX}inflight:{owner_id}", {str(job_id): now}, xx=True)
+    pipe.zadd(_INFLIGHT, {f"{owner_id}|{job_id}": now}, xx=True)
+    pipe.execute()
+
+
+def release(owner_id, job_id):
+    """
+    Frees the slot of a finished (or permanently failed) pipeline run.
+    """
+    pipe = redis_conn.pipeline()
+    pipe.zrem(f"{PREFIX}inflight:{owner_id}", str(job_id))
+    pipe.zrem(_INFLIGHT, f"{owner_id}|{job_id}")
+    pipe.execute()
+
+
+def cancel(owner_id, job_id):
+    """
+    Drops a pending run and frees its slot if it already had one.
+    """
+    pipe = redis_conn.pipeline()
+    pipe.hdel(_ENTRIES, str(job_id))
+    pipe.lrem(f"{PREFIX}pending:{owner_id}", 0, str(job_id))
+    pipe.execute()
+    release(owner_id, job_id)
+
+
+def get_user_queue_stats(owner_id) -> dict:
+    """
+    Per-user depth and admission wait times (seconds).
+    """
+    pending_key = f"{PREFIX}pending:{owner_id}"
+    pipe = redis_conn.pipeline()
+    pipe.llen(pending_key)
+    pipe.lindex(pending_key, 0)
+    pipe.zcard(f"{PREFIX}inflight:{owner_id}")
+    pipe.hgetall(f"{PREFIX}wait:{owner_id}")
+    pending, head, running, wait = pipe.execute()
+
+    oldest_wait = 0.0
+    if head:
+        raw = redis_conn.hget(_ENTRIES, head)
+        if raw:
+            oldest_wait = max(0.0, _now() - json.loads(raw)["enqueued_at"])
+
+    return {
+        "pending": pending,
+        "running": running,
+        "concurrency_limit": settings.FAIR_USER_CONCURRENCY,
+        "oldest_pending_wait_seconds": round(oldest_wait, 1),
+        "last_wait_seconds": round(float(wait.get(b"last", 0)), 1),
+        "avg_wait_seconds": round(float(wait.get(b"avg", 0)), 1),
+        "admitted": int(wait.get(b"count", 0)),
+    }
+
+
+def get_queue_stats() -> dict:
+    """
+    Depth and waits for every user with pending or running pipelines.
+    """
+    owners = {m.decode() for m in redis_conn.zrange(_BACKLOG, 0, -1)}
+    owners |= {m.decode().split("|", 1)[0] for m in redis_conn.zrange(_INFLIGHT, 0, -1)}
+    return {
+        "in_flight": redis_conn.zcard(_INFLIGHT),
+        "users": {owner: get_user_queue_stats(owner) for owner in sorted(owners)},
+    }
@@ -0,0 +1,170 @@
+import redis
+from rq import Queue
+from rq.registry import FailedJobRegistry, StartedJobRegistry
+
+from app.core.redis_conn import redis_conn
+from app.jobs.pipeline import CPU_QUEUE, IO_QUEUE, LARGE_LANE_SUFFIX, LEGACY_QUEUE, SHORT_LANE_SUFFIX
+from app.services.memory import read_rss_bytes
+
+# Prometheus text-format metrics for the worker health server.
+#
+# Stages run in forked horses, so their latencies are accumulated in a Redis
+# hash per worker (keyed by the RQ worker name) and rendered by the process
+# serving the health port (the worker, or the supervisor for all of its
+# workers). Each container only reports its own workers, so summing across
+# instances in Prometheus is correct. Queue gauges are cluster-wide:
+# aggregate with max(). Throughput in jobs/hour is
+# rate(video_stage_duration_seconds_count{stage="summarize",outcome="ok"}[1h]) * 3600.
+
+STAGE_LATENCY_BUCKETS = [1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200]
+
+PIPELINE_QUEUES = [
+    CPU_QUEUE + SHORT_LANE_SUFFIX,
+    IO_QUEUE + SHORT_LANE_SUFFIX,
+    CPU_QUEUE,
+    IO_QUEUE,
+    CPU_QUEUE + LARGE_LANE_SUFFIX,
+    LEGACY_QUEUE,
+]
+
+
+def _latency_key(worker_name: str) -> str:
+    return f"metrics:worker:{worker_name}:stage-latency"
+
+
+def record_stage_latency(worker_name: str | None, stage: str, outcome: str, seconds: float):
+    """
+    Adds one stage run to the worker's latency histogram. Best-effort.
+    """
+    if not worker_name:
+        return
+
+    key = _latency_key(worker_name)
+    prefix = f"{stage}|{outcome}"
+    try:
+        pipe = redis_conn.pipeline()
+        for bound in STAGE_LATENCY_BUCKETS:
+            if seconds <= bound:
+                pipe.hincrby(key, f"{prefix}|{bound}", 1)
+        pipe.hincrby(key, f"{prefix}|+Inf", 1)
+        pipe.hincrbyfloat(key, f"{prefix}|sum", seconds)
+        pipe.expire(key, 60 * 60 * 24 * 7)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"Could not record stage latency: {e}")
+
+
+def _line(name: str, value, **labels) -> str:
+    if labels:
+        rendered = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+def completed_pipelines(workers) -> int:
+    """
+    Pipeline runs these workers finished (successful last stages).
+    """
+    total = 0
+    for worker in workers:
+        value = redis_conn.hget(_latency_key(worker.name), "summarize|ok|+Inf")
+        total += int(value or 0)
+    return total
+
+
+def render_metrics(workers: list, speech_model_loaded: bool, processes: dict[str, int | None]) -> str:
+    """
+    Metrics for the container's RQ workers in Prometheus text format.
+    processes maps a label (e.g. "worker", "horse", "cpu-0") to a pid
+    (None = this process) for the RSS gauge.
+    """
+    lines = []
+
+    lines += [
+        "# HELP video_queue_depth Jobs waiting in the RQ queue.",
+        "# TYPE video_queue_depth gauge",
+    ]
+    started, failed = [], []
+    for name in PIPELINE_QUEUES:
+        queue = Queue(name, connection=redis_conn)
+        lines.append(_line("video_queue_depth", len(queue), queue=name))
+        started.append(_line("video_queue_started_jobs", len(StartedJobRegistry(name, connection=redis_conn)), queue=name))
+        failed.append(_line("video_queue_failed_jobs", len(FailedJobRegistry(name, connection=redis_conn)), queue=name))
+
+    lines += [
+        "# HELP video_queue_started_jobs Jobs currently running (StartedJobRegistry).",
+        "# TYPE video_queue_started_jobs gauge",
+        *started,
+        "# HELP video_queue_failed_jobs Jobs in the FailedJobRegistry.",
+        "# TYPE video_queue_failed_jobs gauge",
+        *failed,
+    ]
+
+    # What each worker's horse is doing right now
+    busy, in_flight = [], []
+    for worker in workers:
+        current = worker.get_current_job()
+        busy.append(_line("video_worker_busy", 1 if current else 0, worker=worker.name))
+        if current and len(current.args) > 1:
+            in_flight.append(_line("video_worker_in_flight_stage", 1, worker=worker.name, stage=current.args[1]))
+    lines += [
+        "# HELP video_worker_busy 1 while the worker runs a job.",
+        "# TYPE video_worker_busy gauge",
+        *busy,
+        "# HELP video_worker_in_flight_stage Pipeline stage the worker is running.",
+        "# TYPE video_worker_in_flight_stage gauge",
+        *in_flight,
+    ]
+
+    lines += [
+        "# HELP video_stage_duration_seconds Pipeline stage run time on these workers.",
+        "# TYPE video_stage_duration_seconds histogram",
+    ]
+    combined = {}
+    for worker in workers:
+        for field, value in redis_conn.hgetall(_latency_key(worker.name)).items():
+            combined[field] = combined.get(field, 0) + float(value)
+    lines += _render_histogram(combined)
+
+    lines += [
+        "# HELP process_resident_memory_bytes Resident memory of the worker processes.",
+        "# TYPE process_resident_memory_bytes gauge",
+    ]
+    for label, pid in processes.items():
+        rss = read_rss_bytes(pid)
+        if rss is not None:
+            lines.append(_line("process_resident_memory_bytes", rss, process=label))
+
+    from app.services.scratch import usage as scratch_usage
+
+    lines += [
+        "# HELP video_scratch_bytes Scratch space held by running stages, cached between stages, and the budget.",
+        "# TYPE video_scratch_bytes gauge",
+        *[_line("video_scratch_bytes", value, state=state) for state, value in scratch_usage().items()],
+    ]
+
+    lines += [
+        "# HELP video_worker_speech_model_loaded 1 once the Whisper model is in memory.",
+        "# TYPE video_worker_speech_model_loaded gauge",
+        _line("video_worker_speech_model_loaded", 1 if speech_model_loaded else 0),
+    ]
+
+    return "\n".join(lines) + "\n"
+
+
+def _render_histogram(fields: dict) -> list[str]:
+    series = {}
+    for raw_field, value in fields.items():
+        stage, outcome, bound = raw_field.decode().split("|")
+        series.setdefault((stage, outcome), {})[bound] = str(int(value)) if value.is_integer() else str(value)
+
+    lines = []
+    for (stage, outcome), values in sorted(series.items()):
+        for bound in [str(b) for b in STAGE_LATENCY_BUCKETS] + ["+Inf"]:
+            lines.append(_line(
+                "video_stage_duration_seconds_bucket", values.get(bound, "0"),
+                stage=stage, outcome=outcome, le=bound,
+            ))
+        lines.append(_line("video_stage_duration_seconds_sum", values.get("sum", "0"), stage=stage, outcome=outcome))
+        lines.append(_line("video_stage_duration_seconds_count", values.get("+Inf", "0"), stage=stage, outcome=outcome))
+    return lines
@@ -0,0 +1,287 @@
+import json
+import time
+
+from rq import Queue, Retry
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+from app.core.tracing import Span, new_span_id, new_trace_id
+from app.jobs import fair_queue
+from app.services.memory import predicted_memory_bytes
+
+# The video pipeline runs as one RQ job per stage. Each stage persists its
+# output (DB columns, GCS blobs, the per-job scratch dir) and enqueues the
+# next stage on the queue that matches its resource profile, so CPU workers
+# (ffmpeg, Whisper) and I/O workers (GCS, Gemini) scale independently and a
+# retry only repeats the stage that failed.
+#
+# New runs don't go to RQ directly: they wait in the per-user fair queue
+# (fair_queue.py) until the owner has a free slot, and give the slot back
+# when the last stage finishes or the run fails for good.
+
+STAGES = ["fetch", "extract", "transcribe", "upload_audio", "summarize"]
+
+CPU_QUEUE = "video-cpu"
+IO_QUEUE = "video-io"
+# Jobs enqueued before the pipeline was split still land here
+LEGACY_QUEUE = "video-jobs"
+
+STAGE_QUEUES = {
+    "fetch": IO_QUEUE,
+    "extract": CPU_QUEUE,
+    "transcribe": CPU_QUEUE,
+    "upload_audio": IO_QUEUE,
+    "summarize": IO_QUEUE,
+}
+
+# Media of known duration runs on the lane that matches its length: each
+# stage queue has a "-short" twin that workers drain first. CPU stages
+# predicted to need more memory than LARGE_LANE_MIN_MEMORY_BYTES go to
+# video-cpu-large, served by big-memory workers (only when that setting is on).
+SHORT_LANE_SUFFIX = "-short"
+LARGE_LANE_SUFFIX = "-large"
+
+# Timeouts when the media duration is unknown
+STAGE_TIMEOUTS = {
+    "fetch": 1800,
+    "extract": 1800,
+    "transcribe": 3600,
+    "upload_audio": 1800,
+    "summarize": 1800,
+}
+
+# Otherwise: seconds of stage time allowed per second of media, with a floor
+STAGE_TIMEOUT_PER_MEDIA_SECOND = {
+    "fetch": 0.5,
+    "extract": 0.5,
+    "transcribe": 3.0,
+    "upload_audio": 0.5,
+    "summarize": 1.0,
+}
+STAGE_TIMEOUT_FLOOR = 300
+
+# Status shown to the client while a stage runs
+STAGE_STATUS = {
+    "fetch": "processing",
+    "extract": "processing",
+    "transcribe": "transcribing",
+    "upload_audio": "transcribed",
+    "summarize": "summarizing",
+}
+
+STAGE_RETRY = Retry(max=2, interval=[30, 120])
+
+# RQ states in which a stage still counts as in flight
+ACTIVE_STATUSES = {"queued", "started", "deferred", "scheduled"}
+
+
+def get_queue(name: str) -> Queue:
+    return Queue(name, connection=redis_conn)
+
+
+def stage_queue(stage: str, media_duration: float | None = None) -> str:
+    name = STAGE_QUEUES[stage]
+    if media_duration is not None and media_duration <= settings.SHORT_LANE_MAX_SECONDS:
+        return name + SHORT_LANE_SUFFIX
+    # Only CPU stages hold the media in memory; there is no I/O large lane
+    large = settings.LARGE_LANE_MIN_MEMORY_BYTES
+    if name == CPU_QUEUE and large > 0 and predicted_memory_bytes(stage, media_duration) > large:
+        return name + LARGE_LANE_SUFFIX
+    return name
+
+
+def stage_timeout(stage: str, media_duration: float | None = None) -> int:
+    if media_duration is None:
+        return STAGE_TIMEOUTS[stage]
+    return int(max(STAGE_TIMEOUT_FLOOR, media_duration * STAGE_TIMEOUT_PER_MEDIA_SECOND[stage]))
+
+
+def next_stage(stage: str) -> str | None:
+    i = STAGES.index(stage)
+    return STAGES[i + 1] if i + 1 < len(STAGES) else None
+
+
+def resume_stage(job) -> str:
+    """
+    Where a (re)run of this job should start.
+    """
+    if job.transcript:
+        # Interrupted between transcription and the audio upload
+        if job.stage == "transcribe" and not job.audio_url:
+            return "upload_audio"
+        return "summarize"
+
+    if job.stage in ("fetch", "extract"):
+        return next_stage(job.stage)
+    return "fetch"
+
+
+def stage_job_id(job_id, stage: str) -> str:
+    """
+    Deterministic RQ job id per (video job, stage).
+    """
+    return f"video-job-{job_id}-{stage}"
+
+
+def _active_key(job_id) -> str:
+    # Points at the RQ job of the pipeline's current stage
+    return f"video-job:{job_id}:active-stage"
+
+
+def _is_active(rq_job_id: str) -> bool:
+    try:
+        return Job.fetch(rq_job_id, connection=redis_conn).get_status() in ACTIVE_STATUSES
+    except NoSuchJobError:
+        return False
+
+
+def pipeline_in_flight(job_id) -> bool:
+    """
+    True while the run waits for a fair-queue slot or any stage of this
+    video job is queued, running or awaiting a retry.
+    """
+    if fair_queue.is_pending(job_id):
+        return True
+    current = redis_conn.get(_active_key(job_id))
+    return bool(current) and _is_active(current.decode())
+
+
+def enqueue_stage(job_id, stage: str, media_duration: float | None = None, **kwargs):
+    """
+    Enqueues one stage under its deterministic id, on the lane and with the
+    timeout for the media duration; a no-op (returns None) if that exact
+    stage is already queued or running.
+    """
+    rq_job_id = stage_job_id(job_id, stage)
+    if _is_active(rq_job_id):
+        return None
+
+    rq_job = get_queue(stage_queue(stage, media_duration)).enqueue(
+        "app.jobs.video_summary.run_stage",
+        job_id,
+        stage,
+        job_id=rq_job_id,
+        job_timeout=stage_timeout(stage, media_duration),
+        retry=STAGE_RETRY,
+        **kwargs,
+    )
+    redis_conn.set(_active_key(job_id), rq_job_id, ex=60 * 60 * 24)
+    return rq_job
+
+
+def _trace_key(job_id) -> str:
+    # Trace id and root span of the current run, shared by all its stages
+    return f"video-job:{job_id}:trace"
+
+
+def _begin_trace(job_id, client=redis_conn) -> dict:
+    trace = {"trace_id": new_trace_id(), "span_id": new_span_id(), "start": time.time()}
+    client.set(_trace_key(job_id), json.dumps(trace), ex=60 * 60 * 24)
+    return trace
+
+
+def get_pipeline_trace(job_id) -> dict:
+    """
+    {"trace_id", "span_id" (the root span), "start"} of the job's current run.
+    """
+    raw = redis_conn.get(_trace_key(job_id))
+    # Runs started before tracing, or whose trace expired, get a fresh one
+    return json.loads(raw) if raw else _begin_trace(job_id)
+
+
+def end_pipeline_trace(job) -> Span | None:
+    """
+    Closes the run's root "pipeline" span.
+    """
+    raw = redis_conn.getdel(_trace_key(job.id))
+    if not raw:
+        return None
+
+    trace = json.loads(raw)
+    root = Span(
+        name="pipeline",
+        trace_id=trace["trace_id"],
+        span_id=trace["span_id"],
+        parent_span_id=None,
+        start_time=trace["start"],
+        end_time=time.time(),
+        error=job.error if job.status == "failed" else None,
+    )
+    root.set_attribute("job.status", job.status)
+    root.set_attribute("media.duration_seconds", job.duration_seconds)
+    root.set_attribute("memory.peak_rss_bytes", job.peak_rss_bytes)
+    if job.duration_seconds:
+        root.set_attribute("real_time_factor", (root.end_time - root.start_time) / job.duration_seconds)
+    return root
+
+
+def start_pipeline(job, **kwargs) -> bool:
+    """
+    Queues a run from the job's next stage (see resume_stage) in the owner's
+    fair queue unless a run is already in flight, in which case the request
+    is coalesced into it. Returns True if a new run was queued.
+    """
+    # Serialize concurrent submissions for the same video job
+    with redis_conn.lock(f"video-job:{job.id}:enqueue-lock", timeout=10, blocking_timeout=10):
+        if pipeline_in_flight(job.id):
+            return False
+        queued = fair_queue.submit(
+            job.owner_id, job.id, resume_stage(job), media_duration=job.duration_seconds, **kwargs
+        )
+        if queued:
+            _begin_trace(job.id)
+
+    dispatch_pending()
+    return queued
+
+
+def start_new_pipelines(jobs: list, **kwargs) -> int:
+    """
+    start_pipeline for a batch of freshly created jobs (nothing can be in
+    flight for them yet): their runs are queued with one pipelined Redis
+    round trip. Returns how many were queued.
+    """
+    if not jobs:
+        return 0
+
+    pipe = redis_conn.pipeline(transaction=False)
+    fair_queue.submit_many(
+        pipe, [(job.owner_id, job.id, resume_stage(job), job.duration_seconds) for job in jobs], **kwargs
+    )
+    for job in jobs:
+        _begin_trace(job.id, client=pipe)
+    queued = sum(pipe.execute()[:len(jobs)])
+
+    dispatch_pending()
+    return queued
+
+
+def finish_pipeline(job):
+    """
+    Releases the job's fair-queue slot once its run is over and admits
+    whoever is next.
+    """
+    fair_queue.release(job.owner_id, job.id)
+    dispatch_pending()
+
+
+def cancel_pipeline(job):
+    """
+    Drops the job's pending run or its slot (e.g. the job is being deleted;
+    stages already on RQ find the job gone and stop).
+    """
+    fair_queue.cancel(job.owner_id, job.id)
+    dispatch_pending()
+
+
+def dispatch_pending() -> int:
+    """
+    Moves runs that got a fair-queue slot onto the RQ stage queues.
+    Returns how many were started.
+    """
+    admitted = fair_queue.admit()
+    for job_id, run in admitted:
+        enqueue_stage(job_id, run["stage"], run.get("media_duration"), **run["kwargs"])
+    return len(admitted)
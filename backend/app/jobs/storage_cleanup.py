@@ -0,0 +1,144 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from rq import Retry
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+from app.db.session import SessionLocal
+from app.jobs.pipeline import IO_QUEUE, get_queue
+from app.models.video_job import VideoJob
+from app.services.gcs import delete_blobs, list_blob_names
+from app.services.media_dedup import blob_in_use
+from app.services.upload_jobs import expire_pending_uploads
+from app.services.upload_sessions import live_upload_sessions
+
+# Storage cleanup runs on the I/O workers, off the request path:
+#
+#   cleanup_blobs         deletes the blobs of deleted jobs (and other
+#                         garbage) with GCS batch requests, plus the job's
+#                         Gemini leftovers
+#   sweep_orphaned_blobs  expires pending_upload jobs whose upload never
+#                         arrived, diffs the videos/ and audio/ prefixes
+#                         against the video_jobs rows and deletes what no job
+#                         references, and parts of upload sessions that expired
+#
+# Cleanup re-checks each blob against the DB right before deleting it (a
+# job for identical media may share it by then). The sweep only touches
+# blobs older than STORAGE_SWEEP_MIN_AGE_SECONDS, since uploads land in GCS
+# before their row is written.
+
+CLEANUP_RETRY = Retry(max=3, interval=[60, 300, 900])
+
+SWEPT_PREFIXES = ["videos/", "audio/"]
+UPLOAD_PARTS_PREFIX = "uploads/"
+
+# Blob names per DB lookup when sweeping
+SWEEP_QUERY_CHUNK = 500
+
+
+def enqueue_blob_cleanup(blob_names: list[str], job_id=None):
+    """
+    Deletes blob_names in the background (those no job references by then),
+    and the Gemini resources of job_id if given.
+    """
+    blob_names = [name for name in blob_names if name]
+    if not blob_names and job_id is None:
+        return None
+    return get_queue(IO_QUEUE).enqueue(
+        cleanup_blobs,
+        blob_names,
+        str(job_id) if job_id else None,
+        job_timeout=1800,
+        retry=CLEANUP_RETRY,
+    )
+
+
+def cleanup_blobs(blob_names: list[str], job_id: str | None = None):
+    if job_id:
+        from app.services.gemini_files import release_retained_gemini_file
+        from app.services.gemini_qa import drop_qa_context
+
+        # Best-effort: provider-side Q&A context and the retained video
+        try:
+            drop_qa_context(job_id)
+            release_retained_gemini_file(job_id)
+        except Exception as e:
+            print(f"Failed to clean up Gemini resources for job {job_id}: {e}")
+
+    db = SessionLocal()
+    try:
+        # A job for identical media may have started sharing a blob since
+        unused = [name for name in blob_names if not blob_in_use(db, name)]
+    finally:
+        db.close()
+
+    failed = delete_blobs(unused)
+    if failed:
+        # RQ retries the job; blobs deleted meanwhile count as done
+        raise RuntimeError(f"Could not delete {len(failed)} blobs: {failed[:5]}")
+
+
+def _referenced(db, blob_names: list[str]) -> set[str]:
+    referenced = set()
+    for i in range(0, len(blob_names), SWEEP_QUERY_CHUNK):
+        chunk = blob_names[i:i + SWEEP_QUERY_CHUNK]
+        referenced.update(
+            url for (url,) in db.query(VideoJob.video_url).filter(VideoJob.video_url.in_(chunk))
+        )
+        referenced.update(
+            url for (url,) in db.query(VideoJob.audio_url).filter(VideoJob.audio_url.in_(chunk))
+        )
+    return referenced
+
+
+def sweep_orphaned_blobs(dry_run: bool = False) -> dict:
+    """
+    Deletes blobs old enough that no job references (and parts of upload
+    sessions that no longer exist), after expiring stale pending_upload
+    jobs. Returns the counts per prefix (and of expired jobs).
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.STORAGE_SWEEP_MIN_AGE_SECONDS)
+    # An upload session may still be feeding a registration until it expires
+    pending_cutoff = now - timedelta(
+        seconds=max(settings.STORAGE_SWEEP_MIN_AGE_SECONDS, settings.UPLOAD_SESSION_TTL_SECONDS)
+    )
+    orphans = {}
+
+    db = SessionLocal()
+    try:
+        expired = expire_pending_uploads(db, pending_cutoff, dry_run=dry_run)
+        for prefix in SWEPT_PREFIXES:
+            names = list_blob_names(prefix, created_before=cutoff)
+            referenced = _referenced(db, names)
+            orphans[prefix] = [name for name in names if name not in referenced]
+    finally:
+        db.close()
+
+    parts = list_blob_names(UPLOAD_PARTS_PREFIX, created_before=cutoff)
+    alive = live_upload_sessions({name.split("/")[1] for name in parts})
+    orphans[UPLOAD_PARTS_PREFIX] = [name for name in parts if name.split("/")[1] not in alive]
+
+    counts = {prefix: len(names) for prefix, names in orphans.items()}
+    print(f"Storage sweep{' (dry run)' if dry_run else ''}: orphaned blobs {counts}, "
+          f"expired pending uploads {expired}")
+    counts["pending_upload"] = expired
+    if not dry_run:
+        for names in orphans.values():
+            delete_blobs(names)
+    return counts
+
+
+def schedule_storage_sweeps(interval: int = 60):
+    """
+    Enqueues a sweep every STORAGE_SWEEP_INTERVAL_SECONDS across all
+    workers (whoever sets the Redis marker first enqueues it).
+    """
+    while settings.STORAGE_SWEEP_INTERVAL_SECONDS > 0:
+        try:
+            if redis_conn.set("storage:sweep-scheduled", 1, nx=True, ex=settings.STORAGE_SWEEP_INTERVAL_SECONDS):
+                get_queue(IO_QUEUE).enqueue(sweep_orphaned_blobs, job_timeout=3600)
+        except Exception as e:
+            print(f"Could not schedule storage sweep: {e}")
+        time.sleep(interval)
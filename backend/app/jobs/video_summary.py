@@ -1,56 +1,235 @@
-from app.services.audio import extract_audio
-from app.services.gcs import download_video_from_gcs, upload_audio_to_gcs
+from app.services.audio import extract_audio, probe_duration
+from app.services.gcs import download_video_from_gcs, download_blob_from_gcs, upload_audio_to_gcs, get_blob_digest, get_blob_size
 from app.db.session import SessionLocal
 from app.models.video_job import VideoJob
-from app.services.speech import transcribe_audio
-from app.services.gemini_summarizer import summarize_transcript
-from app.services.gemini_files import upload_file_to_gemini, delete_file_from_gemini
+from app.services.gemini_summarizer import summarize_transcript, lookup_cached_summary
+from app.services.gemini_files import upload_file_to_gemini, delete_file_from_gemini, retain_gemini_file
+from app.core.config import settings
+from app.services.summary_stream import SummaryStreamPublisher
+from app.services.job_events import publish_job_event
+from app.jobs import fair_queue
+from app.jobs.pipeline import (
+    STAGE_RETRY,
+    STAGE_STATUS,
+    end_pipeline_trace,
+    enqueue_stage,
+    finish_pipeline,
+    get_pipeline_trace,
+    next_stage,
+    start_pipeline,
+)
+from app.core.tracing import add_span, record_spans, span
+from app.services.job_traces import save_spans
+from app.jobs.metrics import record_stage_latency
+from app.services.scratch import job_dir, job_scratch, remove_job_scratch
+from app.services.memory import MemorySampler, horse_rss_limit_bytes, predicted_memory_bytes, wait_for_memory
+from rq import get_current_job
 import os
 
 
 import logging
 logger = logging.getLogger(__name__)
 
-def generate_video_summary(job_id: str):
-    logger.info(f"Starting job {job_id}")
+
+def generate_video_summary(job_id: str, use_cache: bool = True):
+    """
+    Entry point kept for jobs enqueued before the pipeline was split into
+    stages: starts (or resumes) the staged pipeline for the job.
+    """
     db = SessionLocal()
     try:
         job = db.query(VideoJob).get(job_id)
-
         if not job:
             logger.warning(f"Job {job_id} not found in database")
             return
 
-        logger.info(f"Processing job {job_id} for file {job.filename}")
+        start_pipeline(job, use_cache=use_cache)
+    finally:
+        db.close()
 
-        video_path = None
-        gemini_file = None
-        audio_path = None
 
-        try:
-            # 1️⃣ Transcribe if needed
-            if not job.transcript:
-                job.status = "processing"
-                db.commit()
-
-                video_path = download_video_from_gcs(job.video_url)
-                audio_path = extract_audio(video_path)
-                audio_url = upload_audio_to_gcs(audio_path)
-
-                job.audio_url = audio_url
-                job.status = "transcribing"
-                db.commit()
-
-                job.transcript = transcribe_audio(audio_path)
-                job.status = "transcribed"
-                db.commit()
-            
-            # 2️⃣ Generate Summary
-            job.status = "summarizing"
+def run_stage(job_id: str, stage: str, use_cache: bool = True):
+    """
+    Runs one pipeline stage, records it as the job's last completed stage
+    and enqueues the next one. The stage and the service calls it makes are
+    traced as spans of the run (stored in video_job_spans).
+    """
+    logger.info(f"Starting stage {stage} for job {job_id}")
+    db = SessionLocal()
+    trace = get_pipeline_trace(job_id)
+    try:
+        with record_spans(trace["trace_id"], trace["span_id"]) as spans:
+            try:
+                _run_stage(db, job_id, stage, use_cache)
+            finally:
+                save_spans(db, job_id, spans)
+    finally:
+        db.close()
+
+
+def _run_stage(db, job_id: str, stage: str, use_cache: bool):
+    job = db.query(VideoJob).get(job_id)
+
+    if not job:
+        logger.warning(f"Job {job_id} not found in database")
+        return
+
+    fair_queue.heartbeat(job.owner_id, job.id)
+    # Clients follow progress through job events; only persist real changes
+    if job.status != STAGE_STATUS[stage] or job.error:
+        job.status = STAGE_STATUS[stage]
+        job.error = None
+        db.commit()
+    publish_job_event(job.owner_id, job.id, job.status, stage, "started")
+
+    rq_job = get_current_job()
+    worker_name = getattr(rq_job, "worker_name", None)
+    stage_span = sampler = None
+    try:
+        with span(f"stage.{stage}", attempt=_attempt(rq_job)) as stage_span:
+            reserve = _scratch_bytes_needed(job, stage)
+            stage_span.set_attribute("scratch.reserved_bytes", reserve)
+            wait_for_memory(
+                predicted_memory_bytes(stage, job.duration_seconds, _speech_model_loaded(stage)),
+                settings.MEMORY_ADMISSION_TIMEOUT_SECONDS,
+            )
+            with job_scratch(job.id, reserve), MemorySampler(job.id, horse_rss_limit_bytes()) as sampler:
+                STAGE_HANDLERS[stage](db, job, use_cache=use_cache)
+            stage_span.set_attribute("memory.peak_rss_bytes", sampler.peak)
+        # Duration may only be known once the fetch stage probed it
+        stage_span.set_attribute("media.duration_seconds", job.duration_seconds)
+        if job.duration_seconds:
+            stage_span.set_attribute("real_time_factor", stage_span.duration_ms / 1000 / job.duration_seconds)
+    except Exception as e:
+        logger.error(f"Error in stage {stage} of job {job_id}: {e}")
+        if stage_span:
+            record_stage_latency(worker_name, stage, "error", stage_span.duration_ms / 1000)
+        if sampler:
+            _record_peak_rss(job, sampler.peak)
+        if _will_retry():
+            logger.info(f"Stage {stage} of job {job_id} will be retried")
             db.commit()
+            raise
+
+        _fail_run(db, job, stage, str(e))
+        raise
+
+    record_stage_latency(worker_name, stage, "ok", stage_span.duration_ms / 1000)
+    _record_peak_rss(job, sampler.peak)
+    job.stage = stage
+    db.commit()
+    publish_job_event(job.owner_id, job.id, job.status, stage, "completed")
+    logger.info(f"Stage {stage} of job {job_id} took {stage_span.duration_ms / 1000:.1f}s")
+
+    following = next_stage(stage)
+    if following:
+        enqueue_stage(job.id, following, job.duration_seconds, use_cache=use_cache)
+    else:
+        _remove_scratch(job.id)
+        _end_run(job)
+
+
+def _end_run(job):
+    root = end_pipeline_trace(job)
+    if root:
+        add_span(root)
+    finish_pipeline(job)
+
+
+def _fail_run(db, job, stage: str, error: str):
+    job.status = "failed"
+    job.error = error
+    db.commit()
+    publish_job_event(job.owner_id, job.id, job.status, stage, "failed", error=job.error)
+    _remove_scratch(job.id)
+    _end_run(job)
+
+
+def _speech_model_loaded(stage: str) -> bool:
+    if stage != "transcribe":
+        return False
+    # Only transcribing workers import (and preload) the model
+    from app.services.speech import is_model_loaded
+    return is_model_loaded()
+
+
+def _record_peak_rss(job, peak: int):
+    # Highest over all stages (and attempts) of the run
+    job.peak_rss_bytes = max(job.peak_rss_bytes or 0, peak)
+
+
+def fail_killed_stage(job_id: str, stage: str, error: str):
+    """
+    Fails a run whose horse was killed (stage timeout, memory watchdog, OOM)
+    with no retries left: the horse never got to record the failure itself.
+    """
+    db = SessionLocal()
+    try:
+        job = db.query(VideoJob).get(job_id)
+        if not job or job.status in ("done", "failed"):
+            return
+        trace = get_pipeline_trace(job_id)
+        with record_spans(trace["trace_id"], trace["span_id"]) as spans:
+            _fail_run(db, job, stage, error)
+        save_spans(db, job_id, spans)
+    finally:
+        db.close()
+
+
+# --------------------
+# Stages
+# --------------------
+def _fetch(db, job, **kwargs):
+    video_path = _ensure_video(job)
+    if job.duration_seconds is None:
+        job.duration_seconds = probe_duration(video_path)
+        db.commit()
+
+
+def _extract(db, job, **kwargs):
+    _ensure_audio(job)
+
+
+def _transcribe(db, job, **kwargs):
+    # Imported here so I/O-only workers never load the Whisper model
+    from app.services.speech import transcribe_audio
+
+    job.transcript = transcribe_audio(_ensure_audio(job))
+    db.commit()
 
-            if not video_path:
-                video_path = download_video_from_gcs(job.video_url)
+
+def _upload_audio(db, job, **kwargs):
+    if job.audio_url:
+        return
+    job.audio_url = upload_audio_to_gcs(_ensure_audio(job))
+    db.commit()
+
+
+def _summarize(db, job, use_cache: bool = True, **kwargs):
+    stream = SummaryStreamPublisher(job.id)
+    gemini_file = None
+
+    try:
+        media_digest = job.content_digest
+        if not media_digest and job.video_url:
+            try:
+                media_digest = get_blob_digest(job.video_url)
+            except Exception as e:
+                logger.warning(f"Could not read digest for {job.video_url}: {e}")
+
+        # Identical transcript + video + prompt + model: reuse the summary
+        # without downloading or uploading anything.
+        summary = (
+            lookup_cached_summary(job.transcript, media_digest, job.duration_seconds)
+            if use_cache else None
+        )
+
+        if summary is not None:
+            stream.write(summary)
+        else:
+            video_path = _ensure_video(job)
+            if job.duration_seconds is None:
+                job.duration_seconds = probe_duration(video_path)
 
             try:
                 gemini_file = upload_file_to_gemini(video_path)
@@ -58,39 +237,134 @@ def generate_video_summary(job_id: str):
                 logger.warning(f"Failed to upload video to Gemini: {e}")
                 gemini_file = None
 
-            job.summary = summarize_transcript(job.transcript, gemini_file)
-            job.status = "done"
-            db.commit()
+            summary = summarize_transcript(
+                job.transcript,
+                gemini_file,
+                media_digest=media_digest if gemini_file else None,
+                media_duration=job.duration_seconds,
+                use_cache=False,
+                stream=stream,
+            )
+
+        job.summary = summary
+        job.status = "done"
+        db.commit()
+        stream.close()
+
+    except Exception as e:
+        if _will_retry():
+            # The retry streams from scratch
+            stream.reset()
+        else:
+            stream.fail(str(e))
+        raise
 
-        except Exception as e:
-            logger.error(f"Error in job {job_id}: {e}")
-            job.status = "failed"
-            job.error = str(e)
-            db.commit()
-            raise
-        
-        finally:
-            # Cleanup Gemini file
-            if gemini_file:
-                delete_file_from_gemini(gemini_file.name)
-            
-            # Cleanup local video file if it exists
-            if video_path and os.path.exists(video_path):
-                try:
-                    os.remove(video_path)
-                except:
-                    pass
-            
-            # Cleanup extracted audio if it exists
-            if audio_path and os.path.exists(audio_path):
-                try:
-                    # Check if it's a file or directory (based on how extract_audio works)
-                    if os.path.isdir(audio_path):
-                        import shutil
-                        shutil.rmtree(audio_path)
-                    else:
-                        os.remove(audio_path)
-                except:
-                    pass
     finally:
-        db.close()
+        # Cleanup Gemini file, or keep it for follow-up questions (/ask)
+        if gemini_file:
+            if job.status == "done" and settings.GEMINI_FILE_RETENTION_SECONDS > 0:
+                retain_gemini_file(job.id, gemini_file.name)
+            else:
+                delete_file_from_gemini(gemini_file.name)
+
+
+STAGE_HANDLERS = {
+    "fetch": _fetch,
+    "extract": _extract,
+    "transcribe": _transcribe,
+    "upload_audio": _upload_audio,
+    "summarize": _summarize,
+}
+
+
+# --------------------
+# Scratch files
+# --------------------
+# Stages hand local files to each other through a per-job scratch dir. When a
+# stage lands on a worker that doesn't have them (another container, or the
+# dir was evicted), they are rebuilt from durable storage instead. Each stage
+# reserves the bytes it may write under the container's scratch budget
+# (see services/scratch.py).
+
+# 16 kHz mono 16-bit PCM, as written by extract_audio
+WAV_BYTES_PER_SECOND = 16000 * 2
+
+
+def _scratch_dir(job_id) -> str:
+    path = job_dir(job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _remove_scratch(job_id):
+    remove_job_scratch(job_id)
+
+
+def _scratch_bytes_needed(job, stage: str) -> int:
+    """
+    Estimated bytes of the local files the stage reads or writes: what is
+    already on disk, else the blob size / expected WAV size.
+    """
+    path = job_dir(job.id)
+
+    def local_size(name: str) -> int | None:
+        try:
+            return os.path.getsize(os.path.join(path, name))
+        except OSError:
+            return None
+
+    def video() -> int:
+        size = local_size("video")
+        if size is None and job.video_url:
+            try:
+                size = get_blob_size(job.video_url)
+            except Exception as e:
+                logger.warning(f"Could not read size of {job.video_url}: {e}")
+        return size or 0
+
+    def audio() -> int:
+        size = local_size("audio.wav")
+        if size is not None:
+            return size
+        if job.duration_seconds:
+            return int(job.duration_seconds * WAV_BYTES_PER_SECOND)
+        return video()
+
+    if stage in ("fetch", "summarize"):
+        return video()
+    if stage == "extract":
+        return video() + audio()
+    # transcribe / upload_audio: the WAV, rebuilt from the video if needed
+    rebuild = local_size("audio.wav") is None and not job.audio_url
+    return audio() + (video() if rebuild else 0)
+
+
+def _ensure_video(job) -> str:
+    path = os.path.join(_scratch_dir(job.id), "video")
+    if not os.path.exists(path):
+        download_video_from_gcs(job.video_url, path + ".part")
+        os.replace(path + ".part", path)
+    return path
+
+
+def _ensure_audio(job) -> str:
+    path = os.path.join(_scratch_dir(job.id), "audio.wav")
+    if not os.path.exists(path):
+        tmp_path = os.path.join(_scratch_dir(job.id), "audio.part.wav")
+        if job.audio_url:
+            download_blob_from_gcs(job.audio_url, tmp_path)
+        else:
+            extract_audio(_ensure_video(job), tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _attempt(rq_job) -> int:
+    if not rq_job or rq_job.retries_left is None:
+        return 1
+    return STAGE_RETRY.max - rq_job.retries_left + 1
+
+
+def _will_retry() -> bool:
+    rq_job = get_current_job()
+    return bool(rq_job and rq_job.retries_left)
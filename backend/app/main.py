@@ -6,6 +6,8 @@ from app.core.auth import get_current_clerk_user_id
 
 from app.api.routes import notes
 from app.api.routes import video_jobs
+from app.api.routes import gcs_notifications
+from app.api.routes import storage
 
 
 app = FastAPI(title="Cloud Notes API", version="1.0.0")
@@ -26,6 +28,8 @@ app.add_middleware(
 # Routers
 app.include_router(notes.router)
 app.include_router(video_jobs.router)
+app.include_router(gcs_notifications.router)
+app.include_router(storage.router)
 
 @app.get("/health")
 def health_check():
@@ -1,3 +1,4 @@
 from .user import User  # noqa: F401
 from .note import Note  # noqa: F401
 from .video_job import VideoJob  # noqa: F401
+from .video_job_span import VideoJobSpan  # noqa: F401
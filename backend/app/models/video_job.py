@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index, String, Text, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
@@ -7,13 +7,19 @@ from app.db.base import Base
 
 class VideoJob(Base):
     __tablename__ = "video_jobs"
+    __table_args__ = (
+        # Client-supplied Idempotency-Key on job creation, unique per user
+        UniqueConstraint("owner_id", "idempotency_key", name="uq_video_jobs_owner_idempotency_key"),
+        # Status polling: a user's jobs and their latest change
+        Index("ix_video_jobs_owner_id_updated_at", "owner_id", "updated_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     filename = Column(String(255), nullable=False)
-    video_url = Column(Text, nullable=True)
-    status = Column(String(50), nullable=False, default="uploaded")  # uploaded | processing | done | failed
+    video_url = Column(Text, nullable=True, index=True)  # blob name; looked up by upload notifications
+    status = Column(String(50), nullable=False, default="uploaded")  # pending_upload | queued | processing | done | failed
 
     transcript = Column(Text, nullable=True)
     summary = Column(Text, nullable=True)
@@ -22,4 +28,9 @@ class VideoJob(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     error = Column(Text, nullable=True)
 
-    audio_url = Column(Text, nullable=True)
\ No newline at end of file
+    audio_url = Column(Text, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    stage = Column(String(50), nullable=True)  # last completed pipeline stage
+    idempotency_key = Column(String(255), nullable=True)
+    content_digest = Column(String(64), nullable=True, index=True)  # e.g. md5:<base64> from GCS metadata
+    peak_rss_bytes = Column(BigInteger, nullable=True)  # highest worker memory over all stages
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+import uuid
+
+from app.db.base import Base
+
+
+class VideoJobSpan(Base):
+    """
+    One timed step of a video job's pipeline (see app/core/tracing.py).
+    """
+    __tablename__ = "video_job_spans"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(UUID(as_uuid=True), ForeignKey("video_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    trace_id = Column(String(32), nullable=False, index=True)
+    span_id = Column(String(16), nullable=False)
+    parent_span_id = Column(String(16), nullable=True)
+
+    name = Column(String(100), nullable=False)  # e.g. stage.transcribe, gcs.download
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    attributes = Column(JSONB, nullable=False, default=dict)  # bytes, media duration, real_time_factor, ...
+    error = Column(Text, nullable=True)
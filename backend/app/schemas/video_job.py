@@ -10,6 +10,7 @@ class VideoJobOut(BaseModel):
     transcript: str | None = None
     summary: str | None = None
     signed_url: str | None = None
+    duration_seconds: float | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -1,13 +1,17 @@
 import subprocess
-import tempfile
 import os
 
-def extract_audio(video_path: str) -> str:
+from app.core.tracing import span
+
+def extract_audio(video_path: str, audio_path: str | None = None) -> str:
     """
     Extracts audio from video and returns path to .wav file
+    (a new temp file unless audio_path is given).
     """
-    fd, audio_path = tempfile.mkstemp(suffix=".wav")
-    os.close(fd)
+    if audio_path is None:
+        # Loose temp file in the scratch area (swept if leaked)
+        from app.services.scratch import temp_path
+        audio_path = temp_path(".wav")
 
     cmd = [
         "ffmpeg",
@@ -39,5 +43,32 @@ def extract_audio(video_path: str) -> str:
         audio_path,
     ]
 
-    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
+    input_bytes = os.path.getsize(video_path) if os.path.exists(video_path) else None
+    with span("ffmpeg.extract_audio", input_bytes=input_bytes) as s:
+        subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL)
+        s.set_attribute("output_bytes", os.path.getsize(audio_path))
     return audio_path
+
+
+def probe_duration(media_path: str, timeout: float | None = None) -> float | None:
+    """
+    Returns the media duration in seconds (via ffprobe), or None if unknown.
+    media_path may be a local file or an http(s) URL.
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        media_path,
+    ]
+
+    try:
+        out = subprocess.run(
+            cmd, check=True, capture_output=True, text=True, stdin=subprocess.DEVNULL, timeout=timeout
+        )
+        return float(out.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError) as e:
+        # OSError: ffprobe missing or not executable
+        print(f"ffprobe could not read duration of {media_path}: {e}")
+        return None
@@ -1,233 +1,162 @@
-from google.cloud import storage
 import os
-from datetime import timedelta
 import uuid
-from app.core.config import settings
+from datetime import datetime
 
-# 1. Get bucket name from environment variable
-# Make sure GCS_BUCKET_NAME is set in your docker-compose.yml
-# GCS_BUCKET_NAME is now loaded in settings
+from app.core.tracing import span
+from app.services.storage import get_storage
 
-
-
-# 2. Initialize client
-if settings.GCS_KEY_PATH and os.path.exists(settings.GCS_KEY_PATH):
-    client = storage.Client.from_service_account_json(settings.GCS_KEY_PATH)
-else:
-    # Fallback to default credentials (Cloud Run, etc.)
-    client = storage.Client()
+# Object storage helpers used across the app. Despite the module name they
+# go through the configured backend (services/storage.py): GCS in
+# production, the local filesystem for development and load tests.
+# Span names keep their "gcs." prefix so traces stay comparable.
 
 def upload_video_to_gcs(file) -> str:
     """
-    Uploads a file to the bucket defined in environment variables.
+    Uploads an UploadFile as a new video blob.
     """
-    if not settings.GCS_BUCKET_NAME:
-        raise ValueError("GCS_BUCKET_NAME environment variable is not set")
-
-    # Get the bucket instance
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-
     # Generate safe unique filename
     ext = file.filename.split(".")[-1]
     blob_name = f"videos/{uuid.uuid4()}.{ext}"
 
-    blob = bucket.blob(blob_name)
-
-    # Reset file pointer
-    file.file.seek(0)
-
-    blob.upload_from_file(
-        file.file,
-        content_type=file.content_type,
-        rewind=True
-    )
+    get_storage().upload(blob_name, file.file, content_type=file.content_type)
 
     # Return the blob name (needed for generating signed URLs later)
-    # or return blob_name if your DB stores the path
-    return blob_name 
-
-from google.cloud import iam_credentials_v1
-import google.auth
-import time
+    return blob_name
 
-def get_service_account_email():
+def generate_signed_url(object_name: str, minutes: int = 60) -> str:
     """
-    Helper to get the current service account email.
-    In Cloud Run, we should query the metadata server directly if credentials don't have it.
+    Generates a temporary signed URL for viewing the video.
     """
-    try:
-        # 1. Try Credentials first
-        credentials, _ = google.auth.default()
-        if hasattr(credentials, "service_account_email") and credentials.service_account_email and credentials.service_account_email != "default":
-            return credentials.service_account_email
-        
-        # 2. Try Metadata Server (Reliable in Cloud Run)
-        import requests
-        headers = {"Metadata-Flavor": "Google"}
-        response = requests.get(
-            "http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/email",
-            headers=headers,
-            timeout=2
-        )
-        if response.status_code == 200:
-            return response.text.strip()
-            
-    except Exception as e:
-        print(f"Warning: Could not determine service account email: {e}")
-        
-    return None
+    return get_storage().sign(object_name, "GET", minutes)
 
-def generate_signed_url(object_name: str, minutes: int = 60) -> str:
+def video_blob_name(content_type: str) -> str:
     """
-    Generates a temporary signed URL for viewing the video.
-    Falls back to IAM signing if local key is missing.
+    A fresh blob name for an uploaded video.
     """
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-    blob = bucket.blob(object_name)
+    ext = "mp4" # Default, or could extract from content_type
+    if "quicktime" in content_type: ext = "mov"
+    elif "webm" in content_type: ext = "webm"
 
-    try:
-        # Try standard signing (works locally with key file)
-        return blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=minutes),
-            method="GET",
-        )
-    except Exception:
-        # If it fails (likely due to missing private key in Cloud Run ADC),
-        # use the IAM API method.
-        # Note: This requires the Service Account to have "Service Account Token Creator" role on itself.
-        
-        sa_email = get_service_account_email()
-        if not sa_email:
-             raise ValueError("Cannot sign URL: No private key and cannot determine Service Account Email.")
-
-        # Explicitly use the IAM credentials logic (mimicking client behavior)
-        # However, generate_signed_url allows passing 'service_account_email' and 'access_token'
-        # But for V4 signing without a key, we need to sign the bytes via IAM API.
-        
-        # Proper way: Use the `virtual` signing capability of storage client is NOT simple in python lib yet.
-        # We will use the 'bucket.generate_signed_url' with 'service_account_email' 
-        # combined with a custom access token? No, that's V2.
-        
-        # Use the explicit manual signing approach with IAM:
-        # 1. Provide the Service Account Email
-        # 2. Provide the Access Token (for the IAM API call itself)
-        
-        # Actually, the Python Storage library allows us to pass a 'credentials' object
-        # that implements 'sign_bytes'. We can wrap the IAM client.
-        # OR simpler: use blob.generate_signed_url with `service_account_email` 
-        # AND `access_token` - valid for simple cases, but specific to V2?
-        
-        # Let's use the robust manual IAM SignBlob approach documentation:
-        # https://cloud.google.com/iam/docs/creating-short-lived-service-account-credentials#sa-credentials-python
-        
-        # Simplified: Use the 'service_account_email' param which triggers the remote signing?
-        # It does ONLY if you provide 'access_token' as well.
-        
-        credentials, _ = google.auth.default()
-        from google.auth.transport.requests import Request
-        credentials.refresh(Request())
-        
-        return blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=minutes),
-            method="GET",
-            service_account_email=sa_email,
-            access_token=credentials.token, 
-        )
+    return f"videos/{uuid.uuid4()}.{ext}"
 
 def generate_upload_signed_url(content_type: str, minutes: int = 15) -> dict:
     """
-    Generates a temporary signed URL for uploading a video directly to GCS.
+    Generates a temporary signed URL for uploading a video directly to storage.
     """
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-    
     # Generate unique filename on server side
-    ext = "mp4" # Default, or could extract from content_type
-    if "quicktime" in content_type: ext = "mov"
-    elif "webm" in content_type: ext = "webm"
-    
-    blob_name = f"videos/{uuid.uuid4()}.{ext}"
-    blob = bucket.blob(blob_name)
+    blob_name = video_blob_name(content_type)
+    return {"url": sign_upload_url(blob_name, content_type, minutes), "blob_name": blob_name}
 
-    try:
-        url = blob.generate_signed_url(
-            version="v4",
-            expiration=timedelta(minutes=minutes),
-            method="PUT",
-            content_type=content_type,
-        )
-    except Exception:
-        # Fallback to IAM signing
-        try:
-            sa_email = get_service_account_email()
-            if not sa_email:
-                raise ValueError("No Service Account Email found for IAM signing")
-                
-            credentials, _ = google.auth.default()
-            from google.auth.transport.requests import Request
-            if not credentials.token:
-                credentials.refresh(Request())
-            
-            url = blob.generate_signed_url(
-                version="v4",
-                expiration=timedelta(minutes=minutes),
-                method="PUT",
-                content_type=content_type,
-                service_account_email=sa_email,
-                access_token=credentials.token,
-            )
-        except Exception as e:
-            print(f"IAM Signing failed: {e}")
-            raise ValueError(f"Failed to generate signed URL via IAM: {e}")
-
-    return {"url": url, "blob_name": blob_name}
-
-def download_video_from_gcs(blob_name: str) -> str:
-    """
-    Downloads a video from GCS to a temporary local file.
+def sign_upload_url(blob_name: str, content_type: str, minutes: int = 15) -> str:
+    """
+    Signed PUT URL for one blob (a whole video or a part of one).
+    """
+    return get_storage().sign(blob_name, "PUT", minutes, content_type)
+
+def create_resumable_upload_uri(blob_name: str, content_type: str, size: int | None = None) -> str:
+    """
+    Starts a resumable upload session for blob_name. The client PUTs
+    chunks to the returned URI (valid for a week) with Content-Range and
+    can ask it how much arrived after an interruption.
+    """
+    return get_storage().resumable_upload_uri(blob_name, content_type, size)
+
+def list_blob_names(prefix: str, created_before: datetime | None = None) -> list[str]:
+    """
+    Names of the blobs under prefix (only those created before
+    created_before, if given).
+    """
+    return get_storage().list_names(prefix, created_before)
+
+def compose_blobs(sources: list[str], destination: str, content_type: str | None = None) -> str:
+    """
+    Concatenates sources (in order) into destination server-side. The
+    sources are left in place. Returns destination.
+    """
+    with span("gcs.compose", blob=destination, sources=len(sources)):
+        get_storage().compose(sources, destination, content_type)
+    return destination
+
+def download_video_from_gcs(blob_name: str, local_path: str | None = None) -> str:
+    """
+    Downloads a video to a local file (a temporary one by default).
     Returns the local file path.
     """
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-    blob = bucket.blob(blob_name)
-    
-    # Create temp file path
-    local_path = f"/tmp/{uuid.uuid4()}.mp4"
-    blob.download_to_filename(local_path)
-    
+    if local_path is None:
+        # Loose temp file in the scratch area (swept if leaked)
+        from app.services.scratch import temp_path
+        local_path = temp_path(".mp4")
+
+    return download_blob_from_gcs(blob_name, local_path)
+
+def download_blob_from_gcs(blob_name: str, local_path: str, start: int | None = None, end: int | None = None) -> str:
+    """
+    Downloads any blob (or bytes start..end of it, inclusive) to local_path
+    and returns it.
+    """
+    with span("gcs.download", blob=blob_name) as s:
+        get_storage().download(blob_name, local_path, start, end)
+        s.set_attribute("bytes", os.path.getsize(local_path))
+
     return local_path
 
+def get_blob_digest(blob_name: str) -> str | None:
+    """
+    Returns a content digest for a blob from its metadata (no download).
+    Prefers md5; composite objects only carry crc32c.
+    """
+    info = get_storage().stat(blob_name)
+    if info is None:
+        return None
+
+    if info.md5:
+        return f"md5:{info.md5}"
+    if info.crc32c:
+        return f"crc32c:{info.crc32c}"
+    return None
+
+def get_blob_size(blob_name: str) -> int | None:
+    """
+    Size of a blob in bytes from its metadata, None if it doesn't exist.
+    """
+    info = get_storage().stat(blob_name, digest=False)
+    return info.size if info is not None else None
+
 def upload_audio_to_gcs(file_path: str) -> str:
     """
-    Uploads an audio file to GCS.
+    Uploads an audio file.
     Returns the blob name.
     """
-    if not settings.GCS_BUCKET_NAME:
-        raise ValueError("GCS_BUCKET_NAME environment variable is not set")
-    
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-    
     # Generate unique blob name
     blob_name = f"audio/{uuid.uuid4()}.mp3"
-    blob = bucket.blob(blob_name)
-    
-    blob.upload_from_filename(file_path)
-    
+
+    with span("gcs.upload", blob=blob_name, bytes=os.path.getsize(file_path)):
+        get_storage().upload(blob_name, file_path)
+
     return blob_name
 
 def delete_file_from_gcs(blob_name: str):
     """
-    Deletes a file from GCS.
+    Deletes a file (best-effort).
+    """
+    if delete_blobs([blob_name]):
+        print(f"Failed to delete {blob_name}")
+    else:
+        print(f"Deleted {blob_name}")
+
+def delete_blobs(blob_names: list[str]) -> list[str]:
+    """
+    Deletes blobs (GCS: batch requests, 100 per HTTP round trip). Blobs
+    already gone count as deleted. Returns the names that failed.
     """
-    if not settings.GCS_BUCKET_NAME:
-        # If no bucket configured (e.g. dev), just ignore
-        return
+    if not blob_names:
+        return []
 
     try:
-        bucket = client.bucket(settings.GCS_BUCKET_NAME)
-        blob = bucket.blob(blob_name)
-        blob.delete()
-        print(f"Deleted {blob_name} from GCS")
+        failed = get_storage().delete(blob_names)
     except Exception as e:
-        # Log error but don't crash
-        print(f"Failed to delete {blob_name} from GCS: {e}")
\ No newline at end of file
+        print(f"Failed to delete {len(blob_names)} blobs: {e}")
+        return list(blob_names)
+
+    print(f"Deleted {len(blob_names) - len(failed)} blobs")
+    return failed
@@ -0,0 +1,111 @@
+import asyncio
+import contextvars
+import os
+import threading
+
+from app.core.config import settings
+
+# Process-wide Gemini access.
+#
+# One genai.Client per process keeps its HTTP connection pool warm across
+# uploads, polls, deletes and generations. All calls run as coroutines on a
+# single background event loop, and GEMINI_MAX_CONCURRENCY caps how many hit
+# the API at once.
+#
+# That pays off in long-lived processes: the API (concurrent requests share
+# the pool and the cap) and the I/O workers, which run jobs in-process
+# (SimpleWorker, see app/worker.py) and so reuse connections across jobs,
+# one job at a time. A forking worker (CPU workers that also take I/O
+# queues) gets a fresh client per job: everything is keyed to the current
+# pid, since a forked horse must not reuse its parent's sockets or loop
+# thread.
+
+_lock = threading.Lock()
+_pid = None
+_client = None
+_loop = None
+_slots = None
+
+
+def _ensure_started():
+    global _pid, _client, _loop, _slots
+
+    if _pid == os.getpid():
+        return
+
+    with _lock:
+        if _pid == os.getpid():
+            return
+
+        if not settings.GEMINI_API_KEY:
+            raise RuntimeError("GEMINI_API_KEY is missing. Add it to your backend .env")
+
+        # Import inside function so the app can boot even if you haven't installed it yet.
+        from google import genai  # type: ignore
+
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name="gemini-loop", daemon=True).start()
+
+        async def make_slots():
+            return asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+        _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+        _loop = loop
+        _slots = asyncio.run_coroutine_threadsafe(make_slots(), loop).result()
+        _pid = os.getpid()
+
+
+def get_gemini_client():
+    """
+    Returns the shared genai.Client (use .aio for the async API).
+    """
+    _ensure_started()
+    return _client
+
+
+def gemini_slot() -> asyncio.Semaphore:
+    """
+    Concurrency limiter for Gemini calls; use as `async with gemini_slot():`
+    from coroutines running on the shared loop.
+    """
+    _ensure_started()
+    return _slots
+
+
+def run_gemini(coro):
+    """
+    Runs a coroutine on the shared Gemini loop and blocks for its result.
+    For synchronous callers (RQ jobs, sync FastAPI routes).
+    """
+    try:
+        _ensure_started()
+    except Exception:
+        coro.close()
+        raise
+    return asyncio.run_coroutine_threadsafe(_with_caller_context(coro), _loop).result()
+
+
+async def await_gemini(coro):
+    """
+    Awaits a coroutine on the shared Gemini loop from a different event loop
+    (e.g. an async FastAPI route).
+    """
+    try:
+        _ensure_started()
+    except Exception:
+        coro.close()
+        raise
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_with_caller_context(coro), _loop))
+
+
+def _with_caller_context(coro):
+    # Tasks on the loop thread start from that thread's context; carry the
+    # caller's over instead (e.g. the current trace span).
+    context = contextvars.copy_context()
+
+    async def run():
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+
+    return run()
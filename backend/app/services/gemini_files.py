@@ -1,62 +1,115 @@
+import asyncio
 import os
-import time
+import redis
 from app.core.config import settings
+from app.core.tracing import span
+from app.core.redis_conn import redis_conn
+from app.services.gemini_client import get_gemini_client, gemini_slot, run_gemini
+from app.services.rate_limiter import gemini_limiter
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=4, max=60),
-    reraise=True
-)
+
 def upload_file_to_gemini(local_path: str, mime_type: str = "video/mp4"):
     """
     Uploads a file to the Gemini File API for temporary storage/processing.
     Returns the file object (which contains .name/uri).
     """
+    return run_gemini(upload_file_to_gemini_async(local_path, mime_type))
+
+
+def delete_file_from_gemini(file_name: str):
+    """
+    Deletes the file from Gemini storage.
+    """
     if not settings.GEMINI_API_KEY:
-        raise RuntimeError("GEMINI_API_KEY is missing.")
+        return
+
+    run_gemini(delete_file_from_gemini_async(file_name))
 
-    # Import locally
-    from google import genai
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=4, max=60),
+    reraise=True
+)
+async def upload_file_to_gemini_async(local_path: str, mime_type: str = "video/mp4"):
     from google.genai import types
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
-    
-    file_ref = client.files.upload(
-        file=local_path,
-        config=types.UploadFileConfig(mime_type=mime_type)
-    )
-    
-    # Wait for processing (videos need to be processed)
+    client = get_gemini_client()
+
+    await gemini_limiter.acquire_async()
+    with span("gemini.upload_file", bytes=os.path.getsize(local_path), mime_type=mime_type):
+        async with gemini_slot():
+            file_ref = await client.aio.files.upload(
+                file=local_path,
+                config=types.UploadFileConfig(mime_type=mime_type)
+            )
+
+    # Wait for processing (videos need to be processed).
+    # Slots are only held per request, never while sleeping.
     max_retries = 60 # 2 minutes total
     retries = 0
-    while retries < max_retries:
-        file_ref = client.files.get(name=file_ref.name)
-        if file_ref.state.name == "ACTIVE":
-            break
-        elif file_ref.state.name == "FAILED":
-            raise RuntimeError(f"Gemini file upload failed: {file_ref.state.name}")
-        
-        # logging.info(f"Waiting for video processing... {file_ref.state.name}")
-
-        time.sleep(2)
-        retries += 1
-    
+    with span("gemini.file_processing") as s:
+        while retries < max_retries:
+            async with gemini_slot():
+                file_ref = await client.aio.files.get(name=file_ref.name)
+            if file_ref.state.name == "ACTIVE":
+                break
+            elif file_ref.state.name == "FAILED":
+                raise RuntimeError(f"Gemini file upload failed: {file_ref.state.name}")
+
+            await asyncio.sleep(2)
+            retries += 1
+        s.set_attribute("polls", retries + 1)
+
     if retries >= max_retries:
         raise RuntimeError("Timeout waiting for Gemini file processing.")
-        
+
     return file_ref
 
-def delete_file_from_gemini(file_name: str):
-    """
-    Deletes the file from Gemini storage.
-    """
-    if not settings.GEMINI_API_KEY:
-        return
 
+async def delete_file_from_gemini_async(file_name: str):
     try:
-        from google import genai
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
-        client.files.delete(name=file_name)
+        client = get_gemini_client()
+        async with gemini_slot():
+            await client.aio.files.delete(name=file_name)
     except Exception as e:
         print(f"Warning: Failed to delete Gemini file {file_name}: {e}")
+
+
+# Processed videos can be kept for follow-up questions (see gemini_qa.py).
+# Gemini expires uploads after 48 hours on its own; we forget them a bit earlier.
+def _retained_file_key(job_id) -> str:
+    return f"video-job:{job_id}:gemini-file"
+
+
+def retain_gemini_file(job_id, file_name: str):
+    """
+    Remembers a job's processed Gemini file instead of deleting it.
+    A file retained earlier for the same job is deleted.
+    """
+    try:
+        previous = redis_conn.set(
+            _retained_file_key(job_id),
+            file_name,
+            ex=settings.GEMINI_FILE_RETENTION_SECONDS,
+            get=True,
+        )
+    except redis.RedisError as e:
+        print(f"Warning: Could not retain Gemini file {file_name}: {e}")
+        delete_file_from_gemini(file_name)
+        return
+
+    if previous and previous.decode() != file_name:
+        delete_file_from_gemini(previous.decode())
+
+
+def get_retained_gemini_file(job_id) -> str | None:
+    name = redis_conn.get(_retained_file_key(job_id))
+    return name.decode() if name else None
+
+
+def release_retained_gemini_file(job_id):
+    name = redis_conn.getdel(_retained_file_key(job_id))
+    if name:
+        delete_file_from_gemini(name.decode())
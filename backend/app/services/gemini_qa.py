@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+from app.services.gemini_client import get_gemini_client, gemini_slot, run_gemini
+from app.services.gemini_files import get_retained_gemini_file
+from app.services.model_router import estimate_input_tokens
+from app.services.rate_limiter import estimate_tokens, gemini_limiter
+
+logger = logging.getLogger(__name__)
+
+# Follow-up questions about a finished video.
+#
+# The context (transcript + summary + the processed video when it is still
+# retained) is built once per job and reused for every question:
+#   "cache"  - a Gemini cached content; questions only send the question text
+#   "prefix" - fallback when the provider cache can't be used (e.g. context
+#              below the model's minimum); questions resend the identical
+#              prefix, which Gemini's implicit prefix caching discounts.
+#
+# A context is rebuilt when its inputs change (fingerprint); the outdated
+# provider cache is deleted first, and a per-job Redis lock makes
+# concurrent questions wait for one build instead of each creating a cache.
+
+ANSWER_MAX_OUTPUT_TOKENS = 1024
+# Longest a context build may hold the job's lock (and others wait for it)
+CONTEXT_BUILD_LOCK_SECONDS = 120
+
+_SYSTEM_INSTRUCTION = """
+You answer questions about one video recording using its transcript, its
+summary and (when provided) the video itself.
+- Answer only from this material; say so when it doesn't cover the question.
+- Be concise. Quote exact names, numbers and code when relevant.
+""".strip()
+
+
+def _context_key(job_id) -> str:
+    return f"video-job:{job_id}:qa-context"
+
+
+def _context_fingerprint(transcript: str, summary: str | None, file_name: str | None) -> str:
+    h = hashlib.sha256()
+    for part in (settings.GEMINI_MODEL, transcript, summary or "", file_name or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _context_text(transcript: str, summary: str | None) -> str:
+    return f"""
+SUMMARY:
+{summary or "(none)"}
+
+TRANSCRIPT:
+{transcript}
+""".strip()
+
+
+def answer_question(job_id, transcript: str, summary: str | None, question: str) -> dict:
+    """
+    Answers a question about a job's video. Returns {"answer", "context"},
+    where context is "cache" or "prefix" (see module comment).
+    """
+    file_name = get_retained_gemini_file(job_id)
+    fingerprint = _context_fingerprint(transcript, summary, file_name)
+
+    context = _load_context(job_id, fingerprint)
+    if context is None:
+        with redis_conn.lock(
+            f"{_context_key(job_id)}:lock",
+            timeout=CONTEXT_BUILD_LOCK_SECONDS,
+            blocking_timeout=CONTEXT_BUILD_LOCK_SECONDS,
+        ):
+            # Whoever waited for the lock finds the context just built
+            context = _load_context(job_id, fingerprint)
+            if context is None:
+                context = run_gemini(_build_context(job_id, transcript, summary, file_name, fingerprint))
+
+    return run_gemini(_answer_question(job_id, transcript, summary, question, context))
+
+
+async def _answer_question(job_id, transcript: str, summary: str | None, question: str, context: dict) -> dict:
+    from google.genai import types
+
+    client = get_gemini_client()
+
+    if context["kind"] == "cache":
+        config = types.GenerateContentConfig(
+            cached_content=context["name"],
+            max_output_tokens=ANSWER_MAX_OUTPUT_TOKENS,
+        )
+        contents = [question]
+    else:
+        config = types.GenerateContentConfig(
+            system_instruction=_SYSTEM_INSTRUCTION,
+            max_output_tokens=ANSWER_MAX_OUTPUT_TOKENS,
+        )
+        contents = [_context_text(transcript, summary)]
+        if context["file_name"]:
+            contents.append(await client.aio.files.get(name=context["file_name"]))
+        contents.append(f"QUESTION:\n{question}")
+
+    # Cached tokens still count towards the per-minute budget
+    estimated = context["input_tokens"] + estimate_tokens(question) + ANSWER_MAX_OUTPUT_TOKENS
+    await gemini_limiter.acquire_async(estimated)
+
+    started = time.monotonic()
+    try:
+        async with gemini_slot():
+            resp = await client.aio.models.generate_content(
+                model=settings.GEMINI_MODEL,
+                contents=contents,
+                config=config,
+            )
+    except BaseException:
+        await asyncio.to_thread(gemini_limiter.refund, estimated)
+        raise
+    latency = time.monotonic() - started
+
+    usage = getattr(resp, "usage_metadata", None)
+    used = getattr(usage, "total_token_count", None)
+    if used:
+        await asyncio.to_thread(gemini_limiter.adjust_tokens, used - estimated)
+
+    logger.info(
+        f"Q&A job={job_id} context={context['kind']} total_tokens={used} "
+        f"cached_tokens={getattr(usage, 'cached_content_token_count', None)} latency={latency:.2f}s"
+    )
+
+    text = getattr(resp, "text", None)
+    if not text:
+        raise RuntimeError("Gemini returned no text.")
+    return {"answer": text.strip(), "context": context["kind"]}
+
+
+def _stored_context(job_id) -> dict | None:
+    raw = redis_conn.get(_context_key(job_id))
+    return json.loads(raw) if raw else None
+
+
+def _load_context(job_id, fingerprint: str) -> dict | None:
+    context = _stored_context(job_id)
+    # Transcript edits, a re-summary or a new video upload invalidate it
+    if context is None or context["fingerprint"] != fingerprint:
+        return None
+    return context
+
+
+async def _delete_cache(name: str):
+    try:
+        async with gemini_slot():
+            await get_gemini_client().aio.caches.delete(name=name)
+    except Exception as e:
+        logger.warning(f"Failed to delete context cache {name}: {e}")
+
+
+async def _build_context(job_id, transcript, summary, file_name, fingerprint) -> dict:
+    from google.genai import types
+
+    client = get_gemini_client()
+
+    # The outdated context's cache would stay billed until its TTL
+    stale = await asyncio.to_thread(_stored_context, job_id)
+    if stale and stale["kind"] == "cache":
+        await _delete_cache(stale["name"])
+
+    context_text = _context_text(transcript, summary)
+    input_tokens = estimate_input_tokens(context_text, file_name is not None)
+
+    parts = [context_text]
+    if file_name:
+        try:
+            parts.append(await client.aio.files.get(name=file_name))
+        except Exception as e:
+            logger.warning(f"Retained Gemini file {file_name} is gone: {e}")
+            file_name = None
+
+    context = {
+        "kind": "prefix",
+        "fingerprint": fingerprint,
+        "file_name": file_name,
+        "input_tokens": input_tokens,
+    }
+
+    charged = False
+    try:
+        await gemini_limiter.acquire_async(input_tokens)
+        charged = True
+        async with gemini_slot():
+            cache = await client.aio.caches.create(
+                model=settings.GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    contents=parts,
+                    system_instruction=_SYSTEM_INSTRUCTION,
+                    ttl=f"{settings.QA_CONTEXT_TTL_SECONDS}s",
+                ),
+            )
+        context.update(kind="cache", name=cache.name)
+    except Exception as e:
+        if charged:
+            await asyncio.to_thread(gemini_limiter.refund, input_tokens)
+        logger.info(f"Context cache unavailable for job {job_id}, using prompt prefix: {e}")
+
+    # Expire our pointer slightly before the provider cache does
+    await asyncio.to_thread(
+        redis_conn.set,
+        _context_key(job_id),
+        json.dumps(context),
+        ex=max(60, settings.QA_CONTEXT_TTL_SECONDS - 60),
+    )
+    return context
+
+
+def drop_qa_context(job_id):
+    """
+    Deletes a job's provider-side context cache (best-effort).
+    """
+    raw = redis_conn.getdel(_context_key(job_id))
+    if not raw:
+        return
+
+    context = json.loads(raw)
+    if context["kind"] != "cache":
+        return
+
+    try:
+        run_gemini(_delete_cache(context["name"]))
+    except Exception as e:
+        logger.warning(f"Failed to delete context cache {context['name']}: {e}")
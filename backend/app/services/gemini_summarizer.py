@@ -1,29 +1,150 @@
 from __future__ import annotations
 
+import asyncio
+import dataclasses
+import logging
+import time
 from typing import Optional
 from app.core.config import settings
+from app.core.tracing import span
+from app.services.gemini_client import get_gemini_client, gemini_slot, run_gemini
+from app.services.model_router import SummaryRoute, route_section, route_summary
+from app.services.rate_limiter import estimate_tokens, gemini_limiter
+from app.services.summary_cache import (
+    get_cached_sections,
+    get_cached_summary,
+    section_cache_key,
+    set_cached_summary,
+    summary_cache_key,
+)
+from app.services.transcript_chunks import split_transcript
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-@retry(
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=4, max=60),
-    reraise=True
-)
-def summarize_transcript(transcript: str, gemini_file=None) -> str:
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompts below change so cached summaries are invalidated.
+PROMPT_VERSION = "2"
+
+
+def _cache_key(transcript: str, media_digest: str | None, route: SummaryRoute) -> str:
+    return summary_cache_key(transcript, media_digest, PROMPT_VERSION, route.model)
+
+
+def lookup_cached_summary(
+    transcript: str,
+    media_digest: str | None = None,
+    media_duration: float | None = None,
+) -> str | None:
+    """
+    Returns a previously generated summary for the same transcript/media/prompt/model.
+    Lets callers skip the (slow) Gemini file upload on a hit.
+    """
+    route = route_summary(transcript, media_digest is not None, media_duration)
+    return get_cached_summary(_cache_key(transcript, media_digest, route))
+
+
+def summarize_transcript(
+    transcript: str,
+    gemini_file=None,
+    media_digest: str | None = None,
+    media_duration: float | None = None,
+    use_cache: bool = True,
+    stream=None,
+) -> str:
+    """
+    Cached front for _generate_summary.
+    media_digest identifies gemini_file's content; pass None when no media was sent.
+    media_duration (seconds) feeds model routing.
+    use_cache=False skips the lookup (the fresh result is still stored).
+    stream (e.g. a SummaryStreamPublisher) receives the final text incrementally
+    via write()/reset() while the model generates it.
+    """
+    route = route_summary(transcript, gemini_file is not None, media_duration)
+    key = _cache_key(transcript, media_digest, route)
+    if use_cache:
+        cached = get_cached_summary(key)
+        if cached:
+            if stream:
+                stream.write(cached)
+            return cached
+
+    text = run_gemini(_generate_summary(transcript, route, gemini_file, stream))
+    set_cached_summary(key, text)
+    return text
+
+
+async def _generate_summary(transcript: str, route: SummaryRoute, gemini_file=None, stream=None) -> str:
     """
     Returns a real summary (not just reformatting).
     Uses Gemini via google-genai (Gemini API).
     Can optionally include a processed video file for multimodal understanding.
+    Long transcripts are summarized map-reduce style (see _map_reduce_summary).
     """
-    if not settings.GEMINI_API_KEY:
-        raise RuntimeError("GEMINI_API_KEY is missing. Add it to your backend .env")
+    if len(transcript) > settings.SUMMARY_CHUNK_THRESHOLD_CHARS:
+        return await _map_reduce_summary(transcript, route, gemini_file, stream)
 
-    # Import inside function so the app can boot even if you haven't installed it yet.
-    from google import genai  # type: ignore
+    contents = [_build_summary_prompt(transcript)]
+    if gemini_file:
+        contents.append(gemini_file)
+
+    return await _generate_text(contents, route, stream)
+
+
+async def _map_reduce_summary(transcript: str, route: SummaryRoute, gemini_file=None, stream=None) -> str:
+    """
+    Map: condense each transcript chunk into section notes, concurrently
+    (at most SUMMARY_MAP_CONCURRENCY per summary, on top of the process-wide cap).
+    Reduce: turn the ordered notes (+ video) into the final summary format.
+    Each model call retries on its own, so one bad chunk doesn't restart the rest.
+
+    Section notes are cached per chunk hash, so after a transcript edit only
+    the chunks that actually changed go back to the model before the reduce.
+    Only the reduce pass is streamed; section notes are internal.
+    Sections always use the fast model; the reduce uses the recording's route.
+    """
+    chunks = split_transcript(transcript, settings.SUMMARY_CHUNK_CHARS)
+    routes = [route_section(chunk) for chunk in chunks]
+    keys = [section_cache_key(chunk, PROMPT_VERSION, r.model) for chunk, r in zip(chunks, routes)]
+    # Redis calls run off the shared Gemini loop, which every call in the
+    # process multiplexes on
+    section_notes = await asyncio.to_thread(get_cached_sections, keys)
+
+    missing = [i for i, notes in enumerate(section_notes) if notes is None]
+    logger.info(
+        f"Map-reduce summary over {len(chunks)} chunks ({len(transcript)} chars), "
+        f"{len(chunks) - len(missing)} cached, {len(missing)} to summarize"
+    )
+
+    limit = asyncio.Semaphore(settings.SUMMARY_MAP_CONCURRENCY)
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    async def summarize_chunk(i: int):
+        async with limit:
+            section_notes[i] = await _summarize_chunk(chunks[i], routes[i], keys[i])
 
-    prompt_text = f"""
+    await asyncio.gather(*(summarize_chunk(i) for i in missing))
+
+    reduce_prompt = _build_reduce_prompt(section_notes)
+    contents = [reduce_prompt]
+    if gemini_file:
+        contents.append(gemini_file)
+
+    # Same route, but the reduce prompt replaces the transcript in the estimate
+    reduce_route = dataclasses.replace(
+        route,
+        input_tokens=route.input_tokens - estimate_tokens(transcript) + estimate_tokens(reduce_prompt),
+    )
+    return await _generate_text(contents, reduce_route, stream)
+
+
+async def _summarize_chunk(chunk: str, route: SummaryRoute, cache_key: str) -> str:
+    notes = await _generate_text([_build_map_prompt(chunk)], route)
+    # Store as soon as each chunk finishes so a failed run keeps its progress
+    await asyncio.to_thread(set_cached_summary, cache_key, notes)
+    return notes
+
+
+def _build_summary_prompt(transcript: str) -> str:
+    return f"""
 You are an expert note-taker.
 
 TASK:
@@ -43,17 +164,122 @@ TRANSCRIPT:
 {transcript if transcript.strip() else "(No speech detected in this video. Please rely entirely on VISUAL OBSERVATIONS.)"}
 """.strip()
 
-    contents = [prompt_text]
-    if gemini_file:
-        contents.append(gemini_file)
 
-    resp = client.models.generate_content(
-        model=settings.GEMINI_MODEL,
-        contents=contents,
+def _build_map_prompt(chunk: str) -> str:
+    return f"""
+You are an expert note-taker.
+
+TASK:
+The text below is one section of a longer recording's transcript.
+Write dense notes for this section only: 5-10 bullets covering every distinct
+topic, claim, example, decision and action item, in the order they appear.
+
+RULES:
+- Do NOT copy the transcript directly.
+- Keep names, numbers and technical terms exact.
+- No introduction or conclusion, bullets only.
+
+TRANSCRIPT SECTION:
+{chunk}
+""".strip()
+
+
+def _build_reduce_prompt(section_notes: list[str]) -> str:
+    sections = "\n\n".join(
+        f"--- SECTION {i} ---\n{notes}" for i, notes in enumerate(section_notes, start=1)
     )
+    return f"""
+You are an expert note-taker.
+
+TASK:
+Below are notes for consecutive sections of one long recording, in order.
+Summarize the whole recording into:
+1) **SUMMARY**: A 5-8 sentence paragraph summary (high level). Use both audio and visual context (if available).
+2) **KEY TAKEAWAYS**: 6-12 bullet key takeaways (non-redundant, meaningful).
+3) **NEXT STEPS**: 3 actionable steps if any are implied.
+
+RULES:
+- Do NOT copy the notes directly.
+- Combine repeated ideas across sections.
+- Keep it concise and readable.
+- If a video is provided, use visual context (slides, code, diagrams) to ENHANCE the summary, but do not list "visual observations" separately.
+- The notes are accurate for speech, but trust the video for visual details (code snippets, charts).
+
+SECTION NOTES:
+{sections}
+""".strip()
+
+
+@retry(
+    stop=stop_after_attempt(5),
+    wait=wait_exponential(multiplier=1, min=4, max=60),
+    reraise=True
+)
+async def _generate_text(contents: list, route: SummaryRoute, stream=None) -> str:
+    """
+    One model call on the route's model, bounded by its timeout and output budget.
+    With a stream, consumes the incremental response and forwards each piece
+    as it arrives (a retry first resets the stream).
+    """
+    from google.genai import types
+
+    client = get_gemini_client()
+    config = types.GenerateContentConfig(max_output_tokens=route.max_output_tokens)
+
+    # Wait for budget before taking a concurrency slot, then settle the
+    # estimate against the usage Gemini reports.
+    estimated = route.input_tokens + route.max_output_tokens
+    await gemini_limiter.acquire_async(estimated)
+
+    async def call():
+        if stream is not None:
+            # Publishing hits Redis: keep it off the shared loop
+            await asyncio.to_thread(stream.reset)
+            pieces = []
+            usage = None
+            async for chunk in await client.aio.models.generate_content_stream(
+                model=route.model,
+                contents=contents,
+                config=config,
+            ):
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                piece = getattr(chunk, "text", None)
+                if piece:
+                    pieces.append(piece)
+                    await asyncio.to_thread(stream.write, piece)
+            return "".join(pieces), usage
 
-    # google-genai returns a structured response; text is typically in resp.text
-    text = getattr(resp, "text", None)
+        resp = await client.aio.models.generate_content(
+            model=route.model,
+            contents=contents,
+            config=config,
+        )
+        # google-genai returns a structured response; text is typically in resp.text
+        return getattr(resp, "text", None), getattr(resp, "usage_metadata", None)
+
+    started = time.monotonic()
+    try:
+        with span("gemini.generate_content", route=route.name, model=route.model,
+                  est_input_tokens=route.input_tokens, streamed=stream is not None) as s:
+            async with gemini_slot():
+                text, usage = await asyncio.wait_for(call(), timeout=route.timeout_seconds)
+            s.set_attribute("input_tokens", getattr(usage, "prompt_token_count", None))
+            s.set_attribute("output_tokens", getattr(usage, "candidates_token_count", None))
+    except BaseException:
+        # Each retry charges its own estimate; give back this attempt's
+        await asyncio.to_thread(gemini_limiter.refund, estimated)
+        raise
+    latency = time.monotonic() - started
+
+    used = getattr(usage, "total_token_count", None)
+    if used:
+        await asyncio.to_thread(gemini_limiter.adjust_tokens, used - estimated)
+
+    logger.info(
+        f"Gemini call route={route.name} model={route.model} est_input_tokens={route.input_tokens} "
+        f"total_tokens={used} latency={latency:.2f}s"
+    )
     if not text:
         raise RuntimeError("Gemini returned no text.")
     return text.strip()
+
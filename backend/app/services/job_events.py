@@ -0,0 +1,150 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import redis
+
+from app.core.redis_conn import async_redis_conn, redis_conn
+
+logger = logging.getLogger(__name__)
+
+# Job status changes are published on one Redis pub/sub channel per user:
+#   {"type": "status", "job_id", "status", "stage", "phase", "error", "ts"}
+# where phase is "started" / "completed" / "failed" for the given stage.
+# Pub/sub keeps nothing: listeners that connect later read the current
+# state from the DB once and follow the channel from there.
+#
+# In the API, one pattern subscription per process (JobEventHub) feeds every
+# open SSE connection through an in-memory queue, so open tabs don't each
+# hold a Redis connection.
+
+
+def job_events_channel(owner_id) -> str:
+    return f"video-jobs:events:{owner_id}"
+
+
+def publish_job_event(
+    owner_id,
+    job_id,
+    status: str,
+    stage: str | None = None,
+    phase: str | None = None,
+    error: str | None = None,
+):
+    """
+    Best-effort: a Redis hiccup never fails the job.
+    """
+    event = {
+        "type": "status",
+        "job_id": str(job_id),
+        "status": status,
+        "stage": stage,
+        "phase": phase,
+        "error": error,
+        "ts": time.time(),
+    }
+    try:
+        redis_conn.publish(job_events_channel(owner_id), json.dumps(event))
+    except redis.RedisError as e:
+        logger.warning(f"Job event publish failed for {job_id}: {e}")
+
+
+# Events a slow listener may fall behind by before new ones are dropped
+LISTENER_QUEUE_SIZE = 100
+
+
+class JobEventHub:
+    """
+    Fans the per-user channels out to listeners on this process's event
+    loop. Subscribes (and resubscribes after a Redis error) in a background
+    task started by the first listener.
+    """
+
+    def __init__(self):
+        self._listeners: dict[str, set[asyncio.Queue]] = {}
+        self._task = None
+        self._subscribed = asyncio.Event()
+
+    async def listen(self, owner_id, timeout: float = 5.0) -> asyncio.Queue:
+        if self._task is None or self._task.done():
+            self._subscribed.clear()
+            self._task = asyncio.create_task(self._run())
+
+        queue = asyncio.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        self._listeners.setdefault(str(owner_id), set()).add(queue)
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.unlisten(owner_id, queue)
+            raise
+        return queue
+
+    def unlisten(self, owner_id, queue: asyncio.Queue):
+        queues = self._listeners.get(str(owner_id))
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._listeners[str(owner_id)]
+
+    async def _run(self):
+        while True:
+            pubsub = async_redis_conn.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(job_events_channel("*"))
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except redis.RedisError as e:
+                logger.warning(f"Job event subscription failed, resubscribing: {e}")
+                self._subscribed.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def _dispatch(self, channel: bytes, data: bytes):
+        owner_id = channel.decode().rsplit(":", 1)[-1]
+        queues = self._listeners.get(owner_id)
+        if not queues:
+            return
+        event = json.loads(data)
+        for queue in queues:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+
+_hub = None
+
+
+@asynccontextmanager
+async def job_event_listener(owner_id):
+    """
+    An asyncio.Queue receiving a user's job events while the block runs.
+    Enter it before reading the current state so no transition in between
+    is lost.
+    """
+    global _hub
+    if _hub is None:
+        _hub = JobEventHub()
+
+    queue = await _hub.listen(owner_id)
+    try:
+        yield queue
+    finally:
+        _hub.unlisten(owner_id, queue)
+
+
+async def iter_job_events(queue: asyncio.Queue, timeout: float = 15.0):
+    """
+    Yields events from a listener queue, or None after `timeout` seconds
+    without one (for keep-alives).
+    """
+    while True:
+        try:
+            yield await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            yield None
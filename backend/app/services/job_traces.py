@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from app.core.tracing import Span, export_spans
+from app.models.video_job_span import VideoJobSpan
+
+logger = logging.getLogger(__name__)
+
+
+def save_spans(db: Session, job_id, spans: list[Span]):
+    """
+    Stores a stage's finished spans for the job and exports them.
+    Best-effort: tracing never fails the job.
+    """
+    if not spans:
+        return
+
+    export_spans(spans, **{"video_job.id": str(job_id)})
+
+    try:
+        db.add_all([
+            VideoJobSpan(
+                job_id=job_id,
+                trace_id=s.trace_id,
+                span_id=s.span_id,
+                parent_span_id=s.parent_span_id,
+                name=s.name,
+                started_at=datetime.fromtimestamp(s.start_time, tz=timezone.utc),
+                duration_ms=s.duration_ms or 0.0,
+                attributes=s.attributes,
+                error=s.error,
+            )
+            for s in spans
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not store spans for job {job_id}: {e}")
+
+
+def get_trace_breakdown(db: Session, job_id) -> dict:
+    """
+    The job's latest trace: its spans in start order plus total milliseconds
+    per span name (e.g. how much of the run was whisper.transcribe).
+    """
+    latest = (
+        db.query(VideoJobSpan.trace_id)
+        .filter(VideoJobSpan.job_id == job_id)
+        .order_by(VideoJobSpan.started_at.desc())
+        .first()
+    )
+    if not latest:
+        return {"trace_id": None, "spans": [], "totals_ms": {}}
+
+    spans = (
+        db.query(VideoJobSpan)
+        .filter(VideoJobSpan.job_id == job_id, VideoJobSpan.trace_id == latest.trace_id)
+        .order_by(VideoJobSpan.started_at)
+        .all()
+    )
+
+    totals = {}
+    for s in spans:
+        totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+
+    return {
+        "trace_id": latest.trace_id,
+        "spans": [
+            {
+                "span_id": s.span_id,
+                "parent_span_id": s.parent_span_id,
+                "name": s.name,
+                "started_at": s.started_at,
+                "duration_ms": s.duration_ms,
+                "attributes": s.attributes,
+                "error": s.error,
+            }
+            for s in spans
+        ],
+        "totals_ms": totals,
+    }
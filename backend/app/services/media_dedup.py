@@ -0,0 +1,73 @@
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.video_job import VideoJob
+
+# Identical media is only processed once per user: a new job for a digest
+# that already has a finished job of the same owner reuses its transcript,
+# summary and blobs. Never across users, since transcripts can be edited by
+# hand. Only md5 digests qualify: a 32-bit crc32c (all GCS has for composite
+# objects, e.g. parallel uploads) is too weak to vouch for identical media.
+
+REUSE_DIGEST_PREFIX = "md5:"
+
+
+def find_processed_duplicate(db: Session, owner_id, content_digest: str | None, exclude_job_id=None) -> VideoJob | None:
+    if not content_digest or not content_digest.startswith(REUSE_DIGEST_PREFIX):
+        return None
+
+    query = db.query(VideoJob).filter(
+        VideoJob.owner_id == owner_id,
+        VideoJob.content_digest == content_digest,
+        VideoJob.status == "done",
+        VideoJob.transcript.isnot(None),
+        VideoJob.summary.isnot(None),
+    )
+    if exclude_job_id is not None:
+        query = query.filter(VideoJob.id != exclude_job_id)
+    return query.order_by(VideoJob.updated_at.desc()).first()
+
+
+def reuse_processed_duplicate(db: Session, job: VideoJob) -> bool:
+    """
+    Completes job from a finished job of the same owner with the same
+    (md5) content digest.
+    The freshly uploaded copy is deleted and the job points at the existing
+    blobs instead. Returns False (job untouched) if there is no such job.
+    Does not commit.
+    """
+    source = find_processed_duplicate(db, job.owner_id, job.content_digest, exclude_job_id=job.id)
+    if not source:
+        return False
+
+    duplicate_blob = job.video_url
+    if source.video_url and duplicate_blob != source.video_url:
+        job.video_url = source.video_url
+        if not blob_in_use(db, duplicate_blob, exclude_job_id=job.id):
+            from app.jobs.storage_cleanup import enqueue_blob_cleanup
+            enqueue_blob_cleanup([duplicate_blob])
+
+    job.transcript = source.transcript
+    job.summary = source.summary
+    job.audio_url = source.audio_url
+    job.duration_seconds = source.duration_seconds
+    job.stage = "summarize"
+    job.status = "done"
+    job.error = None
+    return True
+
+
+def blob_in_use(db: Session, blob_name: str | None, exclude_job_id=None) -> bool:
+    """
+    True if any job (other than exclude_job_id) still references blob_name,
+    as its video or its audio. Shared blobs must survive a single job's deletion.
+    """
+    if not blob_name:
+        return False
+
+    query = db.query(VideoJob.id).filter(
+        or_(VideoJob.video_url == blob_name, VideoJob.audio_url == blob_name)
+    )
+    if exclude_job_id is not None:
+        query = query.filter(VideoJob.id != exclude_job_id)
+    return query.first() is not None
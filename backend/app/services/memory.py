@@ -0,0 +1,272 @@
+import logging
+import os
+import signal
+import threading
+import time
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+
+logger = logging.getLogger(__name__)
+
+# Worker memory: RSS sampling, limits and per-stage memory predictions.
+#
+# Predictions are a flat base plus a per-second-of-media term (Whisper holds
+# the whole decoded audio plus its mel spectrogram; ffmpeg buffers scale
+# with the input). They pick the "-large" lane at enqueue time and gate
+# stage admission on the memory actually free in the container.
+#
+# "Free" is the limit minus the cgroup's working set: reclaimable page cache
+# (inactive_file) doesn't count, and neither do tmpfs pages (shmem), i.e. the
+# scratch dir on Cloud Run. Scratch has its own admission and budget
+# (services/scratch.py); an explicit SCRATCH_BUDGET_BYTES is held back from
+# what stages may use.
+
+STAGE_MEMORY_BASE = {
+    "fetch": 200 * 2**20,
+    "extract": 300 * 2**20,
+    "transcribe": 300 * 2**20,  # torch runtime
+    "upload_audio": 200 * 2**20,
+    "summarize": 300 * 2**20,
+}
+
+# Whisper "base" weights, unless the worker preloaded them (forked horses
+# share the parent's copy, already counted as used)
+SPEECH_MODEL_BYTES = 900 * 2**20
+
+STAGE_MEMORY_PER_MEDIA_SECOND = {
+    "fetch": 0,
+    "extract": 2 * 2**10,
+    "transcribe": 100 * 2**10,
+    "upload_audio": 0,
+    "summarize": 0,
+}
+
+
+class MemoryUnavailable(RuntimeError):
+    pass
+
+
+def predicted_memory_bytes(stage: str, media_duration: float | None, model_loaded: bool = False) -> int:
+    # Unknown duration: assume an hour rather than nothing
+    seconds = media_duration if media_duration is not None else 3600
+    predicted = STAGE_MEMORY_BASE[stage] + STAGE_MEMORY_PER_MEDIA_SECOND[stage] * seconds
+    if stage == "transcribe" and not model_loaded:
+        predicted += SPEECH_MODEL_BYTES
+    return int(predicted)
+
+
+def read_rss_bytes(pid: int | None = None) -> int | None:
+    """
+    Resident set size of a process (Linux /proc), None if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def _child_pids(pid: int) -> list[int]:
+    children = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children += [int(c) for c in f.read().split()]
+    except (OSError, ValueError):
+        pass
+    return children
+
+
+def tree_rss_bytes(pid: int | None = None) -> int:
+    """
+    RSS of a process plus its direct children (e.g. a horse and its ffmpeg).
+    """
+    pid = pid or os.getpid()
+    return sum(read_rss_bytes(p) or 0 for p in [pid, *_child_pids(pid)])
+
+
+def _read_int(path: str) -> int | None:
+    try:
+        with open(path) as f:
+            raw = f.read().strip()
+    except OSError:
+        return None
+    return int(raw) if raw.isdigit() else None
+
+
+def memory_limit_bytes() -> int | None:
+    """
+    The container's memory limit: WORKER_MEMORY_LIMIT_BYTES, else the
+    cgroup limit (v2, then v1), None if unlimited/unknown.
+    """
+    if settings.WORKER_MEMORY_LIMIT_BYTES > 0:
+        return settings.WORKER_MEMORY_LIMIT_BYTES
+    limit = _read_int("/sys/fs/cgroup/memory.max") or _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    # cgroup v1 reports "unlimited" as a huge number
+    if limit and limit < 2**60:
+        return limit
+    return None
+
+
+def _read_memory_stat(path: str) -> dict[str, int]:
+    stat = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, _, value = line.partition(" ")
+                if value.strip().isdigit():
+                    stat[key] = int(value)
+    except OSError:
+        pass
+    return stat
+
+
+def working_set_bytes() -> int | None:
+    """
+    The cgroup's memory usage without reclaimable page cache and tmpfs
+    pages (v2, then v1), None outside a cgroup.
+    """
+    used = _read_int("/sys/fs/cgroup/memory.current")
+    if used is not None:
+        stat = _read_memory_stat("/sys/fs/cgroup/memory.stat")
+        inactive_file, shmem = stat.get("inactive_file", 0), stat.get("shmem", 0)
+    else:
+        used = _read_int("/sys/fs/cgroup/memory/memory.usage_in_bytes")
+        if used is None:
+            return None
+        stat = _read_memory_stat("/sys/fs/cgroup/memory/memory.stat")
+        inactive_file, shmem = stat.get("total_inactive_file", 0), stat.get("total_shmem", 0)
+    return max(0, used - inactive_file - shmem)
+
+
+def free_memory_bytes() -> int | None:
+    """
+    Memory stages can still use: limit - working set - the scratch budget
+    (if set), else the host's MemAvailable. None if unknown.
+    """
+    limit = memory_limit_bytes()
+    used = working_set_bytes()
+    if limit and used is not None:
+        return max(0, limit - used - settings.SCRATCH_BUDGET_BYTES)
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def wait_for_memory(needed: int, timeout: float):
+    """
+    Blocks until `needed` bytes are free in the container, up to timeout
+    seconds; raises MemoryUnavailable after that. A no-op when free memory
+    can't be measured.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        free = free_memory_bytes()
+        if free is None or free >= needed:
+            return
+        if time.monotonic() >= deadline:
+            raise MemoryUnavailable(f"Needs ~{needed >> 20} MiB but only {free >> 20} MiB is free")
+        time.sleep(5)
+
+
+# Set by workers that run jobs in their own process (no horse per job): the
+# watchdog must not exit the worker itself
+_jobs_in_process = False
+
+
+def run_jobs_in_process():
+    global _jobs_in_process
+    _jobs_in_process = True
+
+
+def horse_rss_limit_bytes() -> int | None:
+    """
+    RSS at which MemorySampler kills the horse; None when jobs run in the
+    worker process itself.
+    """
+    if _jobs_in_process:
+        return None
+    if settings.HORSE_RSS_LIMIT_BYTES > 0:
+        return settings.HORSE_RSS_LIMIT_BYTES
+    limit = memory_limit_bytes()
+    return int(limit * 0.9) if limit else None
+
+
+def _killed_key(job_id) -> str:
+    return f"video-job:{job_id}:memory-killed"
+
+
+def pop_memory_kill(job_id) -> int | None:
+    """
+    Peak RSS recorded when the watchdog killed the job's horse, if it did.
+    """
+    try:
+        raw = redis_conn.getdel(_killed_key(job_id))
+    except redis.RedisError:
+        return None
+    return int(raw) if raw else None
+
+
+class MemorySampler:
+    """
+    Samples the RSS of this process and its children in a background thread
+    while a stage runs and keeps the peak. Past `kill_above` bytes it records
+    the kill in Redis and exits the process (the RQ horse) at once, so one
+    oversized video fails its own stage instead of getting the container
+    OOM-killed; the parent worker survives and retries or fails the stage.
+    """
+
+    def __init__(self, job_id, kill_above: int | None = None, interval: float = 1.0):
+        self.job_id = job_id
+        self.kill_above = kill_above
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+    def _sample(self):
+        rss = tree_rss_bytes()
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = self._sample()
+            if self.kill_above and rss > self.kill_above:
+                logger.error(
+                    f"Job {self.job_id} uses {rss >> 20} MiB (limit {self.kill_above >> 20} MiB); "
+                    f"killing the horse"
+                )
+                try:
+                    redis_conn.set(_killed_key(self.job_id), self.peak, ex=60 * 60)
+                except redis.RedisError:
+                    pass
+                for child in _child_pids(os.getpid()):
+                    try:
+                        os.kill(child, signal.SIGKILL)
+                    except OSError:
+                        pass
+                os._exit(1)
@@ -0,0 +1,75 @@
+import logging
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.services.rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SummaryRoute:
+    name: str
+    model: str
+    timeout_seconds: float
+    max_output_tokens: int
+    input_tokens: int  # estimate, used for rate limiting and logs
+
+
+# route name -> (timeout_seconds, max_output_tokens)
+_ROUTE_LIMITS = {
+    "section": (120, 1024),
+    "fast": (60, 2048),
+    "standard": (300, 4096),
+    "large": (900, 8192),
+}
+
+
+def _route(name: str, model: str, input_tokens: int) -> SummaryRoute:
+    timeout_seconds, max_output_tokens = _ROUTE_LIMITS[name]
+    return SummaryRoute(name, model, timeout_seconds, max_output_tokens, input_tokens)
+
+
+def estimate_input_tokens(text: str, has_media: bool = False, media_duration: float | None = None) -> int:
+    tokens = estimate_tokens(text)
+    if has_media:
+        if media_duration:
+            tokens += int(media_duration * settings.GEMINI_VIDEO_TOKENS_PER_SECOND)
+        else:
+            tokens += settings.GEMINI_MEDIA_TOKEN_ESTIMATE
+    return tokens
+
+
+def route_summary(transcript: str, has_media: bool = False, media_duration: float | None = None) -> SummaryRoute:
+    """
+    Picks the model for a full summary from the estimated input size:
+    short clips go to the fast model, long or visually dense recordings
+    (little speech per minute of video) to the large one.
+    """
+    input_tokens = estimate_input_tokens(transcript, has_media, media_duration)
+
+    visually_dense = False
+    if has_media and media_duration and media_duration >= 60:
+        words_per_minute = len(transcript.split()) / (media_duration / 60)
+        visually_dense = words_per_minute < settings.SUMMARY_VISUAL_WPM_THRESHOLD
+
+    if input_tokens >= settings.SUMMARY_LARGE_MIN_TOKENS or visually_dense:
+        route = _route("large", settings.GEMINI_LARGE_MODEL, input_tokens)
+    elif input_tokens <= settings.SUMMARY_FAST_MAX_TOKENS:
+        route = _route("fast", settings.GEMINI_FAST_MODEL, input_tokens)
+    else:
+        route = _route("standard", settings.GEMINI_MODEL, input_tokens)
+
+    logger.info(
+        f"Summary route={route.name} model={route.model} est_input_tokens={input_tokens} "
+        f"media_duration={media_duration} visually_dense={visually_dense}"
+    )
+    return route
+
+
+def route_section(chunk: str) -> SummaryRoute:
+    """
+    Map-phase section notes are small text-only calls: always the fast model.
+    """
+    return _route("section", settings.GEMINI_FAST_MODEL, estimate_tokens(chunk))
+
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import random
+import time
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+
+logger = logging.getLogger(__name__)
+
+# Two token buckets (requests/min and tokens/min) in one Redis hash, refilled
+# continuously and checked atomically. Uses the Redis server clock so every
+# worker agrees on time. Returns "0" when granted (and deducts), otherwise
+# the milliseconds until the request would fit.
+#
+# Each bucket holds `burst` of its per-minute limit and refills the rest over
+# the minute, so no 60 s window can exceed the limit. A request bigger than
+# the bucket goes through once the bucket is full and drives it negative.
+_ACQUIRE_SCRIPT = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local want_req = tonumber(ARGV[3])
+local want_tok = tonumber(ARGV[4])
+local burst = tonumber(ARGV[5])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+
+local state = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts')
+local req = tonumber(state[1]) or rpm * burst
+local tok = tonumber(state[2]) or tpm * burst
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+
+local function refill(level, limit)
+    return math.min(limit * burst, level + elapsed * limit * (1 - burst) / 60000)
+end
+
+local function wait_for(level, want, limit)
+    local need = math.min(want, limit * burst)
+    if level >= need then return 0 end
+    return (need - level) * 60000 / (limit * (1 - burst))
+end
+
+local wait = 0
+if rpm > 0 then
+    req = refill(req, rpm)
+    wait = math.max(wait, wait_for(req, want_req, rpm))
+end
+if tpm > 0 then
+    tok = refill(tok, tpm)
+    wait = math.max(wait, wait_for(tok, want_tok, tpm))
+end
+
+if wait == 0 then
+    req = req - want_req
+    tok = tok - want_tok
+end
+
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return tostring(wait)
+"""
+
+
+class RateLimiter:
+    """
+    Distributed limiter shared by every worker that uses the same name.
+    A limit of 0 disables that bucket. Best-effort, like the summary cache:
+    while Redis is unreachable calls go through unthrottled.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, burst: float = 0.1, conn=None):
+        self.key = f"ratelimit:{name}"
+        self.metrics_key = f"ratelimit:{name}:metrics"
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst = burst
+        self.conn = conn or redis_conn
+        self._script = self.conn.register_script(_ACQUIRE_SCRIPT)
+
+    def _try_acquire(self, tokens: int) -> float:
+        if self.rpm <= 0 and self.tpm <= 0:
+            return 0.0
+        try:
+            wait_ms = float(self._script(keys=[self.key], args=[self.rpm, self.tpm, 1, tokens, self.burst]))
+        except redis.RedisError as e:
+            logger.warning(f"Rate limiter {self.key} unavailable, not throttling: {e}")
+            return 0.0
+        return wait_ms / 1000
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until one request plus `tokens` fit the budget.
+        Returns the seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                self._record_wait(waited)
+                return waited
+            # Jitter so workers that were refused together don't retry in lockstep
+            wait += random.uniform(0, 0.05)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """
+        Same as acquire() for coroutines; the Redis call runs off the event loop.
+        """
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self._try_acquire, tokens)
+            if wait <= 0:
+                await asyncio.to_thread(self._record_wait, waited)
+                return waited
+            wait += random.uniform(0, 0.05)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def adjust_tokens(self, delta: int):
+        """
+        Corrects the token bucket once actual usage is known
+        (positive delta = used more than estimated).
+        """
+        if self.tpm > 0 and delta:
+            try:
+                self.conn.hincrbyfloat(self.key, "tok", -delta)
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter {self.key} adjustment failed: {e}")
+
+    def refund(self, tokens: int):
+        """
+        Returns the estimate charged for a call that failed or timed out,
+        so a burst of errors doesn't drain the bucket for healthy calls.
+        """
+        self.adjust_tokens(-tokens)
+
+    def _record_wait(self, waited: float):
+        pipe = self.conn.pipeline()
+        pipe.hincrby(self.metrics_key, "acquired", 1)
+        if waited > 0:
+            pipe.hincrby(self.metrics_key, "waited", 1)
+            pipe.hincrbyfloat(self.metrics_key, "wait_seconds_total", waited)
+        try:
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Rate limiter {self.key} metrics not recorded: {e}")
+        if waited > 1:
+            logger.info(f"Rate limiter {self.key} waited {waited:.1f}s")
+
+    def get_metrics(self) -> dict:
+        raw = self.conn.hgetall(self.metrics_key)
+        return {
+            "acquired": int(raw.get(b"acquired", 0)),
+            "waited": int(raw.get(b"waited", 0)),
+            "wait_seconds_total": float(raw.get(b"wait_seconds_total", 0)),
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+gemini_limiter = RateLimiter("gemini", settings.GEMINI_RPM_LIMIT, settings.GEMINI_TPM_LIMIT)
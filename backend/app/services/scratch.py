@@ -0,0 +1,227 @@
+import fcntl
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Local scratch space for pipeline stages, shared by every worker process in
+# the container. On Cloud Run the filesystem is RAM-backed, so bytes here
+# count against container memory.
+#
+# SCRATCH_DIR/<job id>/ holds one job's files. A stage *owns* its job dir
+# while it runs (".owner" = its pid) and reserves the bytes it expects to
+# write (".reservation"); admission waits until reservations of running
+# stages plus what is on disk fit SCRATCH_BUDGET_BYTES. Dirs without a live
+# owner are only a cache between stages (every file can be rebuilt from
+# GCS), so they are evicted oldest-first when space is needed, and swept at
+# worker start together with anything a killed horse left behind.
+# Admission and eviction run under an flock on SCRATCH_DIR/.lock.
+
+_OWNER = ".owner"
+_RESERVATION = ".reservation"
+_LOCK = ".lock"
+_TMP = "tmp"
+
+
+class ScratchSpaceUnavailable(RuntimeError):
+    pass
+
+
+def job_dir(job_id) -> str:
+    return os.path.join(settings.SCRATCH_DIR, str(job_id))
+
+
+def temp_path(suffix: str = "") -> str:
+    """
+    A fresh path for a loose temp file (swept at worker start if leaked).
+    """
+    path = os.path.join(settings.SCRATCH_DIR, _TMP)
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, f"{uuid.uuid4()}{suffix}")
+
+
+def budget_bytes() -> int:
+    if settings.SCRATCH_BUDGET_BYTES > 0:
+        return settings.SCRATCH_BUDGET_BYTES
+    # Default: half of the filesystem scratch lives on
+    os.makedirs(settings.SCRATCH_DIR, exist_ok=True)
+    return shutil.disk_usage(settings.SCRATCH_DIR).total // 2
+
+
+def _dir_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _owner(path: str) -> int | None:
+    """
+    pid of the live process owning a job dir, None if unowned.
+    """
+    raw = _read(os.path.join(path, _OWNER))
+    if not raw:
+        return None
+    try:
+        pid = int(raw)
+    except ValueError:
+        return None
+    return pid if _pid_alive(pid) else None
+
+
+@contextmanager
+def _locked():
+    os.makedirs(settings.SCRATCH_DIR, exist_ok=True)
+    with open(os.path.join(settings.SCRATCH_DIR, _LOCK), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _job_dirs() -> list[str]:
+    try:
+        names = os.listdir(settings.SCRATCH_DIR)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(settings.SCRATCH_DIR, name)
+        for name in names
+        if name not in (_LOCK, _TMP) and os.path.isdir(os.path.join(settings.SCRATCH_DIR, name))
+    ]
+
+
+def usage() -> dict:
+    """
+    Bytes held by running stages (at least their reservation), by cached
+    dirs between stages, and the budget.
+    """
+    owned = cached = 0
+    for path in _job_dirs():
+        on_disk = _dir_bytes(path)
+        if _owner(path):
+            owned += max(on_disk, int(_read(os.path.join(path, _RESERVATION)) or 0))
+        else:
+            cached += on_disk
+    loose = _dir_bytes(os.path.join(settings.SCRATCH_DIR, _TMP))
+    return {"owned": owned + loose, "cached": cached, "budget": budget_bytes()}
+
+
+def _try_admit(path: str, reserve: int) -> bool:
+    current = usage()
+    # Our own dir (cached from an earlier stage) counts inside the reservation
+    mine = _dir_bytes(path) if os.path.isdir(path) and not _owner(path) else 0
+    free = current["budget"] - current["owned"] - (current["cached"] - mine)
+    needed = max(0, reserve - mine)
+
+    if needed > free:
+        # Evict cached dirs of other jobs, least recently used first
+        cached = sorted(
+            (p for p in _job_dirs() if p != path and not _owner(p)),
+            key=os.path.getmtime,
+        )
+        for victim in cached:
+            if needed <= free:
+                break
+            freed = _dir_bytes(victim)
+            shutil.rmtree(victim, ignore_errors=True)
+            free += freed
+            logger.info(f"Evicted scratch {victim} ({freed} bytes)")
+
+    if needed > free:
+        return False
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, _OWNER), "w") as f:
+        f.write(str(os.getpid()))
+    with open(os.path.join(path, _RESERVATION), "w") as f:
+        f.write(str(reserve))
+    return True
+
+
+@contextmanager
+def job_scratch(job_id, reserve_bytes: int):
+    """
+    Owns the job's scratch dir for the block, after waiting (up to
+    SCRATCH_ADMISSION_TIMEOUT_SECONDS) until reserve_bytes fit the budget.
+    Files stay for the next stage; ownership is released on exit.
+    Raises ScratchSpaceUnavailable if space never frees up.
+    """
+    path = job_dir(job_id)
+    reserve = min(reserve_bytes, budget_bytes())
+    deadline = time.monotonic() + settings.SCRATCH_ADMISSION_TIMEOUT_SECONDS
+
+    while True:
+        with _locked():
+            if _try_admit(path, reserve):
+                break
+        if time.monotonic() >= deadline:
+            raise ScratchSpaceUnavailable(
+                f"No scratch space for job {job_id}: needs {reserve} bytes ({usage()})"
+            )
+        time.sleep(5)
+
+    try:
+        yield path
+    finally:
+        for name in (_OWNER, _RESERVATION):
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+
+def remove_job_scratch(job_id):
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+def sweep_orphans() -> int:
+    """
+    Removes every job dir without a live owner and all loose temp files.
+    Run when a worker starts: anything left is from killed processes.
+    Returns the bytes freed.
+    """
+    freed = 0
+    with _locked():
+        for path in _job_dirs():
+            if _owner(path):
+                continue
+            freed += _dir_bytes(path)
+            shutil.rmtree(path, ignore_errors=True)
+
+        tmp = os.path.join(settings.SCRATCH_DIR, _TMP)
+        freed += _dir_bytes(tmp)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if freed:
+        logger.info(f"Swept {freed} bytes of orphaned scratch files")
+    return freed
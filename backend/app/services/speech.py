@@ -1,11 +1,36 @@
+import threading
+
 import whisper
 
-# Load once per worker process
-model = whisper.load_model("base")
+from app.core.tracing import span
+
+# Loaded once per worker process. Workers load it before taking jobs so
+# forked horses inherit it instead of loading their own copy.
+_model = None
+_lock = threading.Lock()
+
+
+def load_model():
+    global _model
+    with _lock:
+        if _model is None:
+            _model = whisper.load_model("base")
+    return _model
+
+
+def is_model_loaded() -> bool:
+    return _model is not None
+
 
 def transcribe_audio(audio_path: str) -> str:
     """
-    Takes a local audio file path and returns transcript text
+    Takes a local audio file path and returns transcript text,
+    one Whisper segment per line (chunked summarization splits on these).
     """
-    result = model.transcribe(audio_path)
-    return result["text"]
+    with span("whisper.transcribe", model="base") as s:
+        result = load_model().transcribe(audio_path)
+        s.set_attribute("segments", len(result.get("segments", [])))
+    segments = [seg["text"].strip() for seg in result.get("segments", [])]
+    if not segments:
+        return result["text"]
+    return "\n".join(s for s in segments if s)
@@ -0,0 +1,437 @@
+import base64
+import hashlib
+import hmac
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote, urlencode
+
+from app.core.config import settings
+
+# Object storage behind the media pipeline. STORAGE_BACKEND picks one:
+#
+#   gcs    Google Cloud Storage (GCS_BUCKET_NAME); the client is created on
+#          first use, so importing this never needs credentials
+#   local  files under STORAGE_LOCAL_DIR; "signed" URLs point at the API's
+#          /storage route (api/routes/storage.py) and carry an HMAC of the
+#          object, method and expiry. For running and load-testing the full
+#          upload -> process path on one machine; the API and the workers
+#          must share the directory.
+#
+# Callers use the functions in services/gcs.py, which go through
+# get_storage().
+
+
+@dataclass
+class ObjectInfo:
+    name: str
+    size: int
+    created: datetime
+    md5: str | None = None  # base64, as GCS reports it
+    crc32c: str | None = None
+
+
+class StorageBackend(ABC):
+    """
+    What the app needs from an object store. Names are "videos/...",
+    "audio/...", "uploads/..." keys.
+    """
+
+    @abstractmethod
+    def upload(self, name: str, source, content_type: str | None = None):
+        """
+        source: a local file path or a readable binary file object.
+        """
+
+    @abstractmethod
+    def download(self, name: str, local_path: str, start: int | None = None, end: int | None = None) -> str:
+        """
+        Writes the object (or bytes start..end, inclusive) to local_path.
+        """
+
+    @abstractmethod
+    def sign(self, name: str, method: str = "GET", minutes: int = 60, content_type: str | None = None) -> str:
+        ...
+
+    @abstractmethod
+    def resumable_upload_uri(self, name: str, content_type: str, size: int | None = None) -> str:
+        ...
+
+    @abstractmethod
+    def stat(self, name: str, digest: bool = True) -> ObjectInfo | None:
+        """
+        Object metadata, None if it doesn't exist. digest=False may skip
+        md5/crc32c where they are costly to get.
+        """
+
+    @abstractmethod
+    def list_names(self, prefix: str, created_before: datetime | None = None) -> list[str]:
+        ...
+
+    @abstractmethod
+    def delete(self, names: list[str]) -> list[str]:
+        """
+        Deletes objects (missing ones count as deleted). Returns the names
+        that failed.
+        """
+
+    @abstractmethod
+    def compose(self, sources: list[str], destination: str, content_type: str | None = None):
+        """
+        Concatenates sources, in order, into destination.
+        """
+
+
+# --------------------
+# Google Cloud Storage
+# --------------------
+def get_service_account_email():
+    """
+    Helper to get the current service account email.
+    In Cloud Run, we should query the metadata server directly if credentials don't have it.
+    """
+    import google.auth
+
+    try:
+        # 1. Try Credentials first
+        credentials, _ = google.auth.default()
+        if hasattr(credentials, "service_account_email") and credentials.service_account_email and credentials.service_account_email != "default":
+            return credentials.service_account_email
+
+        # 2. Try Metadata Server (Reliable in Cloud Run)
+        import requests
+        headers = {"Metadata-Flavor": "Google"}
+        response = requests.get(
+            "http://metadata.google.internal/computeMetadata/v1/instance/service-accounts/default/email",
+            headers=headers,
+            timeout=2
+        )
+        if response.status_code == 200:
+            return response.text.strip()
+
+    except Exception as e:
+        print(f"Warning: Could not determine service account email: {e}")
+
+    return None
+
+
+class GCSStorage(StorageBackend):
+    # GCS composes at most 32 source objects per request
+    COMPOSE_MAX_SOURCES = 32
+    # and batch requests carry at most 100 calls
+    DELETE_BATCH_SIZE = 100
+
+    def __init__(self, bucket_name: str | None):
+        self.bucket_name = bucket_name
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google.cloud import storage
+
+                if settings.GCS_KEY_PATH and os.path.exists(settings.GCS_KEY_PATH):
+                    self._client = storage.Client.from_service_account_json(settings.GCS_KEY_PATH)
+                else:
+                    # Fallback to default credentials (Cloud Run, etc.)
+                    self._client = storage.Client()
+        return self._client
+
+    def _bucket(self):
+        if not self.bucket_name:
+            raise ValueError("GCS_BUCKET_NAME environment variable is not set")
+        return self.client.bucket(self.bucket_name)
+
+    def upload(self, name: str, source, content_type: str | None = None):
+        blob = self._bucket().blob(name)
+        if isinstance(source, str):
+            blob.upload_from_filename(source, content_type=content_type)
+        else:
+            source.seek(0)
+            blob.upload_from_file(source, content_type=content_type, rewind=True)
+
+    def download(self, name: str, local_path: str, start: int | None = None, end: int | None = None) -> str:
+        self._bucket().blob(name).download_to_filename(local_path, start=start, end=end)
+        return local_path
+
+    def sign(self, name: str, method: str = "GET", minutes: int = 60, content_type: str | None = None) -> str:
+        """
+        V4 signed URL. Falls back to IAM signing if local key is missing.
+        """
+        blob = self._bucket().blob(name)
+        options = {"version": "v4", "expiration": timedelta(minutes=minutes), "method": method}
+        if content_type:
+            options["content_type"] = content_type
+
+        try:
+            # Try standard signing (works locally with key file)
+            return blob.generate_signed_url(**options)
+        except Exception:
+            # Without a private key (Cloud Run ADC) the library signs through
+            # the IAM API when given the service account and an access token.
+            # Note: This requires the Service Account to have "Service Account Token Creator" role on itself.
+            import google.auth
+            from google.auth.transport.requests import Request
+
+            try:
+                sa_email = get_service_account_email()
+                if not sa_email:
+                    raise ValueError("No Service Account Email found for IAM signing")
+
+                credentials, _ = google.auth.default()
+                if not credentials.token:
+                    credentials.refresh(Request())
+
+                return blob.generate_signed_url(
+                    **options,
+                    service_account_email=sa_email,
+                    access_token=credentials.token,
+                )
+            except Exception as e:
+                print(f"IAM Signing failed: {e}")
+                raise ValueError(f"Failed to generate signed URL via IAM: {e}")
+
+    def resumable_upload_uri(self, name: str, content_type: str, size: int | None = None) -> str:
+        return self._bucket().blob(name).create_resumable_upload_session(
+            content_type=content_type,
+            size=size,
+            origin=settings.FRONTEND_ORIGIN,
+        )
+
+    def stat(self, name: str, digest: bool = True) -> ObjectInfo | None:
+        blob = self._bucket().get_blob(name)
+        if blob is None:
+            return None
+        return ObjectInfo(blob.name, blob.size, blob.time_created, blob.md5_hash, blob.crc32c)
+
+    def list_names(self, prefix: str, created_before: datetime | None = None) -> list[str]:
+        return [
+            blob.name
+            for blob in self.client.list_blobs(self.bucket_name, prefix=prefix, fields="items(name,timeCreated),nextPageToken")
+            if created_before is None or blob.time_created < created_before
+        ]
+
+    def delete(self, names: list[str]) -> list[str]:
+        from google.api_core.exceptions import NotFound
+
+        bucket = self._bucket()
+        failed = []
+        for i in range(0, len(names), self.DELETE_BATCH_SIZE):
+            chunk = names[i:i + self.DELETE_BATCH_SIZE]
+            try:
+                with self.client.batch():
+                    for name in chunk:
+                        bucket.delete_blob(name)
+            except Exception as e:
+                # A batch raises for its first failed call (e.g. one blob already
+                # gone); retry that chunk one by one to sort out the real failures
+                print(f"Batch delete failed ({e}); deleting {len(chunk)} blobs one by one")
+                for name in chunk:
+                    try:
+                        bucket.delete_blob(name)
+                    except NotFound:
+                        pass
+                    except Exception as e:
+                        print(f"Failed to delete {name} from GCS: {e}")
+                        failed.append(name)
+        return failed
+
+    def compose(self, sources: list[str], destination: str, content_type: str | None = None):
+        """
+        Composes in rounds of 32 through intermediate objects for more parts.
+        """
+        bucket = self._bucket()
+        intermediates = []
+        names = list(sources)
+        round_ = 0
+
+        while len(names) > self.COMPOSE_MAX_SOURCES:
+            merged = []
+            for i in range(0, len(names), self.COMPOSE_MAX_SOURCES):
+                name = f"{destination}.compose-{round_}-{i // self.COMPOSE_MAX_SOURCES}"
+                bucket.blob(name).compose([bucket.blob(n) for n in names[i:i + self.COMPOSE_MAX_SOURCES]])
+                merged.append(name)
+            intermediates += merged
+            names = merged
+            round_ += 1
+
+        target = bucket.blob(destination)
+        target.content_type = content_type
+        target.compose([bucket.blob(n) for n in names])
+
+        self.delete(intermediates)
+
+
+# --------------------
+# Local filesystem
+# --------------------
+class LocalStorage(StorageBackend):
+    # Files whose md5 is remembered, least recently used dropped first
+    MD5_CACHE_SIZE = 1024
+
+    def __init__(self, root: str, public_url: str, signing_key: str):
+        self.root = os.path.abspath(root)
+        self.public_url = public_url.rstrip("/")
+        self.signing_key = signing_key.encode()
+        # path -> (size, mtime, md5): hashing a video on every stat would
+        # make metadata reads cost a full read
+        self._md5_cache: OrderedDict[str, tuple] = OrderedDict()
+        self._md5_lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object name: {name}")
+        return path
+
+    def _write(self, name: str, source):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if isinstance(source, str):
+            shutil.copyfile(source, tmp_path)
+        else:
+            source.seek(0)
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+        os.replace(tmp_path, path)
+
+    def upload(self, name: str, source, content_type: str | None = None):
+        self._write(name, source)
+
+    def download(self, name: str, local_path: str, start: int | None = None, end: int | None = None) -> str:
+        path = self.path(name)
+        if start is None and end is None:
+            shutil.copyfile(path, local_path)
+            return local_path
+
+        with open(path, "rb") as src, open(local_path, "wb") as dst:
+            src.seek(start or 0)
+            remaining = None if end is None else end - (start or 0) + 1
+            while remaining is None or remaining > 0:
+                chunk = src.read(1024 * 1024 if remaining is None else min(remaining, 1024 * 1024))
+                if not chunk:
+                    break
+                dst.write(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+        return local_path
+
+    def signature(self, name: str, method: str, expires: int, content_type: str | None) -> str:
+        message = f"{method}\n{name}\n{expires}\n{content_type or ''}".encode()
+        return hmac.new(self.signing_key, message, hashlib.sha256).hexdigest()
+
+    def verify(self, name: str, method: str, expires: int, content_type: str | None, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.signature(name, method, expires, content_type), signature)
+
+    def sign(self, name: str, method: str = "GET", minutes: int = 60, content_type: str | None = None) -> str:
+        expires = int(time.time()) + minutes * 60
+        query = {"method": method, "expires": expires}
+        if content_type:
+            query["content_type"] = content_type
+        query["signature"] = self.signature(name, method, expires, content_type)
+        return f"{self.public_url}/storage/{quote(name)}?{urlencode(query)}"
+
+    def resumable_upload_uri(self, name: str, content_type: str, size: int | None = None) -> str:
+        # The /storage PUT route takes Content-Range chunks like a GCS session
+        return self.sign(name, "PUT", 60 * 24 * 7, content_type)
+
+    def _md5(self, path: str, size: int, mtime: float) -> str:
+        with self._md5_lock:
+            cached = self._md5_cache.get(path)
+            if cached and cached[:2] == (size, mtime):
+                self._md5_cache.move_to_end(path)
+                return cached[2]
+
+        # Hash outside the lock so one large file doesn't stall other stats
+        digest = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        md5 = base64.b64encode(digest.digest()).decode()
+
+        with self._md5_lock:
+            # A rewritten file replaces its old entry
+            self._md5_cache[path] = (size, mtime, md5)
+            self._md5_cache.move_to_end(path)
+            while len(self._md5_cache) > self.MD5_CACHE_SIZE:
+                self._md5_cache.popitem(last=False)
+        return md5
+
+    def stat(self, name: str, digest: bool = True) -> ObjectInfo | None:
+        path = self.path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        created = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+        md5 = self._md5(path, st.st_size, st.st_mtime) if digest else None
+        return ObjectInfo(name, st.st_size, created, md5=md5)
+
+    def list_names(self, prefix: str, created_before: datetime | None = None) -> list[str]:
+        names = []
+        for dirpath, _, files in os.walk(self.root):
+            for filename in files:
+                if filename.endswith(".tmp") or filename.endswith(".upload"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not name.startswith(prefix):
+                    continue
+                if created_before is not None:
+                    if datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc) >= created_before:
+                        continue
+                names.append(name)
+        return sorted(names)
+
+    def delete(self, names: list[str]) -> list[str]:
+        failed = []
+        for name in names:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"Failed to delete {name}: {e}")
+                failed.append(name)
+        return failed
+
+    def compose(self, sources: list[str], destination: str, content_type: str | None = None):
+        path = self.path(destination)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.compose.tmp"
+        with open(tmp_path, "wb") as dst:
+            for name in sources:
+                with open(self.path(name), "rb") as src:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, path)
+
+
+_storage: StorageBackend | None = None
+_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    with _lock:
+        if _storage is None:
+            if settings.STORAGE_BACKEND == "local":
+                _storage = LocalStorage(
+                    settings.STORAGE_LOCAL_DIR,
+                    settings.STORAGE_LOCAL_PUBLIC_URL,
+                    settings.STORAGE_LOCAL_SIGNING_KEY,
+                )
+            elif settings.STORAGE_BACKEND == "gcs":
+                _storage = GCSStorage(settings.GCS_BUCKET_NAME)
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+    return _storage
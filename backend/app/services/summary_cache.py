@@ -0,0 +1,94 @@
+import hashlib
+import logging
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "summary-cache"
+STATS_KEY = f"{CACHE_PREFIX}:stats"
+
+
+def summary_cache_key(transcript: str, media_digest: str | None, prompt_version: str, model: str) -> str:
+    """
+    Content-addressed key: identical transcript + media + prompt + model
+    always map to the same entry.
+    """
+    h = hashlib.sha256()
+    for part in (prompt_version, model, media_digest or "", transcript or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return f"{CACHE_PREFIX}:{h.hexdigest()}"
+
+
+def section_cache_key(chunk: str, prompt_version: str, model: str) -> str:
+    """
+    Key for the intermediate notes of one transcript chunk (map-reduce mode).
+    """
+    h = hashlib.sha256()
+    for part in (prompt_version, model, chunk):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return f"{CACHE_PREFIX}:section:{h.hexdigest()}"
+
+
+def get_cached_summary(key: str) -> str | None:
+    """
+    Returns the cached summary for key (or None) and records a hit/miss.
+    Redis errors are treated as a miss so caching never fails a job.
+    """
+    try:
+        value = redis_conn.get(key)
+        redis_conn.hincrby(STATS_KEY, "hits" if value else "misses", 1)
+    except redis.RedisError as e:
+        logger.warning(f"Summary cache lookup failed: {e}")
+        return None
+
+    if not value:
+        logger.info(f"Summary cache miss {key}")
+        return None
+
+    logger.info(f"Summary cache hit {key}")
+    return value.decode("utf-8")
+
+
+def set_cached_summary(key: str, summary: str):
+    try:
+        redis_conn.set(key, summary, ex=settings.SUMMARY_CACHE_TTL_SECONDS)
+    except redis.RedisError as e:
+        logger.warning(f"Summary cache write failed: {e}")
+
+
+def get_cached_sections(keys: list[str]) -> list[str | None]:
+    """
+    Fetches many section notes in one round trip; missing entries are None.
+    """
+    if not keys:
+        return []
+
+    try:
+        values = redis_conn.mget(keys)
+        hits = sum(1 for v in values if v)
+        pipe = redis_conn.pipeline()
+        pipe.hincrby(STATS_KEY, "section_hits", hits)
+        pipe.hincrby(STATS_KEY, "section_misses", len(keys) - hits)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Section cache lookup failed: {e}")
+        return [None] * len(keys)
+
+    return [v.decode("utf-8") if v else None for v in values]
+
+
+def get_summary_cache_stats() -> dict:
+    """
+    Returns hit/miss counters for full summaries and for section notes.
+    """
+    raw = redis_conn.hgetall(STATS_KEY)
+    return {
+        field: int(raw.get(field.encode(), 0))
+        for field in ("hits", "misses", "section_hits", "section_misses")
+    }
@@ -0,0 +1,103 @@
+import json
+import logging
+
+import redis
+
+from app.core.config import settings
+from app.core.redis_conn import async_redis_conn, redis_conn
+
+logger = logging.getLogger(__name__)
+
+# Each summary run is a Redis Stream of events:
+#   {"type": "delta", "text": ...}  incremental model output
+#   {"type": "reset"}               a retry started over; drop text received so far
+#   {"type": "done"}                final text is committed to VideoJob.summary
+#   {"type": "error", "error": ...} the run failed
+
+
+def summary_stream_key(job_id) -> str:
+    return f"video-job:{job_id}:summary-stream"
+
+
+class SummaryStreamPublisher:
+    """
+    Pushes partial summary text to Redis as the model produces it.
+    Publishing is best-effort: a Redis hiccup never fails the job.
+    """
+
+    def __init__(self, job_id):
+        self.key = summary_stream_key(job_id)
+        self._written = False
+        # A new run replaces whatever a previous run left behind. Listeners
+        # still attached to it keep reading past their last id, so tell them
+        # to drop the text they already have.
+        self._safe(self._replace_previous)
+
+    def _replace_previous(self):
+        if redis_conn.delete(self.key):
+            self._publish({"type": "reset"})
+
+    def write(self, text: str):
+        if text:
+            self._written = True
+            self._publish({"type": "delta", "text": text})
+
+    def reset(self):
+        # Only needed when a failed attempt already pushed partial text
+        if self._written:
+            self._written = False
+            self._publish({"type": "reset"})
+
+    def close(self):
+        self._publish({"type": "done"})
+
+    def fail(self, error: str):
+        self._publish({"type": "error", "error": error})
+
+    def _publish(self, event: dict):
+        def op():
+            pipe = redis_conn.pipeline()
+            pipe.xadd(self.key, {"event": json.dumps(event)})
+            pipe.expire(self.key, settings.SUMMARY_STREAM_TTL_SECONDS)
+            pipe.execute()
+
+        self._safe(op)
+
+    def _safe(self, op):
+        try:
+            op()
+        except redis.RedisError as e:
+            logger.warning(f"Summary stream publish failed for {self.key}: {e}")
+
+
+def clear_summary_stream(job_id):
+    """
+    Drops a finished run's events so listeners wait for the next run instead.
+    """
+    try:
+        redis_conn.delete(summary_stream_key(job_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not clear summary stream for {job_id}: {e}")
+
+
+async def iter_summary_events(job_id, block_ms: int = 15000):
+    """
+    Yields events for a job's summary run from the beginning, waiting for new
+    ones until "done"/"error". Yields None on each idle timeout (for keep-alives).
+    Runs on the event loop: an open stream holds no worker thread.
+    """
+    key = summary_stream_key(job_id)
+    last_id = "0"
+
+    while True:
+        entries = await async_redis_conn.xread({key: last_id}, block=block_ms, count=100)
+        if not entries:
+            yield None
+            continue
+
+        for entry_id, fields in entries[0][1]:
+            last_id = entry_id
+            event = json.loads(fields[b"event"])
+            yield event
+            if event["type"] in ("done", "error"):
+                return
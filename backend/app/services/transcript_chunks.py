@@ -0,0 +1,62 @@
+import hashlib
+import re
+
+# Fallback split points for transcripts without line breaks (e.g. pasted text)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_segments(transcript: str) -> list[str]:
+    """
+    Splits a transcript into segments.
+    Whisper transcripts are stored one segment per line; every line is
+    further split on sentence ends, so a line holding several sentences
+    yields one segment per sentence.
+    """
+    segments = []
+    for line in transcript.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        segments.extend(s for s in _SENTENCE_END.split(line) if s)
+    return segments
+
+
+def split_transcript(transcript: str, max_chars: int) -> list[str]:
+    """
+    Packs consecutive segments into chunks of at most max_chars
+    (a single oversized segment becomes its own chunk).
+    Never cuts inside a segment.
+
+    Boundaries are content-defined: a chunk also ends after any segment whose
+    hash hits the boundary pattern (once the chunk is at least max_chars / 4).
+    Editing a few words therefore changes only the chunk containing them;
+    the chunks before and after keep their exact text (and cache keys).
+    """
+    min_chars = max_chars // 4
+    # Aim for roughly half-full chunks, assuming ~100 chars per segment
+    divisor = max(1, max_chars // 200)
+
+    chunks = []
+    current: list[str] = []
+    size = 0
+
+    for segment in split_segments(transcript):
+        if current and size + len(segment) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(segment)
+        size += len(segment) + 1
+
+        if size >= min_chars and _is_boundary(segment, divisor):
+            chunks.append("\n".join(current))
+            current, size = [], 0
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _is_boundary(segment: str, divisor: int) -> bool:
+    # Stable across processes, unlike the builtin (salted) hash()
+    digest = hashlib.blake2b(segment.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % divisor == 0
@@ -0,0 +1,271 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.jobs.pipeline import pipeline_in_flight, start_new_pipelines
+from app.models.video_job import VideoJob
+from app.services.audio import probe_duration
+from app.services.gcs import generate_signed_url, generate_upload_signed_url, get_blob_digest
+from app.services.job_events import publish_job_event
+from app.services.media_dedup import reuse_processed_duplicate
+
+# A signed upload is registered as a "pending_upload" job when its URL is
+# minted. Whichever sees the finished upload first starts it: the GCS
+# object-finalize notification (api/routes/gcs_notifications.py) or the
+# client's POST /video-jobs. The other one finds it already started.
+# Registrations whose upload never arrives are deleted by the storage sweep
+# (expire_pending_uploads), and listings don't show them meanwhile.
+#
+# Every new upload's job is started by launch_jobs once its row is committed
+# as queued. Bulk imports go through the same steps for many uploads at
+# once: GCS metadata and ffprobe calls run side by side, one commit claims
+# all rows, and one pipelined Redis round trip queues every run.
+
+PENDING_UPLOAD = "pending_upload"
+
+# A claimed job whose start failed midway (storage, Redis) stays queued with
+# no run. Once it has looked like that this long (more than a start takes),
+# the next upload notification or client retry restarts it; until then
+# notifications are refused so Pub/Sub redelivers them.
+STRANDED_AFTER_SECONDS = 120
+
+# GCS metadata reads / ffprobes in flight per bulk request
+BULK_IO_CONCURRENCY = 8
+
+
+def handle_finalized_upload(db: Session, blob_name: str) -> VideoJob | None:
+    """
+    An object finished uploading: starts the pending_upload job registered
+    for it, if any, or restarts it if its start failed midway. Returns the
+    job if this call started it. Raises while another start may still be
+    in progress, so the notification is redelivered.
+    """
+    job = (
+        db.query(VideoJob)
+        .filter(VideoJob.video_url == blob_name, VideoJob.status.in_([PENDING_UPLOAD, "queued"]))
+        .first()
+    )
+    if job is None:
+        return None
+
+    if job.status == PENDING_UPLOAD:
+        started = start_uploaded_job(db, job)
+    elif pipeline_in_flight(job.id):
+        started = False
+    else:
+        started = restart_stranded_job(db, job)
+        if not started:
+            raise RuntimeError(f"Job {job.id} is still being started")
+
+    if started:
+        print(f"Started job {job.id} on upload of {blob_name}")
+        return job
+    return None
+
+
+def is_stranded(job: VideoJob) -> bool:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=STRANDED_AFTER_SECONDS)
+    return job.status == "queued" and job.updated_at < cutoff and not pipeline_in_flight(job.id)
+
+
+def restart_stranded_job(db: Session, job: VideoJob) -> bool:
+    """
+    Starts a claimed upload's job again if it is stranded (queued, no run
+    in flight, for STRANDED_AFTER_SECONDS). Returns True if it did.
+    """
+    if not is_stranded(job):
+        return False
+    launch_jobs(db, [job])
+    return True
+
+
+def expire_pending_uploads(db: Session, created_before: datetime, dry_run: bool = False) -> int:
+    """
+    Deletes pending_upload jobs registered before created_before (their
+    upload never arrived; a blob that did land is then swept as an orphan).
+    Returns how many.
+    """
+    query = db.query(VideoJob).filter(VideoJob.status == PENDING_UPLOAD, VideoJob.created_at < created_before)
+    if dry_run:
+        return query.count()
+    expired = query.delete(synchronize_session=False)
+    db.commit()
+    return expired
+
+
+def register_upload(db: Session, owner_id, content_type: str, filename: str | None = None) -> dict:
+    """
+    Mints a signed PUT URL for a new blob and adds its pending_upload job
+    to the session (not committed). Returns {"url", "blob_name", "job_id"}.
+    """
+    upload = generate_upload_signed_url(content_type)
+    job = VideoJob(
+        # Set here rather than at flush, so a batch of these inserts in one go
+        id=uuid.uuid4(),
+        owner_id=owner_id,
+        filename=filename or upload["blob_name"].rsplit("/", 1)[-1],
+        video_url=upload["blob_name"],
+        status=PENDING_UPLOAD,
+        error=None,
+    )
+    db.add(job)
+    return {**upload, "job_id": job.id}
+
+
+def probe_upload_duration(blob_name: str) -> float | None:
+    """
+    Reads the duration of an uploaded video with ffprobe over a short-lived
+    signed URL (range requests, no full download). None if unknown.
+    """
+    try:
+        url = generate_signed_url(blob_name, minutes=5)
+    except Exception as e:
+        print(f"Could not sign {blob_name} for probing: {e}")
+        return None
+    return probe_duration(url, timeout=settings.PROBE_TIMEOUT_SECONDS)
+
+
+def _map_io(fn, items: list) -> list:
+    # GCS metadata reads / ffprobes, side by side when there are several
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=BULK_IO_CONCURRENCY) as pool:
+        return list(pool.map(fn, items))
+
+
+def launch_jobs(db: Session, jobs: list[VideoJob]):
+    """
+    Starts new jobs whose rows are committed as queued with their content
+    digest: each reuses a processed duplicate, or has its duration probed
+    (side by side) and its pipeline run queued (one Redis round trip).
+    Publishes every job's status. Commits.
+    """
+    # Known media: reuse its transcript and summary instead of reprocessing
+    to_start = [job for job in jobs if not reuse_processed_duplicate(db, job)]
+
+    # Duration picks the pipeline lane and stage timeouts
+    durations = _map_io(probe_upload_duration, [job.video_url for job in to_start])
+    for job, duration in zip(to_start, durations):
+        job.duration_seconds = duration
+    db.commit()
+
+    start_new_pipelines(to_start)
+
+    # Reload the committed rows in one query rather than one per job
+    db.query(VideoJob).filter(VideoJob.id.in_([job.id for job in jobs])).all()
+    for job in jobs:
+        publish_job_event(job.owner_id, job.id, job.status)
+
+
+def _claim_pending(db: Session, job_id, content_digest: str, filename: str | None = None) -> bool:
+    # Only one caller wins the pending -> queued transition
+    values = {"status": "queued", "content_digest": content_digest}
+    if filename:
+        values["filename"] = filename
+    return bool(
+        db.query(VideoJob)
+        .filter(VideoJob.id == job_id, VideoJob.status == PENDING_UPLOAD)
+        .update(values, synchronize_session=False)
+    )
+
+
+def start_uploaded_job(db: Session, job: VideoJob) -> bool:
+    """
+    Starts a pending_upload job once its blob exists: fingerprints it,
+    claims it, then reuses a processed duplicate or probes the duration and
+    queues the pipeline. Returns False if the blob isn't there (yet) or the
+    job was already started; storage errors propagate.
+    """
+    content_digest = get_blob_digest(job.video_url)
+    if not content_digest:
+        return False
+
+    claimed = _claim_pending(db, job.id, content_digest)
+    db.commit()
+    db.refresh(job)
+    if not claimed:
+        return False
+
+    launch_jobs(db, [job])
+    return True
+
+
+def _read_digest(blob_name: str) -> tuple[str | None, str | None]:
+    try:
+        return get_blob_digest(blob_name), None
+    except Exception as e:
+        print(f"Error reading {blob_name}: {e}")
+        return None, f"Storage Error: {str(e)}"
+
+
+def create_jobs_from_uploads(db: Session, owner_id, uploads: list) -> tuple[list[VideoJob], list[dict]]:
+    """
+    Bulk POST /video-jobs: starts the jobs for finished uploads (objects
+    with filename, blob_name and an optional job_id from /signed-url).
+    Jobs registered for an upload are claimed like in start_uploaded_job
+    (one the upload notification started meanwhile is returned as is);
+    unregistered blobs get a new job. No transaction stays open across
+    storage reads or probes. Returns the jobs, in upload order, and an
+    error per upload that couldn't be started.
+    """
+    job_ids = [uuid.UUID(u.job_id) for u in uploads if u.job_id]
+    blob_names = [u.blob_name for u in uploads]
+    registered = (
+        db.query(VideoJob.id, VideoJob.video_url, VideoJob.status)
+        .filter(VideoJob.owner_id == owner_id, or_(VideoJob.id.in_(job_ids), VideoJob.video_url.in_(blob_names)))
+        .all()
+    )
+    db.rollback()
+    by_id = {row.id: row for row in registered}
+    by_blob = {row.video_url: row for row in registered}
+
+    # Result job id per upload; None until started
+    result_ids: list = []
+    pending = []
+    for upload in uploads:
+        row = by_id.get(uuid.UUID(upload.job_id)) if upload.job_id else by_blob.get(upload.blob_name)
+        if row is not None and row.status != PENDING_UPLOAD:
+            result_ids.append(row.id)
+        else:
+            pending.append((len(result_ids), upload, row.id if row is not None else None))
+            result_ids.append(None)
+
+    digests = _map_io(_read_digest, [upload.blob_name for _, upload, _ in pending])
+
+    errors = []
+    claimed_ids = []
+    for (i, upload, job_id), (content_digest, error) in zip(pending, digests):
+        if not content_digest:
+            errors.append({"blob_name": upload.blob_name, "detail": error or "Uploaded file not found"})
+            continue
+
+        if job_id is None:
+            job = VideoJob(
+                id=uuid.uuid4(),
+                owner_id=owner_id,
+                filename=upload.filename,
+                video_url=upload.blob_name,
+                status="queued",
+                error=None,
+                content_digest=content_digest,
+            )
+            db.add(job)
+            job_id = job.id
+            claimed_ids.append(job_id)
+        elif _claim_pending(db, job_id, content_digest, upload.filename):
+            claimed_ids.append(job_id)
+        result_ids[i] = job_id
+    db.commit()
+
+    jobs_by_id = {
+        job.id: job
+        for job in db.query(VideoJob).filter(VideoJob.id.in_([i for i in result_ids if i is not None]))
+    }
+    launch_jobs(db, [jobs_by_id[job_id] for job_id in claimed_ids])
+
+    jobs = [jobs_by_id[job_id] for job_id in result_ids if job_id is not None]
+    return jobs, errors
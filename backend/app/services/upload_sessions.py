@@ -0,0 +1,192 @@
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis_conn import redis_conn
+from app.models.video_job import VideoJob
+from app.services.gcs import (
+    compose_blobs,
+    create_resumable_upload_uri,
+    get_blob_digest,
+    list_blob_names,
+    sign_upload_url,
+    video_blob_name,
+)
+from app.services.upload_jobs import PENDING_UPLOAD
+
+# Upload sessions for large videos, instead of one single-shot signed PUT:
+#
+#   resumable  one GCS resumable-upload URI; the client sends chunks with
+#              Content-Range and resumes from what GCS has after a drop.
+#   parallel   N parts, each uploaded to its own signed URL (as many at once
+#              as the client likes) into uploads/<session>/part-NNNNN; a
+#              failed part is re-sent alone. Completing the session composes
+#              the parts into the video blob server-side.
+#
+# Either way the session registers a pending_upload job up front, so the
+# finished video starts like any other signed upload (upload_jobs.py).
+# Session state lives in Redis at upload-session:<id>.
+#
+# Without a key file every signature is an IAM signBlob call, so part URLs
+# are signed a page of missing parts at a time, side by side.
+
+MAX_UPLOAD_PARTS = 1000
+PART_URL_MINUTES = 60
+PART_URL_PAGE = 100
+SIGN_CONCURRENCY = 16
+# How long a second /complete waits for a running one, and how long the
+# lock outlives a crashed one (composing 1000 parts takes ~35 requests)
+COMPLETE_LOCK_WAIT_SECONDS = 60
+COMPLETE_LOCK_TIMEOUT_SECONDS = 600
+
+
+class UploadSessionError(ValueError):
+    pass
+
+
+def _session_key(session_id: str) -> str:
+    return f"upload-session:{session_id}"
+
+
+def _part_prefix(session_id: str) -> str:
+    return f"uploads/{session_id}/"
+
+
+def _part_name(session_id: str, index: int) -> str:
+    return f"{_part_prefix(session_id)}part-{index:05d}"
+
+
+def create_upload_session(
+    db: Session,
+    owner_id,
+    filename: str,
+    content_type: str,
+    size: int | None = None,
+    parts: int = 1,
+) -> dict:
+    """
+    Opens a session (resumable for parts=1, else parallel) and commits its
+    pending_upload job.
+    """
+    if not 1 <= parts <= MAX_UPLOAD_PARTS:
+        raise UploadSessionError(f"parts must be between 1 and {MAX_UPLOAD_PARTS}")
+
+    session_id = uuid.uuid4().hex
+    blob_name = video_blob_name(content_type)
+    session = {
+        "owner_id": str(owner_id),
+        "blob_name": blob_name,
+        "content_type": content_type,
+        "size": size,
+        "parts": parts,
+    }
+
+    if parts == 1:
+        session["mode"] = "resumable"
+        session["session_uri"] = create_resumable_upload_uri(blob_name, content_type, size)
+    else:
+        session["mode"] = "parallel"
+
+    job = VideoJob(owner_id=owner_id, filename=filename, video_url=blob_name, status=PENDING_UPLOAD, error=None)
+    db.add(job)
+    db.commit()
+
+    session["job_id"] = str(job.id)
+    redis_conn.set(_session_key(session_id), json.dumps(session), ex=settings.UPLOAD_SESSION_TTL_SECONDS)
+    return describe_upload_session(session_id, session)
+
+
+def get_upload_session(session_id: str, owner_id) -> dict | None:
+    raw = redis_conn.get(_session_key(session_id))
+    if not raw:
+        return None
+    session = json.loads(raw)
+    return session if session["owner_id"] == str(owner_id) else None
+
+
+def describe_upload_session(session_id: str, session: dict, start: int = 0, limit: int = PART_URL_PAGE) -> dict:
+    """
+    What the client needs to (re)start uploading: the resumable URI, or
+    fresh signed URLs for the parts GCS doesn't have yet, from part `start`
+    on and at most `limit` of them. "next" is where the following page
+    starts (None when this one reaches the last missing part).
+    """
+    info = {
+        "session_id": session_id,
+        "job_id": session["job_id"],
+        "blob_name": session["blob_name"],
+        "mode": session["mode"],
+    }
+    if session["mode"] == "resumable":
+        info["session_uri"] = session["session_uri"]
+        return info
+
+    uploaded = set(list_blob_names(_part_prefix(session_id)))
+    missing = [i for i in range(session["parts"]) if _part_name(session_id, i) not in uploaded]
+    page = [i for i in missing if i >= start][:limit]
+
+    def sign(index: int) -> str:
+        return sign_upload_url(_part_name(session_id, index), session["content_type"], PART_URL_MINUTES)
+
+    with ThreadPoolExecutor(max_workers=SIGN_CONCURRENCY) as pool:
+        urls = list(pool.map(sign, page))
+
+    info["uploaded_parts"] = session["parts"] - len(missing)
+    info["missing_parts"] = len(missing)
+    info["parts"] = [{"index": i, "url": url} for i, url in zip(page, urls)]
+    later = [i for i in missing if i > page[-1]] if page else []
+    info["next"] = later[0] if later else None
+    return info
+
+
+def complete_upload_session(session_id: str, session: dict):
+    """
+    Assembles the video blob of a parallel session from its parts (and
+    deletes them); nothing to do for a resumable one. Safe to repeat, also
+    concurrently: calls for one session take turns, and later ones find
+    the video already there. Raises UploadSessionError listing missing parts.
+    """
+    if session["mode"] != "parallel":
+        return
+
+    lock = redis_conn.lock(
+        f"{_session_key(session_id)}:complete-lock",
+        timeout=COMPLETE_LOCK_TIMEOUT_SECONDS,
+        blocking_timeout=COMPLETE_LOCK_WAIT_SECONDS,
+    )
+    if not lock.acquire():
+        raise UploadSessionError("The session is already being completed")
+    try:
+        if get_blob_digest(session["blob_name"]):
+            return
+
+        uploaded = set(list_blob_names(_part_prefix(session_id)))
+        parts = [_part_name(session_id, i) for i in range(session["parts"])]
+        missing = [i for i, name in enumerate(parts) if name not in uploaded]
+        if missing:
+            raise UploadSessionError(f"Missing parts: {missing[:20]}")
+
+        compose_blobs(parts, session["blob_name"], session["content_type"])
+
+        from app.jobs.storage_cleanup import enqueue_blob_cleanup
+        enqueue_blob_cleanup(parts)
+    finally:
+        lock.release()
+
+
+def close_upload_session(session_id: str):
+    redis_conn.delete(_session_key(session_id))
+
+
+def live_upload_sessions(session_ids) -> set[str]:
+    """
+    The given session ids that are still open, in one round trip.
+    """
+    session_ids = list(session_ids)
+    pipe = redis_conn.pipeline(transaction=False)
+    for session_id in session_ids:
+        pipe.exists(_session_key(session_id))
+    return {session_id for session_id, exists in zip(session_ids, pipe.execute()) if exists}
@@ -0,0 +1,208 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from dataclasses import dataclass
+from threading import Thread
+
+from app.core.config import settings
+from app.jobs.pipeline import CPU_QUEUE, IO_QUEUE, LEGACY_QUEUE, SHORT_LANE_SUFFIX
+
+# Runs several RQ workers in one container (WORKER_PROCESSES != 1).
+#
+# CPU workers (ffmpeg, Whisper) each get a share of the cores as their
+# torch/OpenMP thread budget, so transcriptions running side by side don't
+# oversubscribe the CPU; I/O workers (GCS, Gemini) run single-threaded
+# alongside them, jobs in-process, and keep the container busy while CPU
+# workers wait. Dead workers are restarted, including workers that recycle
+# themselves past WORKER_RSS_RECYCLE_BYTES. The supervisor owns the health
+# port and reports metrics for all of its workers, plus container throughput
+# in its log. The "-large" lane is left to big-memory containers
+# (WORKER_QUEUES=video-cpu-large).
+
+CPU_ROLE_QUEUES = [CPU_QUEUE + SHORT_LANE_SUFFIX, CPU_QUEUE, LEGACY_QUEUE]
+IO_ROLE_QUEUES = [IO_QUEUE + SHORT_LANE_SUFFIX, IO_QUEUE]
+
+THROUGHPUT_LOG_INTERVAL = 600
+
+
+@dataclass
+class WorkerSpec:
+    name: str
+    role: str  # "cpu" | "io"
+    queues: list[str]
+    torch_threads: int
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_workers(cpus: int | None = None) -> list[WorkerSpec]:
+    """
+    Worker processes for this container from WORKER_PROCESSES (0 = size from
+    the CPU count), WORKER_CPU_PROCESSES (0 = half of them) and
+    WORKER_TORCH_THREADS (0 = split the cores evenly between CPU workers).
+    """
+    cpus = cpus or available_cpus()
+
+    total = settings.WORKER_PROCESSES
+    if total <= 0:
+        # One CPU worker per two cores, plus two I/O workers
+        cpu_workers = settings.WORKER_CPU_PROCESSES or max(1, cpus // 2)
+        total = cpu_workers + 2
+    else:
+        cpu_workers = settings.WORKER_CPU_PROCESSES or max(1, total // 2)
+    cpu_workers = min(cpu_workers, total)
+    io_workers = total - cpu_workers
+
+    threads = settings.WORKER_TORCH_THREADS or max(1, cpus // cpu_workers)
+    # Without dedicated I/O workers the CPU workers take that work too
+    cpu_queues = CPU_ROLE_QUEUES + ([] if io_workers else IO_ROLE_QUEUES)
+
+    host = socket.gethostname()
+    specs = [
+        WorkerSpec(f"{host}.{os.getpid()}.cpu-{i}", "cpu", cpu_queues, threads)
+        for i in range(cpu_workers)
+    ]
+    specs += [
+        WorkerSpec(f"{host}.{os.getpid()}.io-{i}", "io", IO_ROLE_QUEUES, 1)
+        for i in range(io_workers)
+    ]
+    return specs
+
+
+def _run_worker_process(spec: WorkerSpec, name: str, with_scheduler: bool):
+    # Runs in a fresh (spawned) interpreter, so thread limits apply before
+    # torch loads
+    from app.worker import build_worker, start_recycler
+
+    worker = build_worker(spec.queues, spec.torch_threads, name=name)
+    start_recycler()
+    worker.work(with_scheduler=with_scheduler)
+
+
+class Supervisor:
+    def __init__(self, specs: list[WorkerSpec]):
+        self.specs = specs
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: dict[str, multiprocessing.Process] = {}
+        # RQ worker name per spec; a restarted worker gets a new one because
+        # a crashed worker's registration lingers until its TTL
+        self.names: dict[str, str] = {}
+        self.restarts = 0
+        self.stopping = False
+
+    def start(self, spec: WorkerSpec):
+        name = f"{spec.name}.{self.restarts}"
+        # Only one worker per container needs to run the RQ scheduler
+        with_scheduler = spec is self.specs[0]
+        process = self.context.Process(
+            target=_run_worker_process, args=(spec, name, with_scheduler), name=name
+        )
+        process.start()
+        self.processes[spec.name] = process
+        self.names[spec.name] = name
+        print(f"Started {spec.role} worker {name} (pid {process.pid}, "
+              f"{spec.torch_threads} threads, queues {','.join(spec.queues)})")
+
+    def workers(self) -> list:
+        """
+        RQ Worker records of the live workers (as registered in Redis).
+        """
+        from rq import Worker
+        from app.worker import conn
+
+        found = []
+        for name in self.names.values():
+            worker = Worker.find_by_key(Worker.redis_worker_namespace_prefix + name, connection=conn)
+            if worker:
+                found.append(worker)
+        return found
+
+    def is_ready(self) -> bool:
+        return len(self.workers()) == len(self.specs)
+
+    def render_metrics(self) -> str:
+        from app.jobs.metrics import render_metrics
+
+        processes = {"supervisor": None}
+        processes.update({self.names[spec]: p.pid for spec, p in self.processes.items() if p.is_alive()})
+
+        lines = [
+            "# HELP video_worker_processes Worker processes per role in this container.",
+            "# TYPE video_worker_processes gauge",
+        ]
+        for role in ("cpu", "io"):
+            count = sum(1 for s in self.specs if s.role == role and self.processes[s.name].is_alive())
+            lines.append(f'video_worker_processes{{role="{role}"}} {count}')
+
+        # Workers register only after loading Whisper, so ready == model loaded
+        return render_metrics(self.workers(), self.is_ready(), processes) + "\n".join(lines) + "\n"
+
+    def log_throughput(self):
+        from app.jobs.metrics import completed_pipelines
+
+        baseline, since = None, None
+        while not self.stopping:
+            time.sleep(THROUGHPUT_LOG_INTERVAL)
+            try:
+                done = completed_pipelines(self.workers())
+            except Exception as e:
+                print(f"Could not read throughput: {e}")
+                continue
+            if baseline is None:
+                baseline, since = done, time.time()
+                continue
+            hours = (time.time() - since) / 3600
+            print(f"Throughput: {(done - baseline) / hours:.1f} jobs/hour over {hours:.2f}h")
+
+    def stop(self, *args):
+        self.stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                # RQ finishes the current job on SIGTERM (warm shutdown)
+                process.terminate()
+
+    def run(self):
+        for spec in self.specs:
+            self.start(spec)
+
+        while not self.stopping:
+            time.sleep(5)
+            for spec in self.specs:
+                process = self.processes[spec.name]
+                if not process.is_alive() and not self.stopping:
+                    print(f"Worker {self.names[spec.name]} exited with {process.exitcode}; restarting")
+                    self.restarts += 1
+                    self.start(spec)
+
+        for process in self.processes.values():
+            process.join()
+
+
+def run_supervisor():
+    from app.jobs.storage_cleanup import schedule_storage_sweeps
+    from app.services.scratch import sweep_orphans
+    from app.worker import dispatch_fair_queue, start_health_server
+
+    # Before any worker starts: leftovers are from a previous container run
+    sweep_orphans()
+
+    specs = plan_workers()
+    print(f"Supervisor: {available_cpus()} CPUs, {len(specs)} workers")
+
+    supervisor = Supervisor(specs)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    signal.signal(signal.SIGINT, supervisor.stop)
+
+    start_health_server(supervisor.render_metrics, supervisor.is_ready)
+    Thread(target=dispatch_fair_queue, daemon=True).start()
+    Thread(target=schedule_storage_sweeps, daemon=True).start()
+    Thread(target=supervisor.log_throughput, daemon=True).start()
+
+    supervisor.run()
@@ -1,6 +1,8 @@
 import os
+import signal
+import time
 import redis
-from rq import Worker, Queue
+from rq import SimpleWorker, Worker, Queue
 
 from app.core.config import settings
 
@@ -13,23 +15,222 @@ conn = redis.from_url(REDIS_URL)
 from threading import Thread
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
-class HealthCheckHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b"OK")
 
-def start_health_server():
+def make_health_handler(render_metrics, is_ready):
+    """
+    Handler for the health port:
+    /metrics  Prometheus metrics (queues, stage latencies, RSS)
+    /ready    200 once the worker(s) can take jobs (speech model loaded where needed)
+    anything else: liveness, always OK
+    """
+
+    class HealthCheckHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                try:
+                    body = render_metrics().encode()
+                except Exception as e:
+                    self._reply(500, f"metrics unavailable: {e}".encode())
+                    return
+                self._reply(200, body, "text/plain; version=0.0.4")
+                return
+
+            if self.path == "/ready":
+                ready = is_ready()
+                self._reply(200 if ready else 503, b"READY" if ready else b"LOADING")
+                return
+
+            self._reply(200, b"OK")
+
+        def _reply(self, status: int, body: bytes, content_type: str = "text/plain"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            # Scrapes every few seconds would flood the worker log
+            pass
+
+    return HealthCheckHandler
+
+
+def start_health_server(render_metrics, is_ready):
     port = int(os.getenv("PORT", 8080))
-    server = HTTPServer(("0.0.0.0", port), HealthCheckHandler)
-    server.serve_forever()
+    server = HTTPServer(("0.0.0.0", port), make_health_handler(render_metrics, is_ready))
+    Thread(target=server.serve_forever, daemon=True).start()
+    print("Health check server started.")
+
+
+def dispatch_fair_queue(interval: int = 30):
+    """
+    Periodically admits pending pipelines, so slots reclaimed from crashed
+    runs are handed out even when no submission or completion triggers it.
+    """
+    from app.jobs.pipeline import dispatch_pending
+
+    while True:
+        try:
+            dispatch_pending()
+        except Exception as e:
+            print(f"Fair queue dispatch failed: {e}")
+        time.sleep(interval)
+
+
+def on_horse_killed(job, retpid, ret_val, rusage):
+    """
+    A horse died mid-stage (timeout, memory watchdog, OOM kill): drop its
+    scratch files now instead of leaving them to eviction (a retry rebuilds
+    them from GCS), and fail the run if RQ has no retry left for the stage.
+    """
+    from app.services.memory import pop_memory_kill
+    from app.services.scratch import remove_job_scratch
+
+    if job is None or not job.args:
+        return
+    job_id = job.args[0]
+    remove_job_scratch(job_id)
+
+    peak = pop_memory_kill(job_id)
+    if peak:
+        error = f"Stage used too much memory ({peak >> 20} MiB) and was stopped"
+    else:
+        error = f"Stage worker died unexpectedly (exit status {ret_val})"
+    print(f"Horse {retpid} of job {job_id} killed: {error}")
+
+    if not job.retries_left and len(job.args) > 1:
+        from app.jobs.video_summary import fail_killed_stage
+        fail_killed_stage(job_id, job.args[1], error)
+
+
+def recycle_on_rss(limit: int, interval: int = 30):
+    """
+    Warm-restarts this worker once its own RSS passes `limit` bytes (memory
+    creeping up across jobs): SIGTERM makes RQ finish the current job and
+    exit, then the supervisor (or the container runtime) starts a fresh one.
+    """
+    from app.services.memory import read_rss_bytes
+
+    while True:
+        time.sleep(interval)
+        rss = read_rss_bytes()
+        if rss and rss > limit:
+            print(f"Worker RSS {rss >> 20} MiB is over {limit >> 20} MiB; recycling")
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+
+
+def start_recycler():
+    if settings.WORKER_RSS_RECYCLE_BYTES > 0:
+        Thread(target=recycle_on_rss, args=(settings.WORKER_RSS_RECYCLE_BYTES,), daemon=True).start()
+
+
+def needs_speech_model(queue_names: list[str]) -> bool:
+    from app.jobs.pipeline import CPU_QUEUE, LEGACY_QUEUE
+    return any(name.startswith(CPU_QUEUE) or name == LEGACY_QUEUE for name in queue_names)
+
+
+def is_io_only(queue_names: list[str]) -> bool:
+    from app.jobs.pipeline import IO_QUEUE
+    return all(name.startswith(IO_QUEUE) for name in queue_names)
+
+
+def limit_threads(threads: int):
+    """
+    Caps torch/OpenMP intra-op threads for this process. Must run before
+    torch is imported for the OMP/MKL variables to take effect.
+    """
+    if threads <= 0:
+        return
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    import torch
+    torch.set_num_threads(threads)
+
+
+def build_worker(queue_names: list[str], torch_threads: int = 0, name: str | None = None) -> Worker:
+    """
+    Prepares an RQ worker for the given queues (highest priority first).
+    Transcribing workers load Whisper before taking jobs: every horse forked
+    afterwards shares it. Workers on I/O queues only run jobs in their own
+    process instead (SimpleWorker), so the shared Gemini client and its
+    connection pool (services/gemini_client.py) live across jobs; their
+    stages are light and a stage timeout still interrupts the job.
+    """
+    if needs_speech_model(queue_names):
+        limit_threads(torch_threads)
+        from app.services.speech import load_model
+        load_model()
+        print(f"Speech model loaded ({name or 'worker'}).")
+
+    queues = [Queue(q, connection=conn, default_timeout=3600) for q in queue_names]
+    if is_io_only(queue_names):
+        from app.services.memory import run_jobs_in_process
+        run_jobs_in_process()
+        return SimpleWorker(
+            queues,
+            connection=conn,
+            name=name,
+            default_worker_ttl=3600,
+        )
+    return Worker(
+        queues,
+        connection=conn,
+        name=name,
+        default_worker_ttl=3600,
+        job_monitoring_interval=5,
+        work_horse_killed_handler=on_horse_killed,
+    )
+
+
+def parse_queue_names(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
 
 if __name__ == "__main__":
-    # Start health check server in background
-    t = Thread(target=start_health_server, daemon=True)
-    t.start()
-    print("Health check server started.")
+    if settings.WORKER_PROCESSES != 1:
+        # Several workers in this container (see app/supervisor.py)
+        from app.supervisor import run_supervisor
+        run_supervisor()
+        raise SystemExit(0)
+
+    from app.jobs.metrics import render_metrics
+    from app.services.scratch import sweep_orphans
+
+    # Whatever a previous (killed) worker left in scratch is garbage now
+    sweep_orphans()
+
+    # Set once the RQ worker exists; read by the health server
+    worker = None
+    queue_names = parse_queue_names(settings.WORKER_QUEUES)
+    speech_needed = needs_speech_model(queue_names)
+
+    def is_ready() -> bool:
+        if worker is None:
+            return False
+        if not speech_needed:
+            return True
+        from app.services.speech import is_model_loaded
+        return is_model_loaded()
+
+    def metrics() -> str:
+        processes = {"worker": None}
+        if worker is not None and worker.horse_pid:
+            processes["horse"] = worker.horse_pid
+        return render_metrics([worker] if worker else [], speech_needed and is_ready(), processes)
+
+    # Start health check server in background (/ready stays 503 while Whisper loads)
+    start_health_server(metrics, is_ready)
+
+    Thread(target=dispatch_fair_queue, daemon=True).start()
+
+    from app.jobs.storage_cleanup import schedule_storage_sweeps
+    Thread(target=schedule_storage_sweeps, daemon=True).start()
 
-    queue = Queue("video-jobs", connection=conn, default_timeout=3600)
-    worker = Worker([queue], connection=conn, default_worker_ttl=3600, job_monitoring_interval=5)
-    worker.work()
+    # Queue order is priority: e.g. WORKER_QUEUES=video-cpu-short,video-cpu for a
+    # transcription-only worker, video-io-short,video-io for a GCS/Gemini worker.
+    # The scheduler runs stage retries.
+    worker = build_worker(queue_names, settings.WORKER_TORCH_THREADS)
+    start_recycler()
+    worker.work(with_scheduler=True)
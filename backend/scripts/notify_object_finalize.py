@@ -0,0 +1,91 @@
+"""
+Local stand-in for the GCS -> Pub/Sub object-finalize push: posts the same
+envelope Pub/Sub would to the API's /gcs-notifications endpoint.
+
+For one upload:
+
+    python scripts/notify_object_finalize.py videos/<uuid>.mp4
+
+Or keep watching pending_upload jobs and notify as soon as their blob exists
+(what the bucket notification does in production):
+
+    python scripts/notify_object_finalize.py --watch
+
+Uses GCS_BUCKET_NAME and GCS_NOTIFICATION_TOKEN from the backend settings.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import urllib.request
+import uuid
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.core.config import settings
+
+
+def notify(api: str, blob_name: str) -> int:
+    envelope = {
+        "message": {
+            "attributes": {
+                "eventType": "OBJECT_FINALIZE",
+                "bucketId": settings.GCS_BUCKET_NAME,
+                "objectId": blob_name,
+                "payloadFormat": "JSON_API_V1",
+            },
+            "data": base64.b64encode(json.dumps({"name": blob_name}).encode()).decode(),
+            "messageId": str(uuid.uuid4()),
+        },
+        "subscription": "projects/local/subscriptions/video-uploads-push",
+    }
+    request = urllib.request.Request(
+        f"{api}/gcs-notifications?token={settings.GCS_NOTIFICATION_TOKEN}",
+        data=json.dumps(envelope).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.status
+
+
+def watch(api: str, interval: float):
+    from app.db.session import SessionLocal
+    from app.models.video_job import VideoJob
+    from app.services.gcs import get_blob_digest
+    from app.services.upload_jobs import PENDING_UPLOAD
+
+    print(f"Watching pending uploads every {interval}s (Ctrl-C to stop)")
+    while True:
+        db = SessionLocal()
+        try:
+            blobs = [
+                row.video_url
+                for row in db.query(VideoJob.video_url).filter(VideoJob.status == PENDING_UPLOAD)
+            ]
+        finally:
+            db.close()
+
+        for blob_name in blobs:
+            if get_blob_digest(blob_name):
+                print(f"{blob_name}: {notify(api, blob_name)}")
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("blob_name", nargs="?")
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args.api, args.interval)
+    elif args.blob_name:
+        print(notify(args.api, args.blob_name))
+    else:
+        parser.error("give a blob name or --watch")
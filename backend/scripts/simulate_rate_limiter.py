@@ -0,0 +1,167 @@
+"""
+Simulates N workers sharing the Redis rate limiter against a local stand-in
+for the Gemini API that enforces RPM/TPM over a sliding 60 s window and
+answers 429 when a limit is exceeded (as Gemini does).
+
+Needs a reachable Redis (e.g. `docker compose up redis`):
+
+    python scripts/simulate_rate_limiter.py --workers 8 --rpm 120 --tpm 600000 --seconds 90
+
+Exits non-zero unless the limiter held: no 429s, and throughput reaching
+at least MIN_UTILIZATION of the binding limit (RPM or TPM).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process
+
+# Add backend to path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import redis
+
+from app.core.config import settings
+from app.services.rate_limiter import RateLimiter
+
+# Share of the binding limit the workers must reach (the bucket starts with
+# only its burst, so a short run can't get all the way)
+MIN_UTILIZATION = 0.7
+
+
+class StandInGemini:
+    """
+    Counts requests/tokens over the last 60 s and rejects what exceeds the limits.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = deque()  # (timestamp, tokens)
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.accepted_tokens = 0
+        self.rejected = 0
+
+    def handle(self, tokens: int) -> bool:
+        with self.lock:
+            now = time.time()
+            while self.window and self.window[0][0] <= now - 60:
+                self.window.popleft()
+
+            used_tokens = sum(t for _, t in self.window)
+            if len(self.window) + 1 > self.rpm or used_tokens + tokens > self.tpm:
+                self.rejected += 1
+                return False
+
+            self.window.append((now, tokens))
+            self.accepted += 1
+            self.accepted_tokens += tokens
+            return True
+
+
+def start_stand_in(api: StandInGemini) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            ok = api.handle(body["tokens"])
+            self.send_response(200 if ok else 429)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_worker(worker_id: int, url: str, redis_url: str, rpm: int, tpm: int, until: float):
+    limiter = RateLimiter("simulation", rpm, tpm, conn=redis.from_url(redis_url))
+    rng = random.Random(worker_id)
+
+    while time.time() < until:
+        # Mix of short prompts and large multimodal requests
+        tokens = rng.choice([500, 2_000, 8_000, 20_000])
+        limiter.acquire(tokens)
+
+        req = urllib.request.Request(
+            url,
+            data=json.dumps({"tokens": tokens}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            urllib.request.urlopen(req, timeout=10)
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                raise
+
+        # Simulated model latency
+        time.sleep(rng.uniform(0.05, 0.3))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=120)
+    parser.add_argument("--tpm", type=int, default=600_000)
+    parser.add_argument("--seconds", type=int, default=90)
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", settings.REDIS_URL))
+    args = parser.parse_args()
+
+    conn = redis.from_url(args.redis_url)
+    conn.delete("ratelimit:simulation", "ratelimit:simulation:metrics")
+
+    api = StandInGemini(args.rpm, args.tpm)
+    server = start_stand_in(api)
+    url = f"http://127.0.0.1:{server.server_port}/generate"
+
+    until = time.time() + args.seconds
+    workers = [
+        Process(target=run_worker, args=(i, url, args.redis_url, args.rpm, args.tpm, until))
+        for i in range(args.workers)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    server.shutdown()
+
+    metrics = RateLimiter("simulation", args.rpm, args.tpm, conn=conn).get_metrics()
+    minutes = args.seconds / 60
+    avg_wait = metrics["wait_seconds_total"] / metrics["acquired"] if metrics["acquired"] else 0
+
+    print(f"Workers:            {args.workers}")
+    print(f"Limits:             {args.rpm} RPM / {args.tpm} TPM")
+    print(f"Accepted:           {api.accepted} ({api.accepted / minutes:.1f}/min)")
+    print(f"429s:               {api.rejected}")
+    print(f"Acquisitions:       {metrics['acquired']} ({metrics['waited']} had to wait)")
+    print(f"Avg wait / request: {avg_wait:.2f}s")
+
+    # Whichever limit the request mix runs into first
+    utilization = max(
+        api.accepted / minutes / args.rpm if args.rpm else 0,
+        api.accepted_tokens / minutes / args.tpm if args.tpm else 0,
+    )
+    print(f"Utilization:        {utilization:.0%} of the binding limit")
+
+    failures = []
+    if api.rejected:
+        failures.append(f"{api.rejected} requests got 429")
+    if utilization < MIN_UTILIZATION:
+        failures.append(f"utilization {utilization:.0%} is below {MIN_UTILIZATION:.0%}")
+    if failures:
+        print(f"FAIL: {'; '.join(failures)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -117,6 +117,8 @@ export default function DashboardPage() {
   const fileInputRef = useRef<HTMLInputElement | null>(null);
   const [videoFile, setVideoFile] = useState<File | null>(null);
   const [jobs, setJobs] = useState<VideoJob[]>([]);
+  const jobsRef = useRef<VideoJob[]>([]);
+  jobsRef.current = jobs;
   const [selectedJobId, setSelectedJobId] = useState("");
   const [transcriptText, setTranscriptText] = useState("");
   const [videoStatus, setVideoStatus] = useState("");
@@ -341,7 +343,7 @@ export default function DashboardPage() {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token}`,
         },
-        body: JSON.stringify({ content_type: videoFile.type }),
+        body: JSON.stringify({ content_type: videoFile.type, filename: videoFile.name }),
       });
 
       if (!urlRes.ok) {
@@ -349,7 +351,7 @@ export default function DashboardPage() {
         setVideoStatus(`Init failed: ${text}`);
         return;
       }
-      const { url, blob_name } = await urlRes.json();
+      const { url, blob_name, job_id } = await urlRes.json();
 
       // Step 2: Upload to GCS
       setVideoStatus("Uploading to cloud...");
@@ -366,7 +368,7 @@ export default function DashboardPage() {
         return;
       }
 
-      // Step 3: Create Job Record
+      // Step 3: Confirm the job (processing usually started when the upload landed)
       setVideoStatus("Finalizing...");
       const jobRes = await fetch(`${apiUrl}/video-jobs`, {
         method: "POST",
@@ -377,6 +379,7 @@ export default function DashboardPage() {
         body: JSON.stringify({
           filename: videoFile.name,
           blob_name: blob_name,
+          job_id: job_id,
         }),
       });
 
@@ -528,16 +531,76 @@ export default function DashboardPage() {
   useEffect(() => {
     fetchNotes();
     fetchJobs();
+  }, []);
+
+  // Live job status over server-sent events instead of polling the list.
+  // EventSource can't send the Authorization header, so every (re)connect
+  // first exchanges the token for a short-lived stream ticket.
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | undefined;
+    let retryDelay = 1000;
+    let closed = false;
+
+    async function connect() {
+      try {
+        const token = await getToken({ template: "cloud-notes" });
+        const res = await fetch(`${apiUrl}/video-jobs/stream-ticket`, {
+          method: "POST",
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!res.ok) throw new Error(`ticket request failed (${res.status})`);
+        const { ticket } = await res.json();
+        if (closed) return;
+
+        source = new EventSource(`${apiUrl}/video-jobs/events?ticket=${encodeURIComponent(ticket)}`);
+
+        source.onopen = () => {
+          retryDelay = 1000;
+          // Catch up on whatever changed while we were disconnected
+          fetchJobs(true);
+        };
+
+        source.addEventListener("status", (e) => {
+          const event = JSON.parse((e as MessageEvent).data);
+          const known = jobsRef.current.some((job) => job.id === event.job_id);
+          setJobs((prevJobs) =>
+            prevJobs.map((job) => (job.id === event.job_id ? { ...job, status: event.status } : job))
+          );
+
+          // Finished stages bring a transcript/summary the event doesn't carry
+          if (!known || event.phase === "completed" || ["done", "failed", "ready"].includes(event.status)) {
+            fetchJobs(true);
+          }
+        });
+
+        source.onerror = () => {
+          // Don't let the browser retry with a ticket that may have expired
+          source?.close();
+          scheduleReconnect();
+        };
+      } catch {
+        scheduleReconnect();
+      }
+    }
+
+    function scheduleReconnect() {
+      if (closed) return;
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    }
 
-    const interval = setInterval(() => {
-      fetchJobs(true);
-    }, 5000);
+    connect();
 
-    return () => clearInterval(interval);
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source?.close();
+    };
   }, []);
 
   // Update stableSignedUrl only when selectedJobId changes or a new URL becomes available for the current job.
-  // This prevents the video player from restarting every 5s due to polling.
+  // This prevents the video player from restarting whenever the job list is refetched.
   useEffect(() => {
     const currentJob = jobs.find(j => j.id === selectedJobId);
     const newUrl = currentJob?.signed_url || null;